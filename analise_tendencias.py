@@ -0,0 +1,184 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from cubo_resultados import construir_cubo, ler_cubo
+
+# --- Configuração das análises de tendência ---
+# Kernels vetorizados por grupo (descritor, escola × descritor, ...): as linhas
+# são ordenadas uma vez por (grupo, data) e cada medida sai de somas por grupo
+# (bincount) ou de deslocamentos dentro do grupo, sem função Python por grupo.
+# Com isso, a tendência de todas as escolas sai de uma vez do cubo.
+DIAS_POR_ANO = 365.25
+JANELA_MEDIA_MOVEL = 3
+MEDIDAS_RANKING = {"inclinacao": "INCLINACAO", "crescimento": "Crescimento"}
+
+
+def _float(valores) -> np.ndarray:
+    """Valores como float64, com nulos (inclusive pd.NA) = NaN."""
+    if isinstance(valores, (pd.Series, pd.Index)):
+        return valores.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.asarray(valores, dtype=np.float64)
+
+
+def taxa_acerto(acertos, erros) -> np.ndarray:
+    """Taxa de acerto ponderada, em %: acertos / (acertos + erros); NaN sem respostas."""
+    acertos, erros = _float(acertos), _float(erros)
+    total = acertos + erros
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, (acertos / total) * 100, np.nan)
+
+
+def _grupos(df: pd.DataFrame, chaves: list[str], tempo: str) -> tuple[pd.DataFrame, np.ndarray, pd.DataFrame, np.ndarray]:
+    """
+    Linhas com chaves válidas ordenadas por (grupo, tempo), o código do grupo de
+    cada linha, os rótulos dos grupos (em ordem) e o início de cada grupo.
+    """
+    df = df.dropna(subset=chaves)
+    agrupado = df.groupby(chaves, observed=True, sort=True)
+    codigos = agrupado.ngroup().to_numpy()
+    rotulos = agrupado.size().index.to_frame(index=False)
+
+    ordem = np.lexsort((df[tempo].to_numpy(), codigos))
+    df, codigos = df.iloc[ordem], codigos[ordem]
+    n = np.bincount(codigos, minlength=len(rotulos))
+    return df, codigos, rotulos, np.cumsum(n) - n
+
+
+def crescimento(df: pd.DataFrame, chaves: list[str], tempo: str = "DT_REFERENCIA",
+                valor: str = "TX_ACERTO") -> pd.DataFrame:
+    """Último menos primeiro valor de cada grupo na ordem do tempo (0 com um registro só)."""
+    df, codigos, rotulos, inicio = _grupos(df, chaves, tempo)
+    v = _float(df[valor])
+    n = np.bincount(codigos, minlength=len(rotulos))
+    primeiro, ultimo = v[inicio], v[inicio + n - 1]
+    return rotulos.assign(Crescimento=np.where(n > 1, ultimo - primeiro, 0.0))
+
+
+def inclinacao(df: pd.DataFrame, chaves: list[str], tempo: str = "DT_REFERENCIA",
+               valor: str = "TX_ACERTO") -> pd.DataFrame:
+    """
+    Inclinação da reta de mínimos quadrados de `valor` contra o tempo, em pontos
+    por ano (p.p./ano para taxas), e o número de pontos usados. NaN com menos de
+    dois pontos ou todos na mesma data.
+    """
+    df, codigos, rotulos, _ = _grupos(df, chaves, tempo)
+    x = (df[tempo] - df[tempo].min()).dt.days.to_numpy(dtype=np.float64, na_value=np.nan) / DIAS_POR_ANO
+    y = _float(df[valor])
+    validos = ~np.isnan(x) & ~np.isnan(y)
+    c, x, y = codigos[validos], x[validos], y[validos]
+
+    k = len(rotulos)
+    n = np.bincount(c, minlength=k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media_x = np.bincount(c, x, minlength=k) / n
+        media_y = np.bincount(c, y, minlength=k) / n
+        dx = x - media_x[c]
+        sxx = np.bincount(c, dx * dx, minlength=k)
+        sxy = np.bincount(c, dx * (y - media_y[c]), minlength=k)
+        inclinacoes = np.where((n > 1) & (sxx > 0), sxy / sxx, np.nan)
+    return rotulos.assign(INCLINACAO=inclinacoes, N_PONTOS=n)
+
+
+def media_movel(df: pd.DataFrame, chaves: list[str], tempo: str = "DT_REFERENCIA",
+                valor: str = "TX_ACERTO", janela: int = JANELA_MEDIA_MOVEL,
+                coluna: str = "MEDIA_MOVEL") -> pd.DataFrame:
+    """
+    `df` ordenado por (grupo, tempo) com a média móvel de `valor` nas últimas
+    `janela` observações do grupo (ignora NaN; menos observações no início).
+    """
+    df, codigos, _, inicio = _grupos(df, chaves, tempo)
+    v = _float(df[valor])
+    validos = ~np.isnan(v)
+    somas = np.concatenate([[0.0], np.cumsum(np.where(validos, v, 0.0))])
+    contagens = np.concatenate([[0], np.cumsum(validos)])
+
+    posicao = np.arange(len(v))
+    desde = np.maximum(posicao - janela + 1, inicio[codigos])
+    soma, contagem = somas[posicao + 1] - somas[desde], contagens[posicao + 1] - contagens[desde]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return df.assign(**{coluna: np.where(contagem > 0, soma / contagem, np.nan)})
+
+
+def variacao_anual(df: pd.DataFrame, chaves: list[str], tempo: str = "DT_REFERENCIA",
+                   acertos: str = "QTD_ACERTOS", erros: str = "QTD_ERROS") -> pd.DataFrame:
+    """
+    Taxa ponderada de cada grupo por ano e a variação (p.p.) em relação ao ano
+    anterior com dados do mesmo grupo.
+    """
+    anual = (
+        df.dropna(subset=chaves + [tempo])
+        .assign(ANO=lambda d: d[tempo].dt.year)
+        .groupby(chaves + ["ANO"], observed=True, sort=True)[[acertos, erros]]
+        .sum()
+        .reset_index()
+    )
+    anual["TX_ACERTO"] = taxa_acerto(anual[acertos], anual[erros])
+    anual["VARIACAO"] = anual["TX_ACERTO"] - anual.groupby(chaves, observed=True)["TX_ACERTO"].shift()
+    return anual
+
+
+def ranking_escolas(cubo: pd.DataFrame, componente: str, descritores: list | None = None,
+                    regiao: str | None = None, municipio: str | None = None,
+                    medida: str = "inclinacao") -> pd.DataFrame:
+    """
+    Escolas ordenadas pela melhora da taxa de acerto (nos descritores dados),
+    calculada para todas as escolas de uma vez a partir do nível Escola do cubo.
+    `medida`: "inclinacao" (p.p./ano) ou "crescimento" (último - primeiro).
+    Só entram escolas com pelo menos duas datas.
+    """
+    chaves = ["NM_REGIONAL", "NM_MUNICIPIO", "NM_ESCOLA"]
+    mascara = (cubo["NIVEL"] == "Escola") & (cubo["NM_DISCIPLINA"] == componente)
+    if descritores is not None:
+        mascara &= cubo["CD_DESCRITOR"].isin(descritores)
+    if regiao:
+        mascara &= cubo["NM_REGIONAL"] == regiao
+    if municipio:
+        mascara &= cubo["NM_MUNICIPIO"] == municipio
+
+    por_data = (
+        cubo.loc[mascara]
+        .groupby(chaves + ["DT_REFERENCIA"], observed=True)[["QTD_ACERTOS", "QTD_ERROS"]]
+        .sum()
+        .reset_index()
+    )
+    por_data["TX_ACERTO"] = taxa_acerto(por_data["QTD_ACERTOS"], por_data["QTD_ERROS"])
+
+    ultima = (
+        por_data.sort_values("DT_REFERENCIA", kind="stable")
+        .groupby(chaves, observed=True)["TX_ACERTO"].last()
+        .rename("TX_ULTIMA")
+        .reset_index()
+    )
+    ranking = (
+        inclinacao(por_data, chaves)
+        .merge(crescimento(por_data, chaves), on=chaves)
+        .merge(ultima, on=chaves)
+    )
+    ranking = ranking[ranking["N_PONTOS"] >= 2]
+    return ranking.sort_values(MEDIDAS_RANKING[medida], ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ranking das escolas pela melhora da taxa de acerto")
+    parser.add_argument("--base", default="data/base_tratada.parquet",
+                        help="Base cujo cubo (data/cubo_<base>.parquet) será usado")
+    parser.add_argument("--componente", required=True)
+    parser.add_argument("--regional", default=None)
+    parser.add_argument("--municipio", default=None)
+    parser.add_argument("--medida", choices=list(MEDIDAS_RANKING), default="inclinacao")
+    parser.add_argument("--saida", default=None, help="CSV de saída (padrão: só mostra as primeiras)")
+    args = parser.parse_args()
+
+    cubo = ler_cubo(args.base)
+    if cubo is None:
+        cubo = construir_cubo(args.base)
+    ranking = ranking_escolas(cubo, args.componente, regiao=args.regional,
+                              municipio=args.municipio, medida=args.medida)
+    print(f"🏫 {len(ranking):,} escolas com pelo menos duas avaliações.")
+    if args.saida:
+        ranking.to_csv(args.saida, index=False, sep=";", encoding="utf-8-sig")
+        print(f"💾 Ranking salvo em: {args.saida}")
+    else:
+        print(ranking.head(20).to_string(index=False))
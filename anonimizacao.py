@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import os
+import secrets
+from functools import lru_cache
+
+import pandas as pd
+
+# --- Configuração da anonimização ---
+# A chave secreta vem da variável de ambiente ou de um arquivo local (fora do
+# git). Sem ela não é possível refazer o hash a partir da lista pública de
+# códigos INEP; com ela, o mesmo aluno recebe sempre o mesmo ID_ANONIMO. O
+# arquivo padrão fica na raiz do projeto, qualquer que seja a pasta de execução.
+VARIAVEL_CHAVE = "DIDALE_CHAVE_ANONIMIZACAO"
+ARQUIVO_CHAVE = os.environ.get(
+    "DIDALE_ARQUIVO_CHAVE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chave_anonimizacao")
+)
+
+COLUNA_ORIGEM = "CD_ALUNO_INEP"
+COLUNA_ID = "ID_ANONIMO"
+
+
+@lru_cache(maxsize=None)
+def obter_chave(arquivo: str = ARQUIVO_CHAVE, criar: bool = True) -> str:
+    """
+    Retorna a chave de 16 caracteres usada pelo SipHash do pandas, derivada do
+    segredo em `DIDALE_CHAVE_ANONIMIZACAO` ou, na falta dela, do `arquivo` de
+    chave. Se nenhum existir, gera um segredo aleatório e o grava no arquivo,
+    para que execuções seguintes (incrementais inclusive) usem o mesmo.
+
+    Com `criar=False` (já existe saída gerada com alguma chave), a falta do
+    segredo é erro: uma chave nova mudaria todos os ID_ANONIMO.
+    """
+    segredo = os.environ.get(VARIAVEL_CHAVE)
+
+    if not segredo and os.path.exists(arquivo):
+        with open(arquivo, encoding="utf-8") as f:
+            segredo = f.read().strip()
+
+    if not segredo and not criar:
+        raise FileNotFoundError(
+            f"Chave de anonimização não encontrada ('{arquivo}' nem ${VARIAVEL_CHAVE}), mas já existe "
+            "base tratada gerada com uma chave. Restaure a chave original: uma nova mudaria os ID_ANONIMO."
+        )
+
+    if not segredo:
+        segredo = secrets.token_hex(32)
+        with open(arquivo, "w", encoding="utf-8") as f:
+            f.write(segredo)
+        os.chmod(arquivo, 0o600)
+        print(f"🔑 Nova chave de anonimização gerada em '{arquivo}'. Guarde-a: sem ela os IDs mudam.")
+
+    # 12 bytes do sha256 em base64 = 16 caracteres ASCII (96 bits de chave)
+    return base64.b64encode(hashlib.sha256(segredo.encode("utf-8")).digest()[:12]).decode("ascii")
+
+
+def normalizar_codigo(serie: pd.Series) -> pd.Series:
+    """
+    Forma canônica do código como texto, para que o hash não dependa do dtype
+    inferido na leitura: 123, 123.0 e "123" viram "123". Nulos continuam nulos.
+    """
+    texto = serie.astype("string").str.strip()
+    numeros = pd.to_numeric(serie, errors="coerce")
+    inteiros = numeros.where(numeros.notna() & (numeros % 1 == 0))
+    return texto.mask(inteiros.notna(), inteiros.astype("Int64").astype("string"))
+
+
+def hash_codigo(serie: pd.Series, chave: str | None = None) -> pd.Series:
+    """
+    Hash com chave (SipHash-2-4, vetorizado pelo pandas) de cada código, como
+    `UInt64`. Códigos ausentes resultam em nulo.
+    """
+    canonico = normalizar_codigo(serie)
+    hashes = pd.util.hash_pandas_object(canonico, index=False, hash_key=chave or obter_chave())
+    return hashes.astype("UInt64").mask(canonico.isna())
+
+
+def anonimizar(df: pd.DataFrame, chave: str | None = None) -> pd.DataFrame:
+    """Substitui CD_ALUNO_INEP por ID_ANONIMO (hash com chave, `UInt64`)."""
+    if COLUNA_ORIGEM not in df.columns:
+        return df
+    df[COLUNA_ID] = hash_codigo(df[COLUNA_ORIGEM], chave)
+    df.drop(columns=[COLUNA_ORIGEM], inplace=True)
+    return df
@@ -0,0 +1,199 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+import pandas as pd
+import polars as pl
+
+from backend_consultas import varrer_base
+from cache_resultados import versao_base
+from clusters_descritores import clusters_por_k
+from correlacao_descritores import corr_descritores
+from rede_descritores import indice_arestas, salvar_indice
+from tratamento_base_unificada import gravar_json_atomico
+
+# --- Configuração dos artefatos de correlação ---
+# Por disciplina: taxa de acerto suavizada por escola × descritor, correlação
+# par a par entre descritores, o índice de arestas da rede e os clusters de cada
+# k, nos arquivos que a página "Descobrindo Relações" lê (data/corr_descritores_<sigla>.csv,
+# data/arestas_descritores_<sigla>.npz, data/clusters_descritores_<sigla>.csv e
+# data/silhueta_descritores_<sigla>.csv). Um manifesto guarda a impressão digital
+# da base e dos parâmetros de cada disciplina: sem mudança, nada é refeito.
+# Os arquivos de data/ são versionados; com `--derivados`, arestas e clusters são
+# refeitos só a partir das matrizes de correlação já gravadas, sem ler a base.
+# Caminhos relativos à raiz do projeto, não à pasta de onde o script é chamado.
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_BASE = os.path.join(RAIZ, "data", "base_tratada.parquet")
+PASTA_SAIDA = os.path.join(RAIZ, "data")
+MANIFESTO = "_correlacoes.json"
+
+COL_ESCOLA = "CD_ESCOLA"
+COL_DESCRITOR = "CD_DESCRITOR"
+COL_DISCIPLINA = "NM_DISCIPLINA"
+MIN_ESCOLAS_POR_DESCRITOR = 30      # filtra descritores muito raros
+MIN_PONTOS_PARA_PAREAR = 20         # min_periods da correlação
+SMOOTH_A = 1                        # Laplace: (acertos + a) / (acertos + erros + 2a)
+
+SIGLAS = {"LÍNGUA PORTUGUESA": "LP", "MATEMÁTICA": "MAT"}
+
+
+def sigla_disciplina(disciplina: str) -> str:
+    """Sigla usada nos nomes dos arquivos (LP, MAT; outras disciplinas, o nome sem espaços)."""
+    return SIGLAS.get(disciplina.strip().upper(), "_".join(disciplina.split()).upper())
+
+
+def caminhos_artefatos(sigla: str, pasta_saida: str = PASTA_SAIDA) -> dict:
+    return {
+        "corr": os.path.join(pasta_saida, f"corr_descritores_{sigla}.csv"),
+        "n": os.path.join(pasta_saida, f"n_pares_descritores_{sigla}.csv"),
+        "arestas": os.path.join(pasta_saida, f"arestas_descritores_{sigla}.npz"),
+        "clusters": os.path.join(pasta_saida, f"clusters_descritores_{sigla}.csv"),
+        "silhueta": os.path.join(pasta_saida, f"silhueta_descritores_{sigla}.csv"),
+    }
+
+
+def _escolas_descritores(caminho_base: str) -> pl.LazyFrame:
+    """Leitura lazy só das colunas usadas (ver backend_consultas.varrer_base), com os textos já limpos."""
+    return (
+        varrer_base(caminho_base)
+        .select(COL_DISCIPLINA, COL_ESCOLA, COL_DESCRITOR, "QTD_ACERTOS", "QTD_ERROS")
+        .drop_nulls([COL_DISCIPLINA, COL_ESCOLA, COL_DESCRITOR])
+        .with_columns(
+            pl.col(COL_DISCIPLINA).str.strip_chars(),
+            pl.col(COL_ESCOLA).cast(pl.String),
+            pl.col(COL_DESCRITOR).str.strip_chars(),
+            pl.col("QTD_ACERTOS", "QTD_ERROS").cast(pl.Float64, strict=False).fill_null(0),
+        )
+    )
+
+
+def matriz_escolas(linhas: pl.LazyFrame, disciplina: str, smooth_a: float = SMOOTH_A,
+                   min_escolas: int = MIN_ESCOLAS_POR_DESCRITOR) -> pd.DataFrame:
+    """Taxa suavizada por escola (linhas) × descritor (colunas, em ordem); NaN onde a escola não tem dado."""
+    agregado = (
+        linhas.filter(pl.col(COL_DISCIPLINA) == disciplina)
+        .group_by(COL_ESCOLA, COL_DESCRITOR)
+        .agg(pl.col("QTD_ACERTOS").sum().alias("acertos"), pl.col("QTD_ERROS").sum().alias("erros"))
+        .with_columns(
+            ((pl.col("acertos") + smooth_a) / (pl.col("acertos") + pl.col("erros") + 2 * smooth_a)).alias("tx_acerto")
+        )
+        .filter(pl.len().over(COL_DESCRITOR) >= min_escolas)
+        .collect()
+    )
+    matriz = agregado.to_pandas().pivot(index=COL_ESCOLA, columns=COL_DESCRITOR, values="tx_acerto")
+    return matriz.sort_index().sort_index(axis=1)
+
+
+def impressao_digital(caminho_base: str, parametros: dict) -> str:
+    """sha256 da versão da base (tamanho e mtime dos parquets) e dos parâmetros."""
+    assinatura = (versao_base(caminho_base, catalogos=[]), sorted(parametros.items()))
+    return hashlib.sha256(repr(assinatura).encode()).hexdigest()
+
+
+def _ler_manifesto(pasta_saida: str) -> dict:
+    caminho = os.path.join(pasta_saida, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {"disciplinas": {}}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_csv_atomico(quadro: pd.DataFrame, caminho: str, index: bool):
+    temporario = f"{caminho}.tmp"
+    quadro.to_csv(temporario, index=index)
+    os.replace(temporario, caminho)
+
+
+def _gravar_derivados(corr: pd.DataFrame, caminhos: dict) -> dict:
+    """Índice de arestas e clusters de uma matriz de correlação, gravados em `caminhos`. Retorna o índice."""
+    arestas = indice_arestas(corr)
+    rotulos, silhueta = clusters_por_k(corr)
+
+    # o np.savez acrescenta ".npz" a nomes sem essa extensão
+    temporario = caminhos["arestas"].replace(".npz", ".tmp.npz")
+    salvar_indice(arestas, temporario)
+    os.replace(temporario, caminhos["arestas"])
+    _gravar_csv_atomico(rotulos, caminhos["clusters"], index=True)
+    _gravar_csv_atomico(silhueta, caminhos["silhueta"], index=False)
+    return arestas
+
+
+def gerar_derivados(pasta_saida: str = PASTA_SAIDA) -> dict:
+    """
+    Refaz o índice de arestas e os clusters de cada `corr_descritores_<sigla>.csv`
+    já gravado em `pasta_saida`, sem ler a base (ex.: matrizes versionadas).
+    Retorna sigla -> caminhos dos arquivos.
+    """
+    gerados = {}
+    for caminho_corr in sorted(glob.glob(os.path.join(pasta_saida, "corr_descritores_*.csv"))):
+        sigla = os.path.basename(caminho_corr)[len("corr_descritores_"):-len(".csv")]
+        caminhos = caminhos_artefatos(sigla, pasta_saida)
+        arestas = _gravar_derivados(pd.read_csv(caminho_corr, index_col=0), caminhos)
+        gerados[sigla] = caminhos
+        print(f"✅ {sigla}: {len(arestas['nomes'])} descritores, {len(arestas['peso'])} pares com correlação.")
+    return gerados
+
+
+def gerar_artefatos(caminho_base: str = CAMINHO_BASE, pasta_saida: str = PASTA_SAIDA,
+                    smooth_a: float = SMOOTH_A, min_escolas: int = MIN_ESCOLAS_POR_DESCRITOR,
+                    min_periods: int = MIN_PONTOS_PARA_PAREAR, forcar: bool = False) -> dict:
+    """
+    Gera (ou reaproveita) os artefatos de cada disciplina da base. Uma disciplina
+    só é refeita se a base, os parâmetros ou os arquivos mudaram (ou com `forcar`).
+    Retorna sigla -> caminhos dos arquivos.
+    """
+    parametros = {"smooth_a": smooth_a, "min_escolas": min_escolas, "min_periods": min_periods}
+    impressao = impressao_digital(caminho_base, parametros)
+    os.makedirs(pasta_saida, exist_ok=True)
+    manifesto = _ler_manifesto(pasta_saida)
+
+    linhas = _escolas_descritores(caminho_base)
+    disciplinas = sorted(linhas.select(COL_DISCIPLINA).unique().collect()[COL_DISCIPLINA].to_list())
+
+    gerados = {}
+    for disciplina in disciplinas:
+        sigla = sigla_disciplina(disciplina)
+        caminhos = caminhos_artefatos(sigla, pasta_saida)
+        gerados[sigla] = caminhos
+
+        registro = manifesto["disciplinas"].get(sigla, {})
+        if not forcar and registro.get("impressao") == impressao and all(os.path.exists(c) for c in caminhos.values()):
+            print(f"⏭️ {disciplina}: base e parâmetros inalterados, artefatos mantidos.")
+            continue
+
+        matriz = matriz_escolas(linhas, disciplina, smooth_a, min_escolas)
+        corr, n_pares = corr_descritores(matriz, "pearson", min_periods)
+
+        _gravar_csv_atomico(corr, caminhos["corr"], index=True)
+        _gravar_csv_atomico(n_pares, caminhos["n"], index=True)
+        arestas = _gravar_derivados(corr, caminhos)
+
+        manifesto["disciplinas"][sigla] = {
+            "disciplina": disciplina, "impressao": impressao, "parametros": parametros,
+            "escolas": len(matriz), "descritores": len(corr), "pares": len(arestas["peso"]),
+        }
+        gravar_json_atomico(os.path.join(pasta_saida, MANIFESTO), manifesto)
+        print(f"✅ {disciplina}: {len(matriz):,} escolas × {len(corr)} descritores, "
+              f"{len(arestas['peso'])} pares com correlação.")
+
+    return gerados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera as correlações entre descritores lidas por 'Descobrindo Relações'")
+    parser.add_argument("--base", default=CAMINHO_BASE)
+    parser.add_argument("--saida", default=PASTA_SAIDA)
+    parser.add_argument("--smooth-a", type=float, default=SMOOTH_A)
+    parser.add_argument("--min-escolas", type=int, default=MIN_ESCOLAS_POR_DESCRITOR)
+    parser.add_argument("--min-periods", type=int, default=MIN_PONTOS_PARA_PAREAR)
+    parser.add_argument("--forcar", action="store_true", help="Refaz mesmo sem mudança na base ou nos parâmetros")
+    parser.add_argument("--derivados", action="store_true",
+                        help="Só refaz arestas e clusters a partir das matrizes corr_descritores_*.csv em --saida")
+    args = parser.parse_args()
+
+    if args.derivados:
+        gerar_derivados(args.saida)
+    else:
+        gerar_artefatos(args.base, args.saida, args.smooth_a, args.min_escolas, args.min_periods, args.forcar)
@@ -0,0 +1,448 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow.dataset as ds
+
+from analise_tendencias import crescimento, taxa_acerto
+from catalogo_descritores import ARQUIVOS_CATALOGO, anexar_nomes, carregar_catalogo
+from cubo_resultados import consultar_cubo, construir_cubo_df, filtro_efetivo
+from estatisticas_box import descrever_pesos, estatisticas_box, plano_box_polars
+from motor_filtros import arvore_opcoes, construir_indice, filtrar
+
+# --- Configuração dos backends de consulta ---
+# Tudo o que as abas de "Análise de Resultados" mostram sai de `consultar_resultados`,
+# num dict com as mesmas tabelas nos dois backends:
+#   "pandas": referência; fatia a base em memória (motor_filtros) e soma pelo cubo.
+#   "polars": um único plano lazy sobre o parquet — lê só as colunas usadas,
+#             com os textos como String, e roda as agregações em paralelo.
+#   "disco":  fora da memória; somas e um histograma (descritor × itens ×
+#             acertos × erros → linhas) saem em streaming direto da leitura, e
+#             boxplot e estatísticas vêm do histograma. A memória depende do
+#             número de combinações, não de linhas, então a página serve a base completa.
+BACKENDS = ["pandas", "polars", "disco"]
+BACKEND_PADRAO = os.environ.get("DIDALE_BACKEND_CONSULTAS", "pandas")
+
+COLUNAS_CONSULTA = [
+    "NM_AVALIACAO", "DT_REFERENCIA", "NM_DISCIPLINA", "CD_DESCRITOR",
+    "QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS",
+]
+COLUNAS_ESTATISTICAS = ["TX_ACERTO", "QTD_ITENS", "QTD_ACERTOS"]
+# Chaves das somas e do histograma do backend "disco" (ver plano_disco)
+CHAVES_SOMAS = ["NM_DISCIPLINA", "CD_DESCRITOR", "NM_AVALIACAO", "DT_REFERENCIA"]
+CHAVES_HISTOGRAMA = ["CD_DESCRITOR", "QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS"]
+# Colunas que a página carrega (TX_ACERTO é recalculado na carga)
+COLUNAS_PAGINA = COLUNAS_CONSULTA + ["NM_REGIONAL", "NM_MUNICIPIO", "NM_ESCOLA"]
+COLUNAS_TEXTO = ["NM_AVALIACAO", "NM_DISCIPLINA", "CD_DESCRITOR", "NM_REGIONAL", "NM_MUNICIPIO", "NM_ESCOLA"]
+ANO_ULTIMAS = 2025
+
+# Tolerância da comparação entre backends: somas têm de ser exatas; média,
+# desvio e quantis podem diferir no último dígito pela ordem das somas.
+TOLERANCIA_RELATIVA = 1e-9
+
+
+# =====================================
+# Carga da base da página
+# =====================================
+def _taxa(df: pd.DataFrame) -> np.ndarray:
+    return taxa_acerto(df["QTD_ACERTOS"], df["QTD_ERROS"])
+
+
+def _categoria(serie: pd.Series, limpar: bool = False) -> pd.Series:
+    """Texto como categoria; com `limpar`, sem espaços nas pontas."""
+    serie = serie.astype("category")
+    if limpar and not serie.cat.categories.equals(serie.cat.categories.astype(str).str.strip()):
+        serie = serie.astype(object).str.strip().astype("category")
+    return serie
+
+
+def normalizar_base(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tipos finais da base da página, feitos uma vez na carga: contagens
+    numéricas (acertos e erros nulos = 0), taxa de acerto ponderada por linha,
+    textos como categoria e CD_DESCRITOR sem espaços. Altera e devolve `df`;
+    depois disso, as interações só fatiam e agregam.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df["DT_REFERENCIA"]):
+        df["DT_REFERENCIA"] = pd.to_datetime(df["DT_REFERENCIA"], errors="coerce")
+    for col in ["QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS"]:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["QTD_ACERTOS"] = df["QTD_ACERTOS"].fillna(0)
+    df["QTD_ERROS"] = df["QTD_ERROS"].fillna(0)
+    df["TX_ACERTO"] = _taxa(df)
+
+    for col in COLUNAS_TEXTO:
+        if col in df.columns:
+            df[col] = _categoria(df[col], limpar=col == "CD_DESCRITOR")
+    return df
+
+
+def ler_base(caminho_base: str) -> pd.DataFrame:
+    """Só as colunas da página (arquivo, pasta incremental ou dataset particionado), já normalizadas."""
+    nomes = ds.dataset(caminho_base, format="parquet", partitioning="hive").schema.names
+    df = pd.read_parquet(caminho_base, columns=[c for c in COLUNAS_PAGINA if c in nomes])
+    return normalizar_base(df)
+
+
+def arvore_opcoes_disco(caminho_base: str) -> dict:
+    """
+    As mesmas opções de `motor_filtros.arvore_opcoes`, sem carregar a base: só
+    os pares distintos disciplina × descritor e regional × município × escola.
+    """
+    linhas = varrer_base(caminho_base)
+    texto = [c for c in COLUNAS_TEXTO if c != "NM_AVALIACAO"]
+    descritores, escolas = pl.collect_all([
+        linhas.select(texto[:2]).with_columns(pl.col("CD_DESCRITOR").str.strip_chars()).unique(),
+        linhas.select(texto[2:]).unique(),
+    ], streaming=True)
+    pares = pd.concat([descritores.to_pandas(), escolas.to_pandas()], ignore_index=True)
+    return arvore_opcoes(pares)
+
+
+def _tabela_descritores(somas: pd.DataFrame, catalogo: dict) -> pd.DataFrame:
+    """Descrições do catálogo anexadas às somas por descritor (poucas linhas), com a taxa."""
+    somas = somas.assign(CD_DESCRITOR=somas["CD_DESCRITOR"].astype(str))
+    tabela = anexar_nomes(somas, catalogo).sort_values(["CD_DESCRITOR", "NM_DESCRITOR"], ignore_index=True)
+    tabela["TX_ACERTO"] = _taxa(tabela)
+    return tabela
+
+
+# =====================================
+# Backend pandas (referência)
+# =====================================
+def resultados_pandas(df_filt: pd.DataFrame, df_agg: pd.DataFrame, catalogo: dict) -> dict:
+    """
+    Tabelas das abas a partir das linhas filtradas (`motor_filtros.filtrar` sobre
+    a base de `ler_base`) e das somas da seleção (`cubo_resultados.consultar_cubo`).
+    Não copia nem converte as linhas: isso já foi feito na carga.
+    """
+
+    # --- Últimas avaliações ---
+    ultimas = (
+        df_agg[df_agg["DT_REFERENCIA"].dt.year == ANO_ULTIMAS]
+        .groupby(["CD_DESCRITOR", "NM_AVALIACAO"], as_index=False, observed=True)
+        .agg({"QTD_ACERTOS": "sum", "QTD_ERROS": "sum"})
+    )
+    ultimas["TX_ACERTO"] = _taxa(ultimas)
+
+    # --- Série histórica e crescimento (último - primeiro registro) ---
+    serie = (
+        df_agg.groupby(["DT_REFERENCIA", "CD_DESCRITOR"], as_index=False, observed=True)
+        .agg({"QTD_ACERTOS": "sum", "QTD_ERROS": "sum"})
+    )
+    serie["TX_ACERTO"] = _taxa(serie)
+
+    variacao = crescimento(serie, ["CD_DESCRITOR"])
+
+    # --- Tabela por descritor (descrições anexadas após a soma) ---
+    tabela = _tabela_descritores(
+        df_agg.groupby(["CD_DESCRITOR", "NM_DISCIPLINA"], as_index=False, observed=True)
+        .agg({"QTD_ITENS": "sum", "QTD_ACERTOS": "sum", "QTD_ERROS": "sum"}),
+        catalogo,
+    )
+
+    # --- Boxplot: quartis, bigodes e outliers limitados, não as linhas ---
+    box, box_outliers = estatisticas_box(df_filt["CD_DESCRITOR"], df_filt["TX_ACERTO"])
+
+    return {
+        "ultimas": ultimas,
+        "serie": serie,
+        "crescimento": variacao,
+        "descritores": tabela,
+        "estatisticas": df_filt[COLUNAS_ESTATISTICAS].describe(),
+        "box": box,
+        "box_outliers": box_outliers,
+    }
+
+
+# =====================================
+# Backend polars (plano lazy)
+# =====================================
+def varrer_base(caminho_base: str) -> pl.LazyFrame:
+    """
+    Leitura lazy de um arquivo parquet ou de uma pasta (incremental ou
+    particionada), com os textos como String.
+
+    O ETL grava as categorias do pandas como colunas de dicionário, que o polars
+    lê como Categorical: um filtro sobre elas empurrado para a leitura quebra o
+    leitor de parquet (pânico ou linhas erradas). Convertidas logo na leitura,
+    os filtros e os agrupamentos rodam sobre texto puro (o filtro fica depois da
+    conversão). Numa pasta, cada arquivo traz o seu dicionário, e o polars só
+    junta as colunas Categorical de arquivos diferentes (antes da conversão) com
+    o cache global de strings, ligado aqui para todo o processo.
+    """
+    if os.path.isdir(caminho_base):
+        pl.enable_string_cache()
+        linhas = pl.scan_parquet(os.path.join(caminho_base, "**", "*.parquet"), hive_partitioning=True)
+    else:
+        linhas = pl.scan_parquet(caminho_base)
+    return linhas.with_columns(pl.col(pl.Categorical).cast(pl.String))
+
+
+def _taxa_pl(acertos: str = "QTD_ACERTOS", erros: str = "QTD_ERROS") -> pl.Expr:
+    total = pl.col(acertos) + pl.col(erros)
+    return pl.when(total > 0).then(pl.col(acertos) / total * 100).otherwise(None).alias("TX_ACERTO")
+
+
+def _somas(linhas: pl.LazyFrame, chaves: list[str], medidas: list[str]) -> pl.LazyFrame:
+    return (
+        linhas.group_by(chaves)
+        .agg([pl.col(c).sum() for c in medidas])
+        .drop_nulls(chaves)
+        .sort(chaves)
+    )
+
+
+def linhas_polars(caminho_base: str, componente: str, nivel: str = "Estado",
+                  regiao: str | None = None, municipio: str | None = None, escola: str | None = None,
+                  descritores: list | None = None, colunas: list[str] = COLUNAS_CONSULTA) -> pl.LazyFrame:
+    """Leitura lazy das linhas da seleção da barra lateral: só as `colunas` pedidas, já nos tipos finais."""
+    _, coluna, valor = filtro_efetivo(nivel, regiao, municipio, escola)
+    filtro = pl.col("NM_DISCIPLINA") == componente
+    if coluna:
+        filtro &= pl.col(coluna) == valor
+    if descritores is not None:
+        filtro &= pl.col("CD_DESCRITOR").is_in(list(descritores))
+
+    # textos puros (ordenam como as categorias do pandas) e códigos sem espaços
+    return (
+        varrer_base(caminho_base)
+        .filter(filtro)
+        .select(colunas)
+        .with_columns(
+            pl.col("CD_DESCRITOR").str.strip_chars(),
+            pl.col("QTD_ITENS").cast(pl.Int64, strict=False),
+            pl.col("QTD_ACERTOS", "QTD_ERROS").cast(pl.Int64, strict=False).fill_null(0),
+        )
+        .with_columns(_taxa_pl())
+    )
+
+
+def plano_somas(linhas: pl.LazyFrame) -> dict:
+    """
+    Consultas lazy das abas que são somas: valem tanto sobre as linhas da seleção
+    (`linhas_polars`) quanto sobre somas parciais delas (`plano_disco`).
+    """
+    somas = ["QTD_ACERTOS", "QTD_ERROS"]
+
+    ultimas = (
+        _somas(linhas.filter(pl.col("DT_REFERENCIA").dt.year() == ANO_ULTIMAS), ["CD_DESCRITOR", "NM_AVALIACAO"], somas)
+        .with_columns(_taxa_pl())
+    )
+    serie = _somas(linhas, ["DT_REFERENCIA", "CD_DESCRITOR"], somas).with_columns(_taxa_pl())
+    variacao = (
+        serie.sort(["CD_DESCRITOR", "DT_REFERENCIA"])
+        .group_by("CD_DESCRITOR", maintain_order=True)
+        .agg(
+            pl.when(pl.len() > 1)
+            .then(pl.col("TX_ACERTO").last() - pl.col("TX_ACERTO").first())
+            .otherwise(0.0)
+            .alias("Crescimento")
+        )
+    )
+
+    # descrições entram depois, nas poucas linhas somadas (ver resultados_polars)
+    tabela = _somas(linhas, ["CD_DESCRITOR", "NM_DISCIPLINA"], ["QTD_ITENS"] + somas)
+
+    return {
+        "ultimas": ultimas,
+        "serie": serie,
+        "crescimento": variacao,
+        "descritores": tabela,
+    }
+
+
+def plano_polars(linhas: pl.LazyFrame) -> dict:
+    """Consultas lazy das abas sobre as linhas da seleção (`linhas_polars`)."""
+    estatisticas = linhas.select([
+        expr(c).alias(f"{c}|{nome}")
+        for c in COLUNAS_ESTATISTICAS
+        for nome, expr in [
+            ("count", lambda c: pl.col(c).count()),
+            ("mean", lambda c: pl.col(c).mean()),
+            ("std", lambda c: pl.col(c).std()),
+            ("min", lambda c: pl.col(c).min()),
+            ("25%", lambda c: pl.col(c).quantile(0.25, "linear")),
+            ("50%", lambda c: pl.col(c).quantile(0.5, "linear")),
+            ("75%", lambda c: pl.col(c).quantile(0.75, "linear")),
+            ("max", lambda c: pl.col(c).max()),
+        ]
+    ])
+
+    box, box_outliers = plano_box_polars(linhas)
+
+    return {
+        **plano_somas(linhas),
+        "estatisticas": estatisticas,
+        "box": box,
+        "box_outliers": box_outliers,
+    }
+
+
+def plano_disco(linhas: pl.LazyFrame) -> tuple[pl.LazyFrame, pl.LazyFrame]:
+    """
+    As duas agregações que o backend "disco" executa em streaming sobre a leitura:
+    somas por disciplina × descritor × avaliação × data (de onde saem as consultas
+    de `plano_somas`) e o histograma descritor × itens × acertos × erros → linhas
+    (de onde saem boxplot e estatísticas, exatos). Nenhuma guarda linhas da base.
+    """
+    somas = linhas.group_by(CHAVES_SOMAS).agg(pl.col("QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS").sum())
+    histograma = linhas.group_by(CHAVES_HISTOGRAMA).agg(pl.len().alias("QTD_LINHAS")).with_columns(_taxa_pl())
+    return somas, histograma
+
+
+def _resultados_histograma(histograma: pd.DataFrame) -> dict:
+    """Estatísticas e boxplot a partir do histograma de `plano_disco`, como se fossem das linhas."""
+    box, box_outliers = estatisticas_box(histograma["CD_DESCRITOR"], histograma["TX_ACERTO"],
+                                         pesos=histograma["QTD_LINHAS"])
+    estatisticas = pd.DataFrame({
+        c: descrever_pesos(histograma[c].astype("float64"), histograma["QTD_LINHAS"])
+        for c in COLUNAS_ESTATISTICAS
+    })
+    return {"estatisticas": estatisticas, "box": box, "box_outliers": box_outliers}
+
+
+def resultados_polars(caminho_base: str, componente: str, nivel: str = "Estado",
+                      regiao: str | None = None, municipio: str | None = None, escola: str | None = None,
+                      descritores: list | None = None, catalogo: dict | None = None,
+                      streaming: bool = False) -> dict:
+    """
+    Roda as consultas de `plano_polars` em paralelo sobre a seleção e devolve
+    pandas, como a referência. Com `streaming`, só as agregações de `plano_disco`
+    passam pela leitura (em lotes): a memória não depende das linhas da seleção.
+    """
+    linhas = linhas_polars(caminho_base, componente, nivel, regiao, municipio, escola, descritores)
+    if streaming:
+        somas, histograma = pl.collect_all(list(plano_disco(linhas)), streaming=True)
+        plano = plano_somas(somas.lazy())
+        resultados = {nome: quadro.to_pandas() for nome, quadro in zip(plano, pl.collect_all(list(plano.values())))}
+        resultados.update(_resultados_histograma(histograma.to_pandas()))
+        resultados["descritores"] = _tabela_descritores(resultados["descritores"], catalogo)
+        return resultados
+
+    plano = plano_polars(linhas)
+    quadros = dict(zip(plano, pl.collect_all(list(plano.values()))))
+
+    resultados = {nome: quadro.to_pandas() for nome, quadro in quadros.items()}
+    linha = resultados["estatisticas"].iloc[0]
+    resultados["estatisticas"] = pd.DataFrame({
+        c: {nome.split("|")[1]: float(linha[nome]) for nome in linha.index if nome.startswith(f"{c}|")}
+        for c in COLUNAS_ESTATISTICAS
+    })
+    resultados["box"] = resultados["box"].set_index("CD_DESCRITOR")
+    resultados["descritores"] = _tabela_descritores(resultados["descritores"], catalogo)
+    return resultados
+
+
+def consultar_resultados(backend: str, caminho_base: str, componente: str, nivel: str = "Estado",
+                         regiao: str | None = None, municipio: str | None = None, escola: str | None = None,
+                         descritores: list | None = None, catalogo: dict | None = None,
+                         df: pd.DataFrame | None = None, indice: dict | None = None,
+                         cubo: pd.DataFrame | None = None) -> dict:
+    """
+    Tabelas das abas no backend escolhido. O pandas usa a base, o índice e o
+    cubo já carregados (`df`, `indice`, `cubo`); o polars e o disco leem
+    `caminho_base` direto.
+    """
+    if backend in ("polars", "disco"):
+        return resultados_polars(caminho_base, componente, nivel, regiao, municipio, escola,
+                                 descritores, catalogo, streaming=backend == "disco")
+    if backend != "pandas":
+        raise ValueError(f"Backend desconhecido: {backend} (opções: {BACKENDS})")
+
+    selecao = dict(regiao=regiao, municipio=municipio, escola=escola, descritores=descritores)
+    df_filt = filtrar(df, indice, componente, nivel, **selecao)
+    df_agg = consultar_cubo(cubo, componente, nivel, **selecao)
+    return resultados_pandas(df_filt, df_agg, catalogo)
+
+
+# =====================================
+# Conferência entre os backends
+# =====================================
+def _numeros(quadro) -> pd.DataFrame:
+    quadro = quadro.to_frame() if isinstance(quadro, pd.Series) else quadro
+    # posições das linhas não entram na comparação; rótulos (descritor, estatística) sim
+    quadro = quadro.reset_index(drop=pd.api.types.is_integer_dtype(quadro.index))
+    quadro.columns = [str(c) for c in quadro.columns]
+    for col in quadro.columns:
+        if pd.api.types.is_numeric_dtype(quadro[col]):
+            quadro[col] = quadro[col].astype("float64")
+        elif not pd.api.types.is_datetime64_any_dtype(quadro[col]):
+            quadro[col] = quadro[col].astype(str)
+    return quadro
+
+
+def comparar_resultados(referencia: dict, outro: dict) -> list[str]:
+    """Diferenças entre as tabelas de dois backends (lista vazia = mesmos números)."""
+    diferencas = []
+    for nome, esperado in referencia.items():
+        esperado, obtido = _numeros(esperado), _numeros(outro[nome])
+        exato = nome not in ("estatisticas", "box", "box_outliers")
+        try:
+            pd.testing.assert_frame_equal(
+                esperado, obtido, check_dtype=False, check_exact=exato,
+                rtol=TOLERANCIA_RELATIVA, atol=0,
+            )
+        except AssertionError as erro:
+            diferencas.append(f"{nome}: {str(erro).splitlines()[0]}")
+    return diferencas
+
+
+def conferir_backends(caminho_base: str, catalogo: dict, selecoes_por_nivel: int = 3) -> int:
+    """
+    Roda os backends nas seleções da barra lateral (cada componente, com e sem
+    descritores, em todos os níveis) e confere se dão os mesmos números que o
+    pandas (e se as opções lidas do disco são as mesmas). Retorna o número de
+    seleções com diferença.
+    """
+    df = ler_base(caminho_base)
+    indice, cubo, opcoes = construir_indice(df), construir_cubo_df(df), arvore_opcoes(df)
+    opcoes_diferentes = arvore_opcoes_disco(caminho_base) != opcoes
+    if opcoes_diferentes:
+        print("❌ Opções da barra lateral lidas do disco diferem das da base carregada.")
+
+    selecoes = []
+    for componente in opcoes["componentes"]:
+        todos = opcoes["descritores"].get(componente, [])
+        for descritores in (todos, todos[::2]):
+            selecoes.append(dict(componente=componente, nivel="Estado", descritores=descritores))
+            for regiao in opcoes["regioes"][:selecoes_por_nivel]:
+                selecoes.append(dict(componente=componente, nivel="Regional", regiao=regiao, descritores=descritores))
+                for municipio in opcoes["municipios"].get(regiao, [])[:selecoes_por_nivel]:
+                    selecoes.append(dict(componente=componente, nivel="Município", regiao=regiao,
+                                         municipio=municipio, descritores=descritores))
+                    for escola in opcoes["escolas"].get(municipio, [])[:selecoes_por_nivel]:
+                        selecoes.append(dict(componente=componente, nivel="Escola", regiao=regiao,
+                                             municipio=municipio, escola=escola, descritores=descritores))
+
+    falhas = 0
+    for selecao in selecoes:
+        referencia = consultar_resultados("pandas", caminho_base, catalogo=catalogo,
+                                          df=df, indice=indice, cubo=cubo, **selecao)
+        diferencas = [
+            f"{backend}/{diferenca}"
+            for backend in BACKENDS[1:]
+            for diferenca in comparar_resultados(referencia, consultar_resultados(
+                backend, caminho_base, catalogo=catalogo, **selecao))
+        ]
+        if diferencas:
+            falhas += 1
+            rotulo = {k: v for k, v in selecao.items() if k != "descritores"}
+            print(f"❌ {rotulo}: " + "; ".join(diferencas))
+
+    print(f"{'✅' if not falhas else '⚠️'} {len(selecoes) - falhas}/{len(selecoes)} seleções com os mesmos números em todos os backends.")
+    return falhas + opcoes_diferentes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere se os backends (pandas, polars, disco) dão os mesmos números")
+    parser.add_argument("--base", default="data/base_amostra.parquet")
+    parser.add_argument("--catalogos", nargs="+", default=ARQUIVOS_CATALOGO)
+    parser.add_argument("--selecoes-por-nivel", type=int, default=3)
+    args = parser.parse_args()
+
+    catalogo = carregar_catalogo(args.catalogos)
+    raise SystemExit(1 if conferir_backends(args.base, catalogo, args.selecoes_por_nivel) else 0)
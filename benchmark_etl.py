@@ -0,0 +1,291 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from gerar_base_sintetica import ESCALAS, gerar_base_sintetica
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- Configuração do benchmark ---
+# Cada etapa roda num processo próprio, para que o pico de memória medido seja
+# só dela. Os resultados vão, uma linha JSON por etapa, para bench/resultados.jsonl.
+PASTA_BENCH = "bench"
+PAGINA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages", "Análise_de_Resultados.py")
+SESSOES_PAGINA = 3
+
+
+def _pico_rss_mb(quem) -> float | None:
+    if resource is None:
+        return None
+    pico = resource.getrusage(quem).ru_maxrss
+    # Linux informa em KiB; macOS, em bytes
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _rss_atual_mb() -> float | None:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _tamanho_mb(caminho: str | list[str]) -> float | None:
+    caminhos = [caminho] if isinstance(caminho, str) else caminho
+    if not all(os.path.exists(c) for c in caminhos):
+        return None
+    total = 0
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            total += sum(os.path.getsize(os.path.join(raiz, nome))
+                         for raiz, _, nomes in os.walk(caminho) for nome in nomes)
+        else:
+            total += os.path.getsize(caminho)
+    return round(total / 2**20, 2)
+
+
+# --- Etapas ---
+# Cada função recebe o CSV sintético e a pasta de trabalho da escala e devolve
+# o caminho (ou a lista de caminhos) do que gravou (ou None), ou a tupla
+# (caminho, métricas próprias).
+# Etapas posteriores reutilizam a saída do streaming.
+
+def _etapa_preparar_base(entrada, pasta):
+    from tratamento_base_unificada import preparar_base
+    saida = os.path.join(pasta, "base_tratada_completa.parquet")
+    preparar_base(entrada, saida)
+    return saida
+
+
+def _etapa_streaming(entrada, pasta):
+    from tratamento_base_unificada import preparar_base_streaming
+    saida = os.path.join(pasta, "base_tratada.parquet")
+    preparar_base_streaming(entrada, saida)
+    return saida
+
+
+def _etapa_paralela(entrada, pasta):
+    from tratamento_base_unificada import preparar_base_paralela
+    saida = os.path.join(pasta, "base_tratada_paralela.parquet")
+    preparar_base_paralela([entrada], saida)
+    return saida
+
+
+def _etapa_amostra(entrada, pasta):
+    from gerar_amostra import criar_amostra
+    saida = os.path.join(pasta, "base_amostra.parquet")
+    criar_amostra(os.path.join(pasta, "base_tratada.parquet"), saida)
+    return saida
+
+
+def _etapa_cubo(entrada, pasta):
+    from cubo_resultados import construir_cubo
+    saida = os.path.join(pasta, "cubo_base_tratada.parquet")
+    construir_cubo(os.path.join(pasta, "base_tratada.parquet"), saida)
+    return saida
+
+
+def _etapa_heatmap(entrada, pasta):
+    # correlações da página "Descobrindo Relações" a partir da base tratada da escala
+    from artefatos_correlacao import gerar_artefatos
+    gerados = gerar_artefatos(os.path.join(pasta, "base_tratada.parquet"), os.path.join(pasta, "correlacao"),
+                              forcar=True)
+    return [caminhos[tipo] for caminhos in gerados.values() for tipo in ("corr", "arestas")]
+
+
+def _selecoes_pagina(df) -> list[dict]:
+    """Seleções típicas da barra lateral: Estado e cada regional, nos dois componentes."""
+    selecoes = []
+    for componente in df["NM_DISCIPLINA"].dropna().unique():
+        selecoes.append({"componente": componente, "nivel": "Estado"})
+        for regiao in df["NM_REGIONAL"].dropna().unique():
+            selecoes.append({"componente": componente, "nivel": "Regional", "regiao": regiao})
+    return selecoes
+
+
+def _etapa_consultas_linhas(entrada, pasta):
+    import pandas as pd
+    df = pd.read_parquet(os.path.join(pasta, "base_tratada.parquet"))
+    for selecao in _selecoes_pagina(df):
+        filtro = df["NM_DISCIPLINA"] == selecao["componente"]
+        if selecao["nivel"] == "Regional":
+            filtro &= df["NM_REGIONAL"] == selecao["regiao"]
+        (df[filtro]
+         .groupby(["CD_DESCRITOR", "NM_AVALIACAO", "DT_REFERENCIA"], observed=True)[["QTD_ACERTOS", "QTD_ITENS"]]
+         .sum())
+    return None
+
+
+def _etapa_consultas_cubo(entrada, pasta):
+    import pandas as pd
+    from cubo_resultados import consultar_cubo
+    cubo = pd.read_parquet(os.path.join(pasta, "cubo_base_tratada.parquet"))
+    for selecao in _selecoes_pagina(cubo):
+        consultar_cubo(cubo, **selecao)
+    return None
+
+
+def _interagir(app) -> list[float]:
+    """Percorre a barra lateral como um usuário (componente, níveis e valores) e mede cada rerun."""
+    tempos = []
+
+    def rerun(widget, valor):
+        inicio = time.perf_counter()
+        widget.set_value(valor).run()
+        tempos.append(time.perf_counter() - inicio)
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+
+    rerun(app.sidebar.selectbox[0], app.sidebar.selectbox[0].options[-1])
+    for posicao, nivel in enumerate(["Regional", "Município", "Escola"], start=1):
+        rerun(app.sidebar.radio[0], nivel)
+        seletor = app.sidebar.selectbox[posicao]
+        rerun(seletor, seletor.options[min(1, len(seletor.options) - 1)])
+    return tempos
+
+
+def _etapa_pagina(entrada, pasta):
+    # a página lê data/base_amostra.parquet do diretório atual: aqui, a base tratada da escala
+    from streamlit.testing.v1 import AppTest
+    trabalho = os.path.join(pasta, "pagina")
+    os.makedirs(os.path.join(trabalho, "data"), exist_ok=True)
+    base = os.path.join(trabalho, "data", "base_amostra.parquet")
+    if not os.path.lexists(base):
+        os.symlink(os.path.abspath(os.path.join(pasta, "base_tratada.parquet")), base)
+
+    anterior = os.getcwd()
+    os.chdir(trabalho)
+    try:
+        # sessões simultâneas: cada uma fica viva até o fim, como abas abertas
+        sessoes, memoria, primeiras, reruns = [], [], [], []
+        for _ in range(SESSOES_PAGINA):
+            antes = _rss_atual_mb()
+            app = AppTest.from_file(PAGINA, default_timeout=3600)
+            inicio = time.perf_counter()
+            app.run()
+            primeiras.append(time.perf_counter() - inicio)
+            reruns += _interagir(app)
+            sessoes.append(app)
+            memoria.append(_rss_atual_mb() - antes if antes is not None else None)
+    finally:
+        os.chdir(anterior)
+
+    reruns.sort()
+    return None, {
+        "primeira_sessao_s": round(primeiras[0], 3),
+        "sessao_seguinte_s": round(primeiras[-1], 3),
+        "rerun_mediana_ms": round(reruns[len(reruns) // 2] * 1000, 1),
+        "rerun_max_ms": round(reruns[-1] * 1000, 1),
+        "memoria_primeira_sessao_mb": round(memoria[0], 1) if memoria[0] is not None else None,
+        "memoria_sessao_seguinte_mb": round(memoria[-1], 1) if memoria[-1] is not None else None,
+    }
+
+
+ETAPAS = {
+    "preparar_base": _etapa_preparar_base,
+    "streaming": _etapa_streaming,
+    "paralela": _etapa_paralela,
+    "amostra": _etapa_amostra,
+    "cubo": _etapa_cubo,
+    "heatmap": _etapa_heatmap,
+    "consultas_linhas": _etapa_consultas_linhas,
+    "consultas_cubo": _etapa_consultas_cubo,
+    "pagina": _etapa_pagina,
+}
+
+
+def executar_etapa(etapa: str, entrada: str, pasta: str) -> dict:
+    """Roda uma etapa no processo atual e mede tempo, pico de memória e tamanho da saída."""
+    inicio = time.perf_counter()
+    # as mensagens das etapas vão para stderr; stdout fica só com o resultado
+    with contextlib.redirect_stdout(sys.stderr):
+        saida = ETAPAS[etapa](entrada, pasta)
+    tempo = time.perf_counter() - inicio
+    # etapas podem devolver (saída, métricas próprias)
+    saida, metricas = saida if isinstance(saida, tuple) else (saida, {})
+
+    return {
+        "etapa": etapa,
+        "tempo_s": round(tempo, 3),
+        "pico_rss_mb": _pico_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "pico_rss_filhos_mb": _pico_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        "saida_mb": _tamanho_mb(saida) if saida else None,
+        **metricas,
+    }
+
+
+def rodar_benchmark(escalas: list[str], etapas: list[str] | None = None,
+                    pasta: str = PASTA_BENCH, seed: int = 42, verbose: bool = False) -> list[dict]:
+    """
+    Gera (ou reutiliza) a base sintética de cada escala e roda as etapas em
+    subprocessos, acrescentando os resultados em `pasta/resultados.jsonl`.
+    """
+    etapas = etapas or list(ETAPAS)
+    os.makedirs(pasta, exist_ok=True)
+    arquivo_resultados = os.path.join(pasta, "resultados.jsonl")
+    rodada = datetime.now().isoformat(timespec="seconds")
+    resultados = []
+
+    for escala in escalas:
+        entrada = os.path.join(pasta, "dados", f"base_unificada_{escala}.csv.gz")
+        if not os.path.exists(entrada):
+            gerar_base_sintetica(ESCALAS.get(escala) or int(escala), entrada, seed=seed)
+
+        trabalho = os.path.join(pasta, f"trabalho_{escala}")
+        os.makedirs(trabalho, exist_ok=True)
+        print(f"📏 Escala {escala}: {_tamanho_mb(entrada)} MB compactados")
+
+        for etapa in etapas:
+            processo = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--executar-etapa", etapa,
+                 "--entrada", entrada, "--pasta", trabalho],
+                stdout=subprocess.PIPE, stderr=None if verbose else subprocess.PIPE, text=True,
+            )
+            if processo.returncode != 0:
+                print(f"❌ {etapa} falhou:\n{processo.stderr or ''}")
+                resultado = {"etapa": etapa, "erro": processo.returncode}
+            else:
+                resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+                print(f"   ↳ {etapa:<17} {resultado['tempo_s']:>9.2f} s  "
+                      f"{resultado['pico_rss_mb'] or 0:>9.1f} MB  saída {resultado['saida_mb'] or '-'} MB")
+
+            resultado.update({
+                "escala": escala,
+                "rodada": rodada,
+                "processadores": os.cpu_count(),
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+            })
+            resultados.append(resultado)
+            with open(arquivo_resultados, "a", encoding="utf-8") as f:
+                f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+    print(f"💾 Resultados salvos em: {arquivo_resultados}")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do ETL sobre bases sintéticas")
+    parser.add_argument("--escalas", nargs="+", default=["100k", "1M"],
+                        help=f"Escalas ({', '.join(ESCALAS)}) ou número de linhas")
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS), default=None)
+    parser.add_argument("--pasta", default=PASTA_BENCH)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="Mostra as mensagens das etapas")
+    parser.add_argument("--executar-etapa", choices=list(ETAPAS), help=argparse.SUPPRESS)
+    parser.add_argument("--entrada", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar_etapa:
+        print(json.dumps(executar_etapa(args.executar_etapa, args.entrada, args.pasta)))
+    else:
+        rodar_benchmark(args.escalas, args.etapas, args.pasta, args.seed, args.verbose)
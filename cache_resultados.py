@@ -0,0 +1,190 @@
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from catalogo_descritores import ARQUIVOS_CATALOGO
+from cubo_resultados import filtro_efetivo
+
+# --- Configuração do cache de resultados ---
+# Tabelas das abas (dict de `backend_consultas.consultar_resultados`) guardadas
+# por seleção normalizada e compartilhadas entre sessões. As entradas saem por
+# LRU quando o total passa do orçamento de memória e valem enquanto a versão
+# da base (e dos catálogos) não mudar; opcionalmente, também por idade.
+ORCAMENTO_MB = float(os.environ.get("DIDALE_CACHE_RESULTADOS_MB", "256"))
+TTL_SEGUNDOS = float(os.environ.get("DIDALE_CACHE_RESULTADOS_TTL", "0")) or None
+
+
+def criar_cache(orcamento_mb: float = ORCAMENTO_MB, ttl_segundos: float | None = TTL_SEGUNDOS) -> dict:
+    """Cache vazio: entradas em ordem de uso (mais antiga primeiro), contadores e trava."""
+    return {
+        "entradas": OrderedDict(),
+        "orcamento": int(orcamento_mb * 1024 ** 2),
+        "ttl": ttl_segundos,
+        "versao": None,
+        "bytes": 0,
+        "acertos": 0,
+        "falhas": 0,
+        "descartes": 0,
+        "invalidacoes": 0,
+        "trava": threading.Lock(),
+    }
+
+
+def chave_consulta(backend: str, caminho_base: str, componente: str, nivel: str = "Estado",
+                   regiao: str | None = None, municipio: str | None = None, escola: str | None = None,
+                   descritores: list | None = None) -> tuple:
+    """
+    Chave da seleção com a regra de filtro da página (`filtro_efetivo`): escolhas
+    que dão o mesmo recorte ("(Todas)" num nível, ordem dos descritores) caem na
+    mesma entrada.
+    """
+    nivel_efetivo, _, valor = filtro_efetivo(nivel, regiao, municipio, escola)
+    if descritores is not None:
+        descritores = tuple(sorted({str(d) for d in descritores}))
+    return (backend, os.path.abspath(caminho_base), componente, nivel_efetivo, valor, descritores)
+
+
+def versao_base(caminho_base: str, catalogos: list[str] = ARQUIVOS_CATALOGO) -> tuple:
+    """Assinatura (caminho, tamanho, modificação) dos parquets da base e dos catálogos de descritores."""
+    arquivos = [caminho_base]
+    if os.path.isdir(caminho_base):
+        arquivos = sorted(
+            os.path.join(pasta, nome)
+            for pasta, _, nomes in os.walk(caminho_base)
+            for nome in nomes if nome.endswith(".parquet")
+        )
+    assinatura = []
+    for caminho in arquivos + [c for c in catalogos if os.path.exists(c)]:
+        info = os.stat(caminho)
+        assinatura.append((caminho, info.st_size, info.st_mtime_ns))
+    return tuple(assinatura)
+
+
+def tamanho_resultados(resultados: dict) -> int:
+    """Bytes ocupados pelas tabelas (com índices e texto)."""
+    total = 0
+    for quadro in resultados.values():
+        if isinstance(quadro, pd.DataFrame):
+            total += int(quadro.memory_usage(index=True, deep=True).sum())
+        elif isinstance(quadro, pd.Series):
+            total += int(quadro.memory_usage(index=True, deep=True))
+    return total
+
+
+def _descartar(cache: dict, chave) -> None:
+    _, tamanho, _ = cache["entradas"].pop(chave)
+    cache["bytes"] -= tamanho
+
+
+def _limpar(cache: dict) -> None:
+    cache["entradas"].clear()
+    cache["bytes"] = 0
+
+
+def obter(cache: dict, chave: tuple, versao: tuple):
+    """Resultados guardados para `chave` (None se não houver ou se já venceram)."""
+    with cache["trava"]:
+        if cache["versao"] != versao:
+            if cache["entradas"]:
+                cache["invalidacoes"] += 1
+            _limpar(cache)
+            cache["versao"] = versao
+
+        entrada = cache["entradas"].get(chave)
+        if entrada is not None and cache["ttl"] and time.monotonic() - entrada[2] > cache["ttl"]:
+            _descartar(cache, chave)
+            entrada = None
+
+        if entrada is None:
+            cache["falhas"] += 1
+            return None
+        cache["acertos"] += 1
+        cache["entradas"].move_to_end(chave)
+        return entrada[0]
+
+
+def guardar(cache: dict, chave: tuple, versao: tuple, resultados: dict) -> None:
+    """Guarda os resultados e descarta os menos usados até caber no orçamento."""
+    tamanho = tamanho_resultados(resultados)
+    with cache["trava"]:
+        # base mudou durante o cálculo, ou a entrada sozinha não cabe: não guarda
+        if cache["versao"] != versao or tamanho > cache["orcamento"]:
+            return
+        if chave in cache["entradas"]:
+            _descartar(cache, chave)
+        cache["entradas"][chave] = (resultados, tamanho, time.monotonic())
+        cache["bytes"] += tamanho
+        while cache["bytes"] > cache["orcamento"]:
+            _descartar(cache, next(iter(cache["entradas"])))
+            cache["descartes"] += 1
+
+
+def consultar_em_cache(cache: dict, chave: tuple, versao: tuple, calcular) -> dict:
+    """
+    Resultados de `chave`, calculados por `calcular()` só na falta. As tabelas
+    devolvidas são compartilhadas entre sessões: quem usa não altera no lugar.
+    """
+    resultados = obter(cache, chave, versao)
+    if resultados is None:
+        resultados = calcular()
+        guardar(cache, chave, versao, resultados)
+    return resultados
+
+
+def estatisticas_cache(cache: dict) -> dict:
+    """Contadores do cache (para a página e para o benchmark)."""
+    with cache["trava"]:
+        consultas = cache["acertos"] + cache["falhas"]
+        return {
+            "entradas": len(cache["entradas"]),
+            "mb": cache["bytes"] / 1024 ** 2,
+            "orcamento_mb": cache["orcamento"] / 1024 ** 2,
+            "acertos": cache["acertos"],
+            "falhas": cache["falhas"],
+            "taxa_acertos": cache["acertos"] / consultas if consultas else 0.0,
+            "descartes": cache["descartes"],
+            "invalidacoes": cache["invalidacoes"],
+        }
+
+
+if __name__ == "__main__":
+    from backend_consultas import BACKEND_PADRAO, BACKENDS, consultar_resultados, ler_base
+    from catalogo_descritores import carregar_catalogo
+    from cubo_resultados import construir_cubo_df
+    from motor_filtros import arvore_opcoes, construir_indice
+
+    parser = argparse.ArgumentParser(description="Mede o cache de resultados nas seleções de cada regional")
+    parser.add_argument("--base", default="data/base_amostra.parquet")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND_PADRAO)
+    parser.add_argument("--orcamento-mb", type=float, default=ORCAMENTO_MB)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    df = ler_base(args.base)
+    indice, cubo, opcoes = construir_indice(df), construir_cubo_df(df), arvore_opcoes(df)
+    catalogo = carregar_catalogo()
+    cache = criar_cache(args.orcamento_mb)
+    versao = versao_base(args.base)
+
+    selecoes = [
+        dict(componente=componente, nivel="Regional", regiao=regiao,
+             descritores=opcoes["descritores"].get(componente, []))
+        for componente in opcoes["componentes"]
+        for regiao in opcoes["regioes"]
+    ]
+    for rodada in range(args.repeticoes):
+        inicio = time.perf_counter()
+        for selecao in selecoes:
+            chave = chave_consulta(args.backend, args.base, **selecao)
+            consultar_em_cache(cache, chave, versao, lambda: consultar_resultados(
+                args.backend, args.base, catalogo=catalogo, df=df, indice=indice, cubo=cubo, **selecao))
+        ms = (time.perf_counter() - inicio) * 1000 / len(selecoes)
+        print(f"⏱️ Rodada {rodada + 1}: {ms:.2f} ms por seleção ({len(selecoes)} seleções)")
+
+    info = estatisticas_cache(cache)
+    print(f"📦 {info['entradas']} entradas, {info['mb']:.1f}/{info['orcamento_mb']:g} MB; "
+          f"{info['acertos']} acertos, {info['falhas']} falhas, {info['descartes']} descartes.")
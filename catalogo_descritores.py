@@ -0,0 +1,74 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Configuração do catálogo de descritores ---
+# Os dois arquivos trazem os descritores do Paebes em codificações e separadores
+# diferentes (ISO-8859-1 com ";" e UTF-8 com BOM e ","). O catálogo lê os dois,
+# normaliza o texto, descarta as descrições truncadas ("Recon ...", mas mantém
+# "Reconhecer ...") e numera os códigos: as descrições entram só nas linhas já
+# agregadas, por um código inteiro.
+PASTA_DADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+ARQUIVOS_CATALOGO = [
+    os.path.join(PASTA_DADOS, "descritores_paebes_23_24.csv"),
+    os.path.join(PASTA_DADOS, "descritores_paebes.csv"),
+]
+CODIFICACOES = ["utf-8-sig", "ISO-8859-1"]
+DESCRICAO_TRUNCADA = r"^Recon\s"
+
+
+def ler_arquivo_catalogo(caminho: str) -> pd.DataFrame:
+    """CSV de descritores em qualquer das codificações e separadores usados no projeto."""
+    with open(caminho, "rb") as f:
+        bruto = f.read()
+    for codificacao in CODIFICACOES:
+        try:
+            texto = bruto.decode(codificacao)
+            break
+        except UnicodeDecodeError:
+            continue
+
+    cabecalho = texto.split("\n", 1)[0]
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    return pd.read_csv(io.StringIO(texto), sep=separador, dtype=str)
+
+
+def carregar_catalogo(caminhos: list[str] = ARQUIVOS_CATALOGO) -> dict:
+    """
+    Catálogo unificado: `codigos` (Index ordenado dos CD_DESCRITOR; a posição é
+    o código inteiro) e `nomes` (ID_DESCRITOR, CD_DESCRITOR, NM_DESCRITOR, um
+    por descrição distinta — um descritor pode ter mais de uma redação).
+    """
+    partes = [ler_arquivo_catalogo(c)[["CD_DESCRITOR", "NM_DESCRITOR"]] for c in caminhos if os.path.exists(c)]
+    if not partes:
+        raise FileNotFoundError(f"Nenhum catálogo de descritores encontrado: {caminhos}")
+
+    nomes = pd.concat(partes, ignore_index=True).dropna(subset=["CD_DESCRITOR"])
+    nomes["CD_DESCRITOR"] = nomes["CD_DESCRITOR"].str.strip()
+    nomes["NM_DESCRITOR"] = nomes["NM_DESCRITOR"].astype(str).str.strip()
+    nomes = nomes[~nomes["NM_DESCRITOR"].str.match(DESCRICAO_TRUNCADA)].drop_duplicates()
+
+    codigos = pd.Index(sorted(nomes["CD_DESCRITOR"].unique()), name="CD_DESCRITOR")
+    nomes.insert(0, "ID_DESCRITOR", codigos.get_indexer(nomes["CD_DESCRITOR"]).astype(np.int32))
+    nomes = nomes.sort_values(["ID_DESCRITOR", "NM_DESCRITOR"], ignore_index=True)
+    return {"codigos": codigos, "nomes": nomes}
+
+
+def codigos_descritores(catalogo: dict, descritores) -> np.ndarray:
+    """Código inteiro de cada CD_DESCRITOR (-1 para os que não estão no catálogo)."""
+    return catalogo["codigos"].get_indexer(pd.Index(descritores).astype(str))
+
+
+def anexar_nomes(agregado: pd.DataFrame, catalogo: dict, coluna: str = "CD_DESCRITOR") -> pd.DataFrame:
+    """
+    Junta NM_DESCRITOR às linhas agregadas pelo código inteiro (junção interna:
+    descritores fora do catálogo saem; com mais de uma redação, a linha se repete).
+    """
+    ids = codigos_descritores(catalogo, agregado[coluna])
+    return (
+        agregado.assign(ID_DESCRITOR=ids)
+        .merge(catalogo["nomes"][["ID_DESCRITOR", "NM_DESCRITOR"]], on="ID_DESCRITOR", how="inner")
+        .drop(columns="ID_DESCRITOR")
+    )
@@ -0,0 +1,62 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.metrics import pairwise_distances, silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+# --- Configuração dos clusters de descritores ---
+# Cada descritor é descrito pela sua linha da matriz de correlação (NaN = 0,
+# padronizada). Os agrupamentos de todos os k do slider da página saem de uma
+# vez, com a silhueta de cada k (calculada sobre uma única matriz de distâncias),
+# e ficam em arquivo ao lado da correlação: mover o slider só escolhe a coluna.
+K_MIN = 2
+K_MAX = 10
+N_INIT = 10
+RANDOM_STATE = 42
+
+
+def caracteristicas(corr: pd.DataFrame) -> np.ndarray:
+    """Linhas da matriz de correlação padronizadas (as mesmas usadas pela página até aqui)."""
+    return StandardScaler().fit_transform(corr.fillna(0))
+
+
+def clusters_por_k(corr: pd.DataFrame, k_min: int = K_MIN, k_max: int = K_MAX) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    KMeans para cada k em [k_min, k_max] (limitado ao número de descritores - 1).
+    Retorna `(rótulos, silhueta)`: rótulos com uma coluna por k (índice = descritor)
+    e a silhueta média de cada k.
+    """
+    x = caracteristicas(corr)
+    distancias = pairwise_distances(x)
+    ks = range(k_min, min(k_max, len(corr) - 1) + 1)
+
+    rotulos, silhuetas = {}, []
+    for k in ks:
+        rotulos[k] = KMeans(n_clusters=k, random_state=RANDOM_STATE, n_init=N_INIT).fit_predict(x)
+        silhuetas.append(silhouette_score(distancias, rotulos[k], metric="precomputed"))
+
+    rotulos = pd.DataFrame(rotulos, index=corr.columns)
+    rotulos.index.name = "Descritor"
+    silhueta = pd.DataFrame({"k": list(ks), "silhueta": silhuetas})
+    return rotulos, silhueta
+
+
+def carregar_clusters(caminho_rotulos: str, caminho_silhueta: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    rotulos = pd.read_csv(caminho_rotulos, index_col=0)
+    rotulos.columns = rotulos.columns.astype(int)
+    return rotulos, pd.read_csv(caminho_silhueta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clusters dos descritores para cada k, a partir de uma matriz de correlação (CSV)")
+    parser.add_argument("--corr", default="data/corr_descritores_LP.csv")
+    parser.add_argument("--k-min", type=int, default=K_MIN)
+    parser.add_argument("--k-max", type=int, default=K_MAX)
+    args = parser.parse_args()
+
+    rotulos, silhueta = clusters_por_k(pd.read_csv(args.corr, index_col=0), args.k_min, args.k_max)
+    melhor = silhueta.loc[silhueta["silhueta"].idxmax()]
+    print(silhueta.to_string(index=False, float_format="{:.3f}".format))
+    print(f"🏆 Maior silhueta: k = {int(melhor['k'])} ({melhor['silhueta']:.3f}).")
@@ -0,0 +1,193 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Configuração do motor de correlação ---
+# Correlação par a par só nas linhas em que os dois descritores têm valor (como
+# `DataFrame.corr(min_periods=...)`), mas em forma de matriz: contagens, somas e
+# somas de quadrados de cada par saem de produtos entre a matriz de valores e a
+# máscara de válidos, bloco a bloco de colunas (a memória depende do bloco).
+METODOS = ["pearson", "spearman"]
+TAMANHO_BLOCO = 256
+# Variância abaixo disto (relativa à soma de quadrados) é arredondamento: coluna constante no par
+VARIANCIA_NULA = 1e-12
+
+
+def _validos(matriz) -> tuple[np.ndarray, np.ndarray]:
+    x = np.asarray(matriz, dtype=np.float64)
+    return x, np.isfinite(x)
+
+
+def _pearson(x: np.ndarray, valido: np.ndarray, min_periods: int, tamanho_bloco: int) -> tuple[np.ndarray, np.ndarray]:
+    p = x.shape[1]
+    m = valido.astype(np.float64)
+    # cada coluna deslocada pela própria média: as somas dos pares ficam perto de
+    # zero e a fórmula de uma passada (soma dos produtos - produto das somas) não perde precisão
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.where(valido.any(axis=0), np.nansum(np.where(valido, x, 0.0), axis=0) / valido.sum(axis=0), 0.0)
+    z = np.where(valido, x - media, 0.0)
+    z2 = z * z
+
+    corr = np.full((p, p), np.nan)
+    n = np.zeros((p, p), dtype=np.int64)
+    for a in range(0, p, tamanho_bloco):
+        fa = slice(a, a + tamanho_bloco)
+        for b in range(a, p, tamanho_bloco):
+            fb = slice(b, b + tamanho_bloco)
+            nab = m[:, fa].T @ m[:, fb]
+            sx, sy = z[:, fa].T @ m[:, fb], m[:, fa].T @ z[:, fb]
+            sxx, syy = z2[:, fa].T @ m[:, fb], m[:, fa].T @ z2[:, fb]
+            sxy = z[:, fa].T @ z[:, fb]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                vx, vy = sxx - sx * sx / nab, syy - sy * sy / nab
+                r = (sxy - sx * sy / nab) / np.sqrt(vx * vy)
+            nula = (vx <= sxx * VARIANCIA_NULA) | (vy <= syy * VARIANCIA_NULA)
+            r[(nab < max(min_periods, 1)) | nula] = np.nan
+
+            corr[fa, fb], n[fa, fb] = r, np.rint(nab).astype(np.int64)
+            corr[fb, fa], n[fb, fa] = r.T, np.rint(nab).astype(np.int64).T
+    return corr, n
+
+
+def _grupos_empate(ordenados: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Para cada posição das colunas ordenadas: início e fim do seu grupo de valores iguais."""
+    k = len(ordenados)
+    posicao = np.arange(k)[:, None]
+    novo = np.ones(ordenados.shape, dtype=bool)
+    novo[1:] = ordenados[1:] != ordenados[:-1]
+    fim_grupo = np.ones(ordenados.shape, dtype=bool)
+    fim_grupo[:-1] = novo[1:]
+    inicio = np.maximum.accumulate(np.where(novo, posicao, 0), axis=0)
+    fim = np.minimum.accumulate(np.where(fim_grupo, posicao, k - 1)[::-1], axis=0)[::-1]
+    return inicio, fim
+
+
+def _postos(mascara_ordenada: np.ndarray, inicio: np.ndarray, fim: np.ndarray) -> np.ndarray:
+    """
+    Posto médio (empates = média) de cada posição contando só as linhas da
+    máscara: (válidas antes do grupo + válidas até o fim do grupo + 1) / 2.
+    """
+    acumulado = np.zeros((mascara_ordenada.shape[0] + 1, mascara_ordenada.shape[1]))
+    np.cumsum(mascara_ordenada, axis=0, out=acumulado[1:])
+    colunas = np.arange(mascara_ordenada.shape[1])
+    return (acumulado[inicio, colunas] + acumulado[fim + 1, colunas] + 1) / 2
+
+
+def _spearman(x: np.ndarray, valido: np.ndarray, min_periods: int, tamanho_bloco: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Postos refeitos em cada par (só nas linhas válidas nos dois), como o pandas.
+    Para cada coluna i e um bloco de colunas j: os postos de i sob a máscara de
+    cada j saem de uma soma acumulada na ordem de i, e os de cada j sob a
+    máscara de i, de somas acumuladas na ordem (pré-calculada) de cada j.
+    """
+    k, p = x.shape
+    m = valido.astype(np.float64)
+    ordem = np.argsort(np.where(valido, x, np.inf), axis=0, kind="stable")
+    ordenados = np.take_along_axis(np.where(valido, x, np.inf), ordem, axis=0)
+    inicio, fim = _grupos_empate(ordenados)
+    n_validos = valido.sum(axis=0)
+
+    corr = np.full((p, p), np.nan)
+    n = np.zeros((p, p), dtype=np.int64)
+    for i in range(p):
+        linhas_i = ordem[:n_validos[i], i]
+        for b in range(i, p, tamanho_bloco):
+            fb = slice(b, b + tamanho_bloco)
+            colunas = np.arange(fb.start, min(fb.stop, p))
+
+            # postos de i (na ordem de i) sob a máscara de cada j
+            par = m[linhas_i, fb]
+            postos_i = _postos(par, inicio[:n_validos[i], [i]], fim[:n_validos[i], [i]])
+
+            # postos de cada j (na ordem de j) sob a máscara de i, levados de volta às linhas
+            ordem_j = ordem[:, fb]
+            postos_j = np.empty((k, len(colunas)))
+            np.put_along_axis(postos_j, ordem_j, _postos(m[ordem_j, i], inicio[:, fb], fim[:, fb]), axis=0)
+            postos_j = postos_j[linhas_i]
+
+            nij = par.sum(axis=0)
+            media = (nij + 1) / 2
+            di, dj = (postos_i - media) * par, (postos_j - media) * par
+            with np.errstate(invalid="ignore", divide="ignore"):
+                vi, vj = (di * di).sum(axis=0), (dj * dj).sum(axis=0)
+                r = (di * dj).sum(axis=0) / np.sqrt(vi * vj)
+            r[(nij < max(min_periods, 1)) | (vi == 0) | (vj == 0)] = np.nan
+
+            corr[i, colunas], corr[colunas, i] = r, r
+            n[i, colunas], n[colunas, i] = nij, nij
+    return corr, n
+
+
+def correlacao_pareada(matriz, metodo: str = "pearson", min_periods: int = 1,
+                       tamanho_bloco: int = TAMANHO_BLOCO) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Correlação entre as colunas de `matriz` (linhas = escolas, colunas =
+    descritores; NaN = sem dado), usando em cada par só as linhas com os dois
+    valores. Retorna `(correlações, N de cada par)`; pares com N < `min_periods`
+    ou variância nula ficam NaN. Mesmo resultado de `DataFrame.corr`.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconhecido: {metodo} (opções: {METODOS})")
+    x, valido = _validos(matriz)
+    calcular = _pearson if metodo == "pearson" else _spearman
+    return calcular(x, valido, min_periods, tamanho_bloco)
+
+
+def corr_descritores(matriz: pd.DataFrame, metodo: str = "pearson", min_periods: int = 1,
+                     tamanho_bloco: int = TAMANHO_BLOCO) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """`correlacao_pareada` com os rótulos das colunas: matriz de correlação e matriz de N."""
+    corr, n = correlacao_pareada(matriz.to_numpy(dtype=np.float64, na_value=np.nan), metodo, min_periods, tamanho_bloco)
+    return (
+        pd.DataFrame(corr, index=matriz.columns, columns=matriz.columns),
+        pd.DataFrame(n, index=matriz.columns, columns=matriz.columns),
+    )
+
+
+def conferir_pandas(matriz: pd.DataFrame, min_periods: int = 1, tolerancia: float = 1e-12) -> dict:
+    """Diferença máxima para `DataFrame.corr` em cada método e os tempos dos dois lados."""
+    relatorio = {}
+    for metodo in METODOS:
+        inicio = time.perf_counter()
+        referencia = matriz.corr(method=metodo, min_periods=min_periods).to_numpy()
+        t_pandas = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        corr, _ = correlacao_pareada(matriz, metodo, min_periods)
+        t_motor = time.perf_counter() - inicio
+
+        mesmos_nulos = np.array_equal(np.isnan(referencia), np.isnan(corr))
+        if not mesmos_nulos:
+            diferenca = np.inf
+        else:
+            diferenca = float(np.nanmax(np.abs(referencia - corr))) if np.isfinite(corr).any() else 0.0
+        relatorio[metodo] = {"ok": mesmos_nulos and diferenca <= tolerancia, "diferenca": diferenca,
+                             "pandas_s": t_pandas, "motor_s": t_motor}
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere o motor de correlação contra o pandas numa matriz escola × descritor")
+    parser.add_argument("--escolas", type=int, default=2000)
+    parser.add_argument("--descritores", type=int, default=120)
+    parser.add_argument("--faltantes", type=float, default=0.3, help="Fração de células sem dado")
+    parser.add_argument("--min-periods", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # taxas suavizadas (acertos + 1) / (itens + 2): muitos empates, como nos dados reais
+    fator = rng.normal(size=(args.escolas, 1))
+    itens = rng.integers(1, 12, size=(args.escolas, args.descritores))
+    prob = 1 / (1 + np.exp(-(fator + rng.normal(size=(args.escolas, args.descritores)))))
+    taxas = (rng.binomial(itens, prob) + 1) / (itens + 2)
+    taxas[rng.random(taxas.shape) < args.faltantes] = np.nan
+    matriz = pd.DataFrame(taxas, columns=[f"D{j:03d}" for j in range(args.descritores)])
+
+    falhas = 0
+    for metodo, r in conferir_pandas(matriz, args.min_periods).items():
+        falhas += not r["ok"]
+        print(f"{'✅' if r['ok'] else '❌'} {metodo}: diferença máx. {r['diferenca']:.1e}; "
+              f"pandas {r['pandas_s']:.2f} s, motor {r['motor_s']:.2f} s")
+    raise SystemExit(1 if falhas else 0)
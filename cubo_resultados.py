@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# --- Configuração do cubo ---
+# Somas aditivas por descritor × avaliação × data em cada nível da barra lateral
+# de "Análise de Resultados". Qualquer gráfico da página é uma soma sobre as
+# linhas de um único nível, então o cubo substitui a base linha a linha.
+NIVEIS = {
+    "Estado": [],
+    "Regional": ["NM_REGIONAL"],
+    "Município": ["NM_REGIONAL", "NM_MUNICIPIO"],
+    "Escola": ["NM_REGIONAL", "NM_MUNICIPIO", "NM_ESCOLA"],
+}
+DIMENSOES = ["NM_DISCIPLINA", "CD_DESCRITOR", "NM_AVALIACAO", "DT_REFERENCIA"]
+MEDIDAS = ["QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS"]
+COLUNAS_BASE = NIVEIS["Escola"] + DIMENSOES + MEDIDAS
+
+# Filtro que a página aplica em cada nível (coluna, valor que significa "todos")
+FILTRO_NIVEL = {
+    "Regional": ("NM_REGIONAL", "(Todas)"),
+    "Município": ("NM_MUNICIPIO", "(Todos)"),
+    "Escola": ("NM_ESCOLA", "(Todas)"),
+}
+
+LINHAS_POR_LOTE = 1_000_000
+
+# Versão da base (cache_resultados.versao_base) gravada nos metadados do cubo:
+# cubo de outra versão não é servido, e é reconstruído pelo ETL ou pela CLI.
+METADADO_VERSAO = b"didale_versao_base"
+
+
+def _somar(df: pd.DataFrame, chaves: list[str]) -> pd.DataFrame:
+    return (
+        df.groupby(chaves, observed=True, dropna=False, sort=False)[MEDIDAS + ["QTD_LINHAS"]]
+        .sum()
+        .reset_index()
+    )
+
+
+def _montar_niveis(escolas: pd.DataFrame) -> pd.DataFrame:
+    """Rollup do nível mais fino (escola) para os demais, empilhados com a coluna NIVEL."""
+    partes = []
+    for nivel, chaves in NIVEIS.items():
+        parte = _somar(escolas, chaves + DIMENSOES)
+        partes.append(parte.assign(NIVEL=nivel))
+
+    cubo = pd.concat(partes, ignore_index=True)
+    for col in ["NIVEL"] + NIVEIS["Escola"] + DIMENSOES[:-1]:
+        cubo[col] = cubo[col].astype("category")
+    for col in MEDIDAS + ["QTD_LINHAS"]:
+        cubo[col] = cubo[col].astype("int64")
+    return cubo[["NIVEL"] + NIVEIS["Escola"] + DIMENSOES + MEDIDAS + ["QTD_LINHAS"]]
+
+
+def construir_cubo_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Cubo a partir de uma base já carregada em memória (ex.: a amostra)."""
+    base = df[[c for c in COLUNAS_BASE if c in df.columns]].assign(QTD_LINHAS=1)
+    return _montar_niveis(_somar(base, NIVEIS["Escola"] + DIMENSOES))
+
+
+def caminho_cubo(caminho_base: str) -> str:
+    """Local do cubo materializado de uma base: `data/base_x.parquet` -> `data/cubo_base_x.parquet`."""
+    pasta, nome = os.path.split(os.path.normpath(caminho_base))
+    return os.path.join(pasta, f"cubo_{nome.split('.')[0]}.parquet")
+
+
+def versao_cubo(caminho_base: str) -> str:
+    """Versão da base de que o cubo depende: `versao_base` dos parquets (sem os catálogos)."""
+    from cache_resultados import versao_base
+    return json.dumps(versao_base(os.path.abspath(caminho_base), catalogos=[]))
+
+
+def ler_cubo(caminho_base: str, caminho: str | None = None) -> pd.DataFrame | None:
+    """Cubo materializado da base, se existir e tiver sido construído da versão atual dela; senão None."""
+    caminho = caminho or caminho_cubo(caminho_base)
+    if not os.path.exists(caminho):
+        return None
+    metadados = pq.read_schema(caminho).metadata or {}
+    if metadados.get(METADADO_VERSAO) != versao_cubo(caminho_base).encode():
+        return None
+    return pd.read_parquet(caminho)
+
+
+def construir_cubo(caminho_base: str = r"data/base_tratada.parquet",
+                   caminho_saida: str | None = None,
+                   linhas_por_lote: int = LINHAS_POR_LOTE) -> pd.DataFrame:
+    """
+    Etapa do ETL que materializa o cubo de resultados. Lê só as colunas
+    necessárias da base tratada (arquivo, pasta incremental ou dataset
+    particionado) em lotes, soma cada lote no nível de escola e combina as somas
+    parciais, de modo que a memória depende do tamanho do cubo, não da base.
+    A versão da base lida vai nos metadados do arquivo (ver `ler_cubo`).
+    """
+
+    print("🔄 Construindo cubo de resultados...")
+    caminho_saida = caminho_saida or caminho_cubo(caminho_base)
+    # tomada antes da leitura: se a base mudar no meio, o cubo já nasce desatualizado
+    versao = versao_cubo(caminho_base)
+
+    dataset = ds.dataset(caminho_base, format="parquet", partitioning="hive")
+    colunas = [c for c in COLUNAS_BASE if c in dataset.schema.names]
+    chaves = [c for c in NIVEIS["Escola"] + DIMENSOES if c in colunas]
+
+    parciais = []
+    linhas = 0
+    for lote in dataset.to_batches(columns=colunas, batch_size=linhas_por_lote):
+        df = lote.to_pandas().assign(QTD_LINHAS=1)
+        for col in chaves:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(object)
+        parciais.append(_somar(df, chaves))
+        linhas += len(df)
+
+        # combina as parciais de tempos em tempos para não acumular memória
+        if len(parciais) >= 16:
+            parciais = [_somar(pd.concat(parciais, ignore_index=True), chaves)]
+
+    escolas = _somar(pd.concat(parciais, ignore_index=True), chaves)
+    cubo = _montar_niveis(escolas)
+
+    os.makedirs(os.path.dirname(caminho_saida) or ".", exist_ok=True)
+    tabela = pa.Table.from_pandas(cubo, preserve_index=False)
+    tabela = tabela.replace_schema_metadata({**tabela.schema.metadata, METADADO_VERSAO: versao.encode()})
+    temporario = f"{caminho_saida}.tmp"
+    pq.write_table(tabela, temporario)
+    os.replace(temporario, caminho_saida)
+    print(f"✅ Cubo com {len(cubo):,} linhas a partir de {linhas:,} registros.")
+    print(f"💾 Cubo salvo em: {caminho_saida}")
+
+    return cubo
+
+
+def filtro_efetivo(nivel: str, regiao: str | None = None, municipio: str | None = None,
+                   escola: str | None = None) -> tuple[str, str | None, str | None]:
+    """
+    Regra de filtro da página: o recorte do nível só vale quando um valor
+    específico foi escolhido; caso contrário, vale o Estado.
+    Retorna `(nível efetivo, coluna, valor)`, com coluna e valor None no Estado.
+    """
+    if nivel in FILTRO_NIVEL:
+        coluna, todos = FILTRO_NIVEL[nivel]
+        valor = {"Regional": regiao, "Município": municipio, "Escola": escola}[nivel]
+        if valor and valor != todos:
+            return nivel, coluna, valor
+    return "Estado", None, None
+
+
+def consultar_cubo(cubo: pd.DataFrame, componente: str, nivel: str = "Estado",
+                   regiao: str | None = None, municipio: str | None = None,
+                   escola: str | None = None, descritores: list | None = None) -> pd.DataFrame:
+    """
+    Somas por CD_DESCRITOR × NM_AVALIACAO × DT_REFERENCIA para a seleção da
+    barra lateral, com a mesma regra de filtro da página (ver `filtro_efetivo`).
+    """
+    nivel_efetivo, coluna, valor = filtro_efetivo(nivel, regiao, municipio, escola)
+
+    mascara = (cubo["NIVEL"] == nivel_efetivo) & (cubo["NM_DISCIPLINA"] == componente)
+    if coluna:
+        mascara &= cubo[coluna] == valor
+    if descritores is not None:
+        mascara &= cubo["CD_DESCRITOR"].isin(descritores)
+
+    selecao = cubo.loc[mascara, DIMENSOES + MEDIDAS + ["QTD_LINHAS"]]
+    return _somar(selecao, DIMENSOES).sort_values(DIMENSOES[1:], ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materializa o cubo de resultados")
+    parser.add_argument("--base", default=r"data/base_tratada.parquet")
+    parser.add_argument("--saida", default=None, help="Padrão: data/cubo_<nome da base>.parquet")
+    parser.add_argument("--se-desatualizado", action="store_true",
+                        help="Só reconstrói se o cubo não existir ou for de outra versão da base")
+    args = parser.parse_args()
+
+    if args.se_desatualizado and ler_cubo(args.base, args.saida) is not None:
+        print(f"✅ Cubo já está na versão atual da base: {args.saida or caminho_cubo(args.base)}")
+    else:
+        construir_cubo(args.base, args.saida)
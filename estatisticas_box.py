@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import polars as pl
+
+# --- Configuração do boxplot pré-calculado ---
+# Quartis (interpolação linear, como o Plotly), bigodes até o ponto mais
+# extremo dentro de 1,5 × IQR e, por descritor, no máximo LIMITE_OUTLIERS
+# pontos fora dos bigodes (espaçados igualmente entre os ordenados). O gráfico
+# recebe só essas estatísticas: o tamanho não depende do número de linhas.
+LIMITE_OUTLIERS = 50
+FATOR_IQR = 1.5
+COLUNAS_BOX = ["n", "q1", "mediana", "q3", "cerca_inferior", "cerca_superior"]
+
+
+def _quantil(valores: np.ndarray, inicio: np.ndarray, n: np.ndarray, p: float,
+             acumulado: np.ndarray | None = None) -> np.ndarray:
+    """
+    Quantil `p` de cada grupo de `valores` (ordenados dentro do grupo), como
+    `np.quantile` linear. Com `acumulado` (soma acumulada dos pesos), `inicio` e
+    `n` contam linhas, e cada valor vale pelo seu peso.
+    """
+    posicao = (n - 1) * p
+    baixo = np.floor(posicao).astype(np.int64)
+    t = posicao - baixo
+    vazio = n == 0
+    i_a = np.where(vazio, 0, inicio + baixo)
+    i_b = np.where(vazio, 0, inicio + np.minimum(baixo + 1, n - 1))
+    if acumulado is not None and len(valores):
+        # linha de ordem i -> valor que a cobre
+        i_a, i_b = (np.searchsorted(acumulado, i, side="right") for i in (i_a, i_b))
+    a = valores[i_a] if len(valores) else np.full(len(n), np.nan)
+    b = valores[i_b] if len(valores) else a
+    diferenca = b - a
+    quantil = np.where(t >= 0.5, b - diferenca * (1 - t), a + diferenca * t)
+    return np.where(vazio, np.nan, quantil)
+
+
+def _espacados(posicao: np.ndarray, total: np.ndarray, limite: int) -> np.ndarray:
+    """Máscara que mantém até `limite` posições igualmente espaçadas de cada grupo de tamanho `total`."""
+    return (posicao == 0) | ((posicao * limite) // total != ((posicao - 1) * limite) // total)
+
+
+def _outliers_pesos(total: np.ndarray, acumulado: np.ndarray, limite: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Os mesmos pontos de `_espacados` quando cada valor vale pelo seu peso: as
+    posições mantidas de um grupo de `total` linhas são 0 e ceil(j × total / limite).
+    Retorna `(grupo, índice do valor)` de cada ponto mantido, na ordem dos grupos.
+    """
+    grupos = np.flatnonzero(total)
+    j = np.arange(limite)
+    posicao = (j * total[grupos, None] + limite - 1) // limite
+    mantem = (posicao < total[grupos, None]) & ((j == 0) | (posicao != np.roll(posicao, 1, axis=1)))
+    inicio = (np.cumsum(total) - total)[grupos, None]
+    linha = (inicio + posicao)[mantem]
+    return np.broadcast_to(grupos[:, None], posicao.shape)[mantem], np.searchsorted(acumulado, linha, side="right")
+
+
+def estatisticas_box(rotulos, valores, limite_outliers: int = LIMITE_OUTLIERS,
+                     coluna: str = "CD_DESCRITOR", valor: str = "TX_ACERTO",
+                     pesos=None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Estatísticas do boxplot por rótulo, numa passada vetorizada (uma ordenação).
+    Retorna `(estatísticas, outliers)`: a primeira indexada pelo rótulo (em ordem
+    alfabética, inclusive rótulos sem valor válido, com NaN); a segunda com os
+    pontos fora dos bigodes, já limitados.
+
+    Com `pesos` (histograma: quantas linhas têm cada rótulo × valor), o resultado
+    é o mesmo das linhas repetidas, sem repeti-las.
+    """
+    codigos, nomes = pd.factorize(pd.Series(rotulos), sort=True)
+    nomes = np.asarray(nomes, dtype=object)
+    valores = np.asarray(valores, dtype=np.float64)
+    validos = (codigos >= 0) & ~np.isnan(valores)
+    if pesos is not None:
+        pesos = np.asarray(pesos, dtype=np.int64)
+        validos &= pesos > 0
+
+    ordem = np.lexsort((valores[validos], codigos[validos]))
+    c, v = codigos[validos][ordem], valores[validos][ordem]
+    w = pesos[validos][ordem] if pesos is not None else None
+    n = np.bincount(c, weights=w, minlength=len(nomes)).astype(np.int64)
+    inicio = np.cumsum(n) - n
+    acumulado = np.cumsum(w) if w is not None else None
+
+    q1, mediana, q3 = (_quantil(v, inicio, n, p, acumulado) for p in (0.25, 0.5, 0.75))
+    limite_inferior = q1 - FATOR_IQR * (q3 - q1)
+    limite_superior = q3 + FATOR_IQR * (q3 - q1)
+
+    # bigodes: valores extremos dentro dos limites (v está ordenado dentro de cada grupo)
+    dentro = (v >= limite_inferior[c]) & (v <= limite_superior[c])
+    cd, vd = c[dentro], v[dentro]
+    primeiros = np.flatnonzero(np.diff(cd, prepend=-1))
+    ultimos = np.append(primeiros[1:], len(cd))[:len(primeiros)] - 1
+    cerca_inferior = np.full(len(nomes), np.nan)
+    cerca_superior = np.full(len(nomes), np.nan)
+    cerca_inferior[cd[primeiros]] = vd[primeiros]
+    cerca_superior[cd[ultimos]] = vd[ultimos]
+
+    estatisticas = pd.DataFrame(
+        {"n": n, "q1": q1, "mediana": mediana, "q3": q3,
+         "cerca_inferior": cerca_inferior, "cerca_superior": cerca_superior},
+        index=pd.Index(nomes, name=coluna),
+    )
+
+    fc, fv = c[~dentro], v[~dentro]
+    if w is None:
+        total = np.bincount(fc, minlength=len(nomes))
+        posicao = np.arange(len(fc)) - (np.cumsum(total) - total)[fc]
+        mantem = _espacados(posicao, total[fc], limite_outliers)
+        outliers = pd.DataFrame({coluna: nomes[fc[mantem]], valor: fv[mantem]})
+    else:
+        fw = w[~dentro]
+        total = np.bincount(fc, weights=fw, minlength=len(nomes)).astype(np.int64)
+        grupo, indice = _outliers_pesos(total, np.cumsum(fw), limite_outliers)
+        outliers = pd.DataFrame({coluna: nomes[grupo], valor: fv[indice]})
+    return estatisticas, outliers
+
+
+def descrever_pesos(valores, pesos) -> pd.Series:
+    """`Series.describe()` dos valores repetidos pelos `pesos` (histograma), sem repeti-los."""
+    valores = np.asarray(valores, dtype=np.float64)
+    pesos = np.asarray(pesos, dtype=np.int64)
+    validos = ~np.isnan(valores) & (pesos > 0)
+    ordem = np.argsort(valores[validos], kind="stable")
+    v, w = valores[validos][ordem], pesos[validos][ordem]
+
+    n = int(w.sum())
+    media = float(np.dot(w, v) / n) if n else np.nan
+    desvio = float(np.sqrt(np.dot(w, (v - media) ** 2) / (n - 1))) if n > 1 else np.nan
+    inicio, total, acumulado = np.zeros(1, dtype=np.int64), np.array([n]), np.cumsum(w)
+    q1, mediana, q3 = (_quantil(v, inicio, total, p, acumulado)[0] for p in (0.25, 0.5, 0.75))
+    return pd.Series({
+        "count": float(n), "mean": media, "std": desvio,
+        "min": v[0] if n else np.nan, "25%": q1, "50%": mediana, "75%": q3, "max": v[-1] if n else np.nan,
+    })
+
+
+def plano_box_polars(linhas: pl.LazyFrame, limite_outliers: int = LIMITE_OUTLIERS,
+                     coluna: str = "CD_DESCRITOR", valor: str = "TX_ACERTO") -> tuple[pl.LazyFrame, pl.LazyFrame]:
+    """As mesmas estatísticas de `estatisticas_box`, como consultas lazy sobre `linhas`."""
+    rotulados = linhas.select(coluna, valor).filter(pl.col(coluna).is_not_null())
+    quartis = rotulados.group_by(coluna).agg(
+        pl.col(valor).count().alias("n"),
+        pl.col(valor).quantile(0.25, "linear").alias("q1"),
+        pl.col(valor).quantile(0.5, "linear").alias("mediana"),
+        pl.col(valor).quantile(0.75, "linear").alias("q3"),
+    )
+
+    iqr = pl.col("q3") - pl.col("q1")
+    dentro = (pl.col(valor) >= pl.col("q1") - FATOR_IQR * iqr) & (pl.col(valor) <= pl.col("q3") + FATOR_IQR * iqr)
+    com_quartis = rotulados.drop_nulls(valor).join(quartis, on=coluna)
+
+    cercas = com_quartis.filter(dentro).group_by(coluna).agg(
+        pl.col(valor).min().alias("cerca_inferior"),
+        pl.col(valor).max().alias("cerca_superior"),
+    )
+    estatisticas = quartis.join(cercas, on=coluna, how="left").select([coluna] + COLUNAS_BOX).sort(coluna)
+
+    posicao, total = pl.int_range(pl.len()).over(coluna), pl.len().over(coluna)
+    outliers = (
+        com_quartis.filter(~dentro)
+        .sort([coluna, valor])
+        .filter((posicao == 0) | ((posicao * limite_outliers) // total != ((posicao - 1) * limite_outliers) // total))
+        .select(coluna, valor)
+    )
+    return estatisticas, outliers
+
+
+def figura_box(estatisticas: pd.DataFrame, outliers: pd.DataFrame, ordem, title: str | None = None,
+               labels: dict | None = None, coluna: str = "CD_DESCRITOR", valor: str = "TX_ACERTO") -> go.Figure:
+    """
+    Boxplot a partir das estatísticas: um traço de caixa (e um de outliers) por
+    rótulo, na `ordem` dada e com as cores do `px.box(color=...)`.
+    """
+    labels = labels or {}
+    cores = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, rotulo in enumerate(ordem):
+        linha = estatisticas.loc[rotulo]
+        cor = cores[i % len(cores)]
+        if linha["n"] > 0:
+            fig.add_trace(go.Box(
+                x=[rotulo], q1=[linha["q1"]], median=[linha["mediana"]], q3=[linha["q3"]],
+                lowerfence=[linha["cerca_inferior"]], upperfence=[linha["cerca_superior"]],
+                name=str(rotulo), marker=dict(color=cor), boxpoints=False,
+            ))
+        pontos = outliers.loc[outliers[coluna] == rotulo, valor]
+        if len(pontos):
+            fig.add_trace(go.Scatter(
+                x=[rotulo] * len(pontos), y=pontos, mode="markers",
+                name=str(rotulo), marker=dict(color=cor), showlegend=False,
+            ))
+
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title=labels.get(coluna, coluna), categoryorder="array", categoryarray=list(ordem)),
+        yaxis=dict(title=labels.get(valor, valor)),
+    )
+    return fig
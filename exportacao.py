@@ -0,0 +1,185 @@
+import argparse
+import glob
+import hashlib
+import io
+import os
+import shlex
+import time
+import zipfile
+
+import polars as pl
+
+from backend_consultas import COLUNAS_PAGINA, linhas_polars
+from cache_resultados import chave_consulta, versao_base
+
+# --- Configuração da exportação ---
+# Tabelas agregadas: as mesmas da página (já calculadas ou em cache), num .zip
+# com um arquivo por tabela. Linhas da seleção: lidas do disco pelo plano do
+# polars e gravadas em lotes direto no arquivo (sink), sem montar a seleção
+# inteira na memória; o arquivo de cada seleção (e versão da base) é reaproveitado.
+# A pasta tem teto: ao gravar, saem os arquivos de versões antigas da mesma base
+# e, acima de LIMITE_PASTA_MB, os usados há mais tempo. A página só oferece
+# seleções de até LIMITE_LINHAS_PAGINA linhas; as maiores saem pela CLI.
+FORMATOS = ["csv", "parquet"]
+TABELAS_EXPORTADAS = ["ultimas", "serie", "crescimento", "descritores", "estatisticas", "box"]
+TABELAS_COM_INDICE = ["estatisticas", "box"]
+PASTA_EXPORTACOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "exportacoes")
+SEPARADOR_CSV = ";"
+LINHAS_POR_LOTE = 50_000
+LIMITE_PASTA_MB = 2048
+LIMITE_LINHAS_PAGINA = 1_000_000
+IDADE_PARCIAL_S = 3600              # parcial mais velho que isso = gravação abandonada
+
+
+def exportar_resultados(resultados: dict, formato: str = "csv") -> bytes:
+    """Tabelas das abas (dict de `consultar_resultados`) num .zip, uma por arquivo."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato} (opções: {FORMATOS})")
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for nome in TABELAS_EXPORTADAS:
+            quadro = resultados[nome]
+            indice = nome in TABELAS_COM_INDICE
+            with arquivo_zip.open(f"{nome}.{formato}", "w") as f:
+                if formato == "csv":
+                    quadro.to_csv(f, index=indice, sep=SEPARADOR_CSV, encoding="utf-8-sig")
+                else:
+                    quadro.to_parquet(f, index=indice)
+    return buffer.getvalue()
+
+
+def exportar_linhas(caminho_base: str, destino: str, formato: str, componente: str, nivel: str = "Estado",
+                    regiao: str | None = None, municipio: str | None = None, escola: str | None = None,
+                    descritores: list | None = None, linhas_por_lote: int = LINHAS_POR_LOTE) -> str:
+    """
+    Grava as linhas da seleção (colunas da página, taxa de acerto por linha) em
+    `destino`, lote a lote: a memória não cresce com o número de linhas.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato} (opções: {FORMATOS})")
+
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    linhas = linhas_polars(caminho_base, componente, nivel, regiao, municipio, escola, descritores,
+                           colunas=COLUNAS_PAGINA)
+    if formato == "csv":
+        linhas.sink_csv(destino, separator=SEPARADOR_CSV, include_bom=True, datetime_format="%Y-%m-%d",
+                        batch_size=linhas_por_lote)
+    else:
+        linhas.sink_parquet(destino, row_group_size=linhas_por_lote)
+    return destino
+
+
+def contar_linhas(caminho_base: str, componente: str, nivel: str = "Estado",
+                  regiao: str | None = None, municipio: str | None = None, escola: str | None = None,
+                  descritores: list | None = None) -> int:
+    """Número de linhas da seleção, sem gravá-las (leitura em streaming)."""
+    linhas = linhas_polars(caminho_base, componente, nivel, regiao, municipio, escola, descritores)
+    return linhas.select(pl.len()).collect(streaming=True).item()
+
+
+def _assinatura(valor) -> str:
+    return hashlib.sha1(repr(valor).encode()).hexdigest()[:16]
+
+
+def _remover(caminho: str):
+    # outra sessão pode ter removido (ou estar servindo) o mesmo arquivo
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+def limpar_exportacoes(pasta: str = PASTA_EXPORTACOES, manter: str | None = None,
+                       limite_mb: float = LIMITE_PASTA_MB):
+    """
+    Aplica o teto da pasta de linhas exportadas (`linhas_<base>_<versão>_<seleção>.<formato>`):
+    remove os arquivos de versões antigas de uma base que já tem arquivo da
+    versão de `manter`, as gravações abandonadas e, enquanto o total passar de
+    `limite_mb`, os arquivos usados há mais tempo. `manter` nunca sai.
+    """
+    agora = time.time()
+    base_atual, versao_atual = os.path.basename(manter).split("_")[1:3] if manter else (None, None)
+
+    guardados = []
+    for caminho in glob.glob(os.path.join(pasta, "linhas_*")):
+        try:
+            info = os.stat(caminho)
+        except OSError:
+            continue
+        if caminho.endswith(".parcial"):
+            if agora - info.st_mtime > IDADE_PARCIAL_S:
+                _remover(caminho)
+            continue
+        base, versao = os.path.basename(caminho).split("_")[1:3]
+        if caminho != manter and base == base_atual and versao != versao_atual:
+            _remover(caminho)
+            continue
+        guardados.append((info.st_mtime, info.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in guardados)
+    for _, tamanho, caminho in sorted(guardados):
+        if total <= limite_mb * 1024 ** 2:
+            break
+        if caminho != manter:
+            _remover(caminho)
+            total -= tamanho
+
+
+def arquivo_linhas(caminho_base: str, formato: str, componente: str, nivel: str = "Estado",
+                   regiao: str | None = None, municipio: str | None = None, escola: str | None = None,
+                   descritores: list | None = None, pasta: str = PASTA_EXPORTACOES) -> str:
+    """
+    Arquivo com as linhas da seleção, gerado só se ainda não existir para a
+    mesma seleção normalizada (`chave_consulta`) e a mesma versão da base.
+    Depois de gravar (ou reaproveitar), aplica o teto da pasta (`limpar_exportacoes`).
+    """
+    chave = chave_consulta("linhas", caminho_base, componente, nivel, regiao, municipio, escola, descritores)
+    nome = f"linhas_{_assinatura(os.path.abspath(caminho_base))}_{_assinatura(versao_base(caminho_base))}"
+    destino = os.path.join(pasta, f"{nome}_{_assinatura(chave)}.{formato}")
+    if os.path.exists(destino):
+        # usado agora: vai para o fim da fila de remoção
+        os.utime(destino)
+    else:
+        # grava com outro nome e troca no fim: outra sessão nunca vê o arquivo pela metade
+        parcial = f"{destino}.{os.getpid()}.parcial"
+        exportar_linhas(caminho_base, parcial, formato, componente, nivel, regiao, municipio, escola, descritores)
+        os.replace(parcial, destino)
+    limpar_exportacoes(pasta, manter=destino)
+    return destino
+
+
+def comando_exportacao(caminho_base: str, formato: str, componente: str, nivel: str = "Estado",
+                       regiao: str | None = None, municipio: str | None = None, escola: str | None = None,
+                       descritores: list | None = None) -> str:
+    """Linha de comando que exporta a mesma seleção fora da página (para seleções acima do limite)."""
+    argumentos = ["python", "exportacao.py", "--base", caminho_base, "--componente", componente,
+                  "--nivel", nivel, "--formato", formato, "--saida", f"linhas_selecao.{formato}"]
+    for opcao, valor in [("--regional", regiao), ("--municipio", municipio), ("--escola", escola)]:
+        if valor:
+            argumentos += [opcao, valor]
+    if descritores is not None:
+        argumentos += ["--descritores", *map(str, descritores)]
+    return shlex.join(argumentos)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta as linhas de uma seleção da Análise de Resultados, em lotes")
+    parser.add_argument("--base", default="data/base_tratada.parquet")
+    parser.add_argument("--componente", required=True)
+    parser.add_argument("--nivel", choices=["Estado", "Regional", "Município", "Escola"], default="Estado")
+    parser.add_argument("--regional", default=None)
+    parser.add_argument("--municipio", default=None)
+    parser.add_argument("--escola", default=None)
+    parser.add_argument("--descritores", nargs="+", default=None)
+    parser.add_argument("--formato", choices=FORMATOS, default="parquet")
+    parser.add_argument("--saida", required=True)
+    parser.add_argument("--linhas-por-lote", type=int, default=LINHAS_POR_LOTE)
+    args = parser.parse_args()
+
+    exportar_linhas(args.base, args.saida, args.formato, args.componente, args.nivel, args.regional,
+                    args.municipio, args.escola, args.descritores, args.linhas_por_lote)
+    if args.formato == "parquet":
+        total = pl.scan_parquet(args.saida).select(pl.len()).collect().item()
+        print(f"✅ {total:,} linhas exportadas.")
+    print(f"💾 Arquivo salvo em: {args.saida} ({os.path.getsize(args.saida) / 1024 ** 2:.1f} MB)")
@@ -1,33 +1,251 @@
-import pandas as pd
+import argparse
 import os
 
-def criar_amostra(caminho_entrada="data/base_tratada.parquet", caminho_saida="data/base_amostra.parquet", frac=0.05):
-    print("🔄 Carregando base tratada completa...")
-    df = pd.read_parquet(caminho_entrada)
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from tratamento_base_unificada import gravar_base_particionada
+
+# --- Configuração da amostragem ---
+# Amostra estratificada por disciplina e regional: em cada estrato com mais de
+# LIMITE_ESTRATO_INTEIRO linhas entram exatamente round(frac * n) linhas; estratos
+# menores entram inteiros. A escolha é feita por prioridades pseudoaleatórias
+# (hash da posição da linha com a seed), sem callback Python por estrato: entram
+# as round(frac * n) menores prioridades de cada estrato (bottom-k).
+CHAVES_ESTRATO = ["NM_DISCIPLINA", "NM_REGIONAL"]
+LIMITE_ESTRATO_INTEIRO = 50
+LINHAS_POR_LOTE = 1_000_000
+
+
+def _prioridades(posicoes: np.ndarray, seed: int) -> np.ndarray:
+    """Hash splitmix64 de cada posição: prioridade uniforme em uint64, reprodutível pela seed."""
+    with np.errstate(over="ignore"):
+        z = posicoes.astype(np.uint64) + np.uint64((seed * 0x9E3779B97F4A7C15) % 2**64)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _codigos_estrato(lote: pa.RecordBatch, chaves: list[str], valores: list[dict], estratos: dict) -> np.ndarray:
+    """
+    Código global do estrato de cada linha do lote. `valores` (um dict por chave)
+    e `estratos` (tupla de ids -> código) crescem conforme aparecem valores novos,
+    de modo que o código de um estrato é o mesmo em todos os lotes.
+    """
+    ids = []
+    for col, vistos in zip(chaves, valores):
+        coluna = lote.column(col)
+        if not pa.types.is_dictionary(coluna.type):
+            coluna = pc.dictionary_encode(coluna)
+        locais = [vistos.setdefault(v, len(vistos)) for v in coluna.dictionary.to_pylist()]
+        indices = pc.fill_null(coluna.indices, -1).to_numpy(zero_copy_only=False)
+        globais = np.append(np.asarray(locais, dtype=np.int64), vistos.setdefault(None, len(vistos)))
+        ids.append(globais[indices])
+
+    # ids das chaves combinados num inteiro só; os distintos viram códigos de estrato
+    tamanhos = [len(vistos) for vistos in valores]
+    combinado = np.ravel_multi_index(ids, tamanhos)
+    presentes = np.flatnonzero(np.bincount(combinado, minlength=int(np.prod(tamanhos))))
+    tabela = np.zeros(int(np.prod(tamanhos)), dtype=np.int64)
+    for valor, combinacao in zip(presentes, zip(*np.unravel_index(presentes, tamanhos))):
+        tabela[valor] = estratos.setdefault(tuple(int(i) for i in combinacao), len(estratos))
+    return tabela[combinado]
+
+
+def _lotes(dataset: ds.Dataset, colunas: list[str] | None, linhas_por_lote: int):
+    return dataset.to_batches(columns=colunas, batch_size=linhas_por_lote, use_threads=False)
+
+
+def _limiares_candidatos(contagens: np.ndarray, fracao: float) -> np.ndarray:
+    """
+    Prioridade máxima que um estrato com `contagens` linhas ainda precisa guardar
+    para sortear `fracao` dele: a fração mais uma folga de ~7 desvios-padrão da
+    binomial. Estratos de até LIMITE_ESTRATO_INTEIRO linhas guardam tudo. O
+    limiar só cai à medida que o estrato cresce, então o que é descartado num
+    lote nunca volta a ser necessário depois.
+    """
+    n = np.maximum(contagens, 1).astype(np.float64)
+    proporcao = fracao + 7 * np.sqrt(fracao / n) + LIMITE_ESTRATO_INTEIRO / n
+    tudo = (contagens <= LIMITE_ESTRATO_INTEIRO) | (proporcao >= 1 - 1e-9)
+    limiares = (np.where(tudo, 0.0, proporcao) * 2.0**64).astype(np.uint64)
+    return np.where(tudo, np.iinfo(np.uint64).max, limiares)
+
+
+def _podar(candidatos: list, limiares: np.ndarray) -> tuple[list, int]:
+    """Refiltra os lotes guardados pelos limiares atuais; retorna (lotes, linhas restantes)."""
+    podados, total = [], 0
+    for lote, codigos, prioridades in candidatos:
+        mascara = prioridades <= limiares[codigos]
+        if not mascara.all():
+            lote, codigos, prioridades = lote.filter(pa.array(mascara)), codigos[mascara], prioridades[mascara]
+        podados.append((lote, codigos, prioridades))
+        total += len(codigos)
+    return podados, total
+
+
+def _k_esimas(codigos: np.ndarray, prioridades: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """
+    Para cada estrato e fração, a k-ésima menor prioridade entre as linhas dadas
+    (`k` com uma linha por estrato e uma coluna por fração); k = 0 não aceita ninguém.
+    """
+    ordem = np.lexsort((prioridades, codigos))
+    codigos, prioridades = codigos[ordem], prioridades[ordem]
+    primeiro = np.searchsorted(codigos, np.arange(len(k)))
+    limiares = np.zeros(k.shape, dtype=np.uint64)
+    for i in range(k.shape[1]):
+        com_limiar = k[:, i] > 0
+        limiares[com_limiar, i] = prioridades[primeiro[com_limiar] + k[com_limiar, i] - 1]
+    return limiares
+
+
+def _refazer_estratos(dataset: ds.Dataset, chaves: list[str], valores: list[dict], estratos: dict,
+                      faltando: np.ndarray, k: np.ndarray, seed: int, linhas_por_lote: int,
+                      candidatos: list) -> list:
+    """
+    Caminho de reserva para estratos cuja folga não bastou: uma leitura das
+    colunas-chave acha a k-ésima prioridade exata deles e uma leitura completa
+    troca seus candidatos pelas linhas até esse limiar.
+    """
+    cod_faltando, pri_faltando = [], []
+    inicio = 0
+    for lote in _lotes(dataset, chaves, linhas_por_lote):
+        codigos = _codigos_estrato(lote, chaves, valores, estratos)
+        prioridades = _prioridades(np.arange(inicio, inicio + len(codigos)), seed)
+        inicio += len(codigos)
+        mascara = faltando[codigos]
+        cod_faltando.append(codigos[mascara])
+        pri_faltando.append(prioridades[mascara])
+    exatos = _k_esimas(np.concatenate(cod_faltando), np.concatenate(pri_faltando),
+                       np.where(faltando, k.max(axis=1, initial=0), 0)[:, None])[:, 0]
+
+    refeitos = [(lote.filter(pa.array(~faltando[c])), c[~faltando[c]], p[~faltando[c]])
+                for lote, c, p in candidatos]
+    inicio = 0
+    for lote in _lotes(dataset, None, linhas_por_lote):
+        codigos = _codigos_estrato(lote, chaves, valores, estratos)
+        prioridades = _prioridades(np.arange(inicio, inicio + len(codigos)), seed)
+        inicio += len(codigos)
+        mascara = faltando[codigos] & (prioridades <= exatos[codigos])
+        refeitos.append((lote.filter(pa.array(mascara)), codigos[mascara], prioridades[mascara]))
+    return refeitos
+
+
+def caminho_fracao(caminho_saida: str, frac: float) -> str:
+    """`data/base_amostra.parquet` e 0.01 -> `data/base_amostra_1pct.parquet`."""
+    raiz, extensao = os.path.splitext(os.path.normpath(caminho_saida))
+    return f"{raiz}_{frac * 100:g}pct{extensao}"
+
+
+def criar_amostra(caminho_entrada="data/base_tratada.parquet", caminho_saida="data/base_amostra.parquet", frac=0.05,
+                  particionar=False, seed=42, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Amostra estratificada por NM_DISCIPLINA × NM_REGIONAL, lendo a base em lotes
+    (arquivo, pasta incremental ou dataset particionado) numa única passada. Como
+    o tamanho final de cada estrato só é conhecido no fim, cada estrato guarda as
+    linhas com prioridade abaixo de um limiar com folga sobre a fração (ver
+    `_limiares_candidatos`) e as k menores são escolhidas ao final; em memória
+    fica pouco mais que a maior amostra.
+
+    `frac` pode ser uma lista (ex.: [0.01, 0.05, 0.1]): todas as amostras saem
+    da mesma passada, em `caminho_fracao(caminho_saida, frac)`, e as menores
+    ficam contidas nas maiores. Mesma base e mesma `seed` geram a mesma amostra.
+    Retorna o DataFrame da amostra (ou um dict fração -> DataFrame, para listas).
+    """
+    fracoes = list(frac) if isinstance(frac, (list, tuple)) else [frac]
+    saidas = [caminho_saida] if len(fracoes) == 1 else [caminho_fracao(caminho_saida, f) for f in fracoes]
+
+    print("🔄 Lendo base tratada em lotes...")
+    dataset = ds.dataset(caminho_entrada, format="parquet", partitioning="hive")
 
     # Verifica se as colunas-chave estão presentes
-    chaves = ["NM_DISCIPLINA", "NM_REGIONAL"]
+    chaves = CHAVES_ESTRATO
     for col in chaves:
-        if col not in df.columns:
+        if col not in dataset.schema.names:
             raise ValueError(f"Coluna obrigatória ausente: {col}")
 
-    print(f"📊 Linhas totais antes da amostragem: {len(df):,}")
+    # Passada única: cada lote guarda só as linhas abaixo do limiar de candidato
+    # do seu estrato (ver _limiares_candidatos), calculado com a contagem até ali.
+    valores, estratos = [{} for _ in chaves], {}
+    contagens = np.zeros(0, dtype=np.int64)
+    limiares = np.zeros(0, dtype=np.uint64)
+    candidatos, guardadas, apos_poda = [], 0, 0
+    inicio = 0
+    for lote in _lotes(dataset, None, linhas_por_lote):
+        codigos = _codigos_estrato(lote, chaves, valores, estratos)
+        prioridades = _prioridades(np.arange(inicio, inicio + len(codigos)), seed)
+        inicio += len(codigos)
 
-    # Cria amostra estratificada por disciplina e regional
-    df_amostra = (
-        df.groupby(chaves, group_keys=False)
-        .apply(lambda x: x.sample(frac=frac, random_state=42) if len(x) > 50 else x)
-        .reset_index(drop=True)
-    )
+        parcial = np.bincount(codigos, minlength=len(estratos))
+        parcial[:len(contagens)] += contagens
+        contagens = parcial
+        limiares = _limiares_candidatos(contagens, max(fracoes))
 
-    os.makedirs(os.path.dirname(caminho_saida), exist_ok=True)
-    df_amostra.to_parquet(caminho_saida, index=False)
+        mascara = prioridades <= limiares[codigos]
+        # lotes sem nenhuma linha guardada também entram: preservam os dicionários das categorias
+        candidatos.append((lote.filter(pa.array(mascara)), codigos[mascara], prioridades[mascara]))
+        guardadas += int(mascara.sum())
+        # estratos que crescem baixam o limiar; a poda refiltra o que já foi guardado
+        if guardadas > 2 * apos_poda + linhas_por_lote:
+            candidatos, guardadas = _podar(candidatos, limiares)
+            apos_poda = guardadas
 
-    print(f"✅ Amostra criada com {len(df_amostra):,} linhas ({frac*100:.0f}% da base).")
-    print(f"💾 Arquivo salvo em: {caminho_saida}")
+    print(f"📊 Linhas totais antes da amostragem: {inicio:,} em {len(estratos)} estratos")
 
-    return df_amostra
+    grandes = contagens > LIMITE_ESTRATO_INTEIRO
+    # k por estrato e fração (mesma regra de arredondamento de DataFrame.sample)
+    k = np.where(grandes[:, None], np.round(np.outer(contagens, fracoes)), contagens[:, None]).astype(np.int64)
+    cand_codigos = np.concatenate([c for _, c, _ in candidatos]) if candidatos else np.zeros(0, dtype=np.int64)
+    cand_prioridades = (np.concatenate([p for _, _, p in candidatos]) if candidatos
+                        else np.zeros(0, dtype=np.uint64))
+
+    # Todas as linhas abaixo do limiar final estão guardadas; se há pelo menos k
+    # delas, as k menores prioridades do estrato estão entre os candidatos.
+    abaixo = np.bincount(cand_codigos[cand_prioridades <= limiares[cand_codigos]], minlength=len(estratos))
+    faltando = grandes & (abaixo < k.max(axis=1, initial=0))
+    if faltando.any():
+        # folga estourada (probabilidade desprezível): refaz só esses estratos em mais duas leituras
+        print(f"⚠️ {int(faltando.sum())} estrato(s) sem candidatos suficientes; relendo a base para eles.")
+        candidatos = _refazer_estratos(dataset, chaves, valores, estratos, faltando, k, seed,
+                                       linhas_por_lote, candidatos)
+        cand_codigos = np.concatenate([c for _, c, _ in candidatos])
+        cand_prioridades = np.concatenate([p for _, _, p in candidatos])
+
+    limiares = _k_esimas(cand_codigos, cand_prioridades, k)
+    partes = [[] for _ in fracoes]
+    for lote, codigos, prioridades in candidatos:
+        for i in range(len(fracoes)):
+            mascara = (k[codigos, i] > 0) & (prioridades <= limiares[codigos, i])
+            partes[i].append(lote.filter(pa.array(mascara)))
+
+    amostras = {}
+    for f, caminho, lotes in zip(fracoes, saidas, partes):
+        df_amostra = pa.Table.from_batches(lotes, schema=dataset.schema).to_pandas()
+
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        if particionar:
+            # dataset por componente e ano (ver tratamento_base_unificada.gravar_base_particionada)
+            gravar_base_particionada(df_amostra, caminho)
+        else:
+            df_amostra.to_parquet(caminho, index=False)
+
+        print(f"✅ Amostra criada com {len(df_amostra):,} linhas ({f*100:g}% da base).")
+        print(f"💾 Arquivo salvo em: {caminho}")
+        amostras[f] = df_amostra
+
+    return amostras if isinstance(frac, (list, tuple)) else amostras[frac]
 
 
 if __name__ == "__main__":
-    criar_amostra()
+    parser = argparse.ArgumentParser(description="Gera amostra(s) estratificada(s) da base tratada")
+    parser.add_argument("--entrada", default="data/base_tratada.parquet")
+    parser.add_argument("--saida", default="data/base_amostra.parquet")
+    parser.add_argument("--fracoes", nargs="+", type=float, default=[0.05],
+                        help="Uma ou mais frações (ex.: 0.01 0.05 0.1) geradas na mesma passada")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--particionar", action="store_true")
+    args = parser.parse_args()
+
+    criar_amostra(args.entrada, args.saida, args.fracoes if len(args.fracoes) > 1 else args.fracoes[0],
+                  particionar=args.particionar, seed=args.seed)
@@ -0,0 +1,227 @@
+import argparse
+import gzip
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from catalogo_descritores import carregar_catalogo
+
+# --- Configuração da base sintética ---
+# Reproduz o formato de data/base_unificada.csv.gz (mesmas colunas, mesmas
+# sujeiras que o tratamento corrige) com cardinalidades e distribuições
+# parecidas com as da rede estadual, sem nenhum dado real de aluno ou escola.
+ESCALAS = {"100k": 100_000, "1M": 1_000_000, "10M": 10_000_000, "50M": 50_000_000}
+
+COLUNAS = [
+    "NM_AVALIACAO", "DT_REFERENCIA", "TP_INSTANCIA", "NM_DISCIPLINA", "CD_DESCRITOR",
+    "QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS", "CD_ESCOLA", "CD_MUNICIPIO", "CD_REGIONAL",
+    "NM_ESCOLA", "NM_MUNICIPIO", "NM_REGIONAL", "CD_ESTADO", "NM_ESTADO", "NM_FONTE",
+    "CD_TURMA", "NM_TURMA", "TX_ACERTO", "CD_ALUNO_INEP", "CHAVE_COMBINACAO",
+]
+
+N_REGIONAIS = 11
+N_MUNICIPIOS = 78
+N_ESCOLAS = 450
+ALUNOS_POR_LINHA = 1 / 25          # cada aluno aparece em ~25 linhas
+PROPORCAO_INSTANCIA = {"ALUNO": 0.951, "TURMA": 0.0455, "MUNICIPIO": 0.0035}
+PROPORCAO_DESCRITOR_NULO = 0.002
+GRAFIAS_DISCIPLINA = {
+    "LÍNGUA PORTUGUESA": ["LÍNGUA PORTUGUESA", "LP", "Lp", "Língua Portuguesa"],
+    "MATEMÁTICA": ["MATEMÁTICA", "MAT", "Mt", "Matemática"],
+}
+
+# Rodadas por ano: AMA trimestral (linhas de aluno) e Paebes anual (turma/município)
+ANOS = [2023, 2024, 2025]
+LINHAS_POR_LOTE = 1_000_000
+CATALOGO_DESCRITORES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "descritores_paebes.csv")
+
+
+def _descritores(caminho: str = CATALOGO_DESCRITORES) -> list[str]:
+    """Códigos reais de descritores (públicos); sem o catálogo, gera códigos no mesmo padrão."""
+    if os.path.exists(caminho):
+        codigos = list(carregar_catalogo([caminho])["codigos"])
+        if codigos:
+            return codigos
+    return [f"D{i:03d}_P" for i in range(1, 41)] + [f"D{i:03d}_M" for i in range(60, 100)]
+
+
+def _rodadas() -> pd.DataFrame:
+    linhas = []
+    for ano in ANOS:
+        for tri, mes in [(1, 4), (2, 7), (3, 10)]:
+            linhas.append({"NM_AVALIACAO": f"AMA - {tri}ª Trimestre {ano}", "DT_REFERENCIA": f"{ano}-{mes:02d}-01",
+                           "NM_FONTE": f"AMA_{ano}_{tri}T_tratada.csv", "TIPO": "AMA"})
+        linhas.append({"NM_AVALIACAO": f"Paebes {ano}", "DT_REFERENCIA": f"{ano}-11-01",
+                       "NM_FONTE": f"Paebes_{ano}_tratado.csv", "TIPO": "PAEBES"})
+    return pd.DataFrame(linhas)
+
+
+def _zipf(rng, n: int, expoente: float = 1.1) -> np.ndarray:
+    """Pesos com cauda longa (poucos itens muito frequentes), embaralhados."""
+    pesos = 1 / np.arange(1, n + 1) ** expoente
+    rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+
+def montar_rede(linhas: int, seed: int = 42) -> dict:
+    """
+    Tabelas de dimensão da base sintética: regionais, municípios, escolas
+    (tamanhos assimétricos), turmas, alunos (habilidade latente) e descritores
+    (frequência com cauda longa e dificuldade).
+    """
+    rng = np.random.default_rng(seed)
+
+    regional_do_municipio = np.sort(rng.integers(0, N_REGIONAIS, N_MUNICIPIOS))
+    municipio_da_escola = rng.choice(N_MUNICIPIOS, N_ESCOLAS, p=_zipf(rng, N_MUNICIPIOS, 0.9))
+    peso_escola = rng.lognormal(0, 0.9, N_ESCOLAS)
+    peso_escola /= peso_escola.sum()
+
+    n_alunos = max(1, int(linhas * ALUNOS_POR_LINHA))
+    escola_do_aluno = rng.choice(N_ESCOLAS, n_alunos, p=peso_escola)
+    turmas_por_escola = rng.integers(3, 13, N_ESCOLAS)
+    turma_do_aluno = rng.integers(0, 1 << 30, n_alunos) % turmas_por_escola[escola_do_aluno]
+
+    descritores = np.array(_descritores())
+    e_matematica = np.char.endswith(descritores.astype(str), "_M")
+    indices = {"LÍNGUA PORTUGUESA": np.flatnonzero(~e_matematica), "MATEMÁTICA": np.flatnonzero(e_matematica)}
+
+    return {
+        "regional_do_municipio": regional_do_municipio,
+        "municipio_da_escola": municipio_da_escola,
+        "escola_do_aluno": escola_do_aluno,
+        "turma_do_aluno": turma_do_aluno,
+        # códigos INEP de 12 dígitos, únicos e não sequenciais
+        "codigo_aluno": 10**11 + np.arange(n_alunos) * 37 + rng.integers(0, 37, n_alunos),
+        "habilidade": rng.normal(0, 1, n_alunos),
+        "efeito_escola": rng.normal(0, 0.4, N_ESCOLAS),
+        "descritores": descritores,
+        "dificuldade": rng.normal(-0.3, 0.8, len(descritores)),
+        "indices_disciplina": indices,
+        "pesos_disciplina": {d: _zipf(rng, len(i), 0.8) for d, i in indices.items() if len(i)},
+        "rodadas": _rodadas(),
+        "nomes_regionais": np.array([f"SRE SINTETICA {i + 1:02d}" for i in range(N_REGIONAIS)], dtype=object),
+        "nomes_municipios": np.array([f"MUNICIPIO SINTETICO {i + 1:03d}" for i in range(N_MUNICIPIOS)], dtype=object),
+        "nomes_escolas": np.array([f"EEEFM ESCOLA SINTETICA {i + 1:04d}" for i in range(N_ESCOLAS)], dtype=object),
+    }
+
+
+def gerar_lote(rede: dict, n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Gera `n` linhas no formato bruto da base unificada."""
+    instancias = np.array(list(PROPORCAO_INSTANCIA), dtype=object)
+    tipo = rng.choice(instancias, n, p=list(PROPORCAO_INSTANCIA.values()))
+    e_aluno = tipo == "ALUNO"
+    e_municipio = tipo == "MUNICIPIO"
+
+    aluno = rng.integers(0, len(rede["escola_do_aluno"]), n)
+    escola = rede["escola_do_aluno"][aluno]
+    municipio = rede["municipio_da_escola"][escola]
+    regional = rede["regional_do_municipio"][municipio]
+    turma = rede["turma_do_aluno"][aluno]
+
+    # AMA só tem linhas de aluno; Paebes tem turma e município
+    rodadas = rede["rodadas"]
+    ama = np.flatnonzero(rodadas["TIPO"].to_numpy() == "AMA")
+    paebes = np.flatnonzero(rodadas["TIPO"].to_numpy() == "PAEBES")
+    rodada = np.where(e_aluno, rng.choice(ama, n), rng.choice(paebes, n))
+
+    disciplina = np.where(rng.random(n) < 0.5, "LÍNGUA PORTUGUESA", "MATEMÁTICA").astype(object)
+    descritor = np.empty(n, dtype=np.int64)
+    for nome, indices in rede["indices_disciplina"].items():
+        mascara = disciplina == nome
+        descritor[mascara] = rng.choice(indices, mascara.sum(), p=rede["pesos_disciplina"][nome])
+
+    logito = rede["habilidade"][aluno] + rede["efeito_escola"][escola] - rede["dificuldade"][descritor]
+    prob = 1 / (1 + np.exp(-logito))
+    itens = np.where(e_aluno, rng.choice([1, 2, 3, 4, 5], n, p=[0.35, 0.3, 0.2, 0.1, 0.05]), 1)
+    respondentes = np.where(e_aluno, itens,
+                            np.where(e_municipio, rng.lognormal(5, 1, n).astype(int) + 10, rng.integers(15, 40, n)))
+    acertos = rng.binomial(respondentes, prob)
+    erros = respondentes - acertos
+
+    # grafias alternativas da disciplina (~10%), como nos arquivos de origem
+    nm_disciplina = disciplina.copy()
+    for nome, grafias in GRAFIAS_DISCIPLINA.items():
+        mascara = (disciplina == nome) & (rng.random(n) < 0.1)
+        nm_disciplina[mascara] = np.array(grafias, dtype=object)[rng.integers(0, len(grafias), mascara.sum())]
+
+    cd_descritor = rede["descritores"][descritor].astype(object)
+    cd_descritor[rng.random(n) < PROPORCAO_DESCRITOR_NULO] = None
+
+    cd_escola = 32_000_000 + escola
+    cd_turma = (3_200_000_000 + escola * 100 + turma).astype(np.float64)
+
+    df = pd.DataFrame({
+        "NM_AVALIACAO": rodadas["NM_AVALIACAO"].to_numpy()[rodada],
+        "DT_REFERENCIA": rodadas["DT_REFERENCIA"].to_numpy()[rodada],
+        "TP_INSTANCIA": tipo,
+        "NM_DISCIPLINA": nm_disciplina,
+        "CD_DESCRITOR": cd_descritor,
+        "QTD_ITENS": itens,
+        "QTD_ACERTOS": acertos,
+        "QTD_ERROS": erros,
+        "CD_ESCOLA": np.where(e_municipio, np.nan, cd_escola),
+        "CD_MUNICIPIO": np.where(e_municipio, np.nan, 3_200_000 + municipio * 13),
+        "CD_REGIONAL": (27 + regional).astype(np.float64),
+        "NM_ESCOLA": np.where(e_municipio, None, rede["nomes_escolas"][escola]),
+        "NM_MUNICIPIO": rede["nomes_municipios"][municipio],
+        "NM_REGIONAL": np.where(e_municipio, None, rede["nomes_regionais"][regional]),
+        "CD_ESTADO": np.where(e_municipio, np.nan, 32.0),
+        "NM_ESTADO": np.where(e_municipio, None, "ESPÍRITO SANTO"),
+        "NM_FONTE": rodadas["NM_FONTE"].to_numpy()[rodada],
+        "CD_TURMA": np.where(tipo == "TURMA", cd_turma, np.nan),
+        "NM_TURMA": np.where(tipo == "TURMA", (turma + 1).astype(str).astype(object), None),
+        "TX_ACERTO": acertos / np.maximum(respondentes, 1),
+        "CD_ALUNO_INEP": np.where(e_aluno, rede["codigo_aluno"][aluno].astype(np.float64), np.nan),
+        "CHAVE_COMBINACAO": None,
+    })
+    df["NM_TURMA"] = ("3ªM" + df["NM_TURMA"].str.zfill(2) + "-EM").where(df["NM_TURMA"].notna())
+    return df[COLUNAS]
+
+
+def gerar_base_sintetica(linhas: int | str = "1M",
+                         caminho_saida: str | None = None,
+                         seed: int = 42,
+                         linhas_por_lote: int = LINHAS_POR_LOTE,
+                         nivel_compressao: int = 6) -> str:
+    """
+    Gera uma base_unificada.csv.gz sintética com `linhas` linhas (número ou uma
+    das escalas de ESCALAS), em lotes, com memória limitada ao tamanho do lote.
+    Mesma `seed` e mesmo `linhas_por_lote` geram o mesmo arquivo.
+    """
+    total = ESCALAS[linhas] if isinstance(linhas, str) else int(linhas)
+    rotulo = linhas if isinstance(linhas, str) else str(total)
+    caminho_saida = caminho_saida or os.path.join("data", "sintetica", f"base_unificada_{rotulo}.csv.gz")
+    os.makedirs(os.path.dirname(caminho_saida) or ".", exist_ok=True)
+
+    print(f"🔄 Gerando base sintética com {total:,} linhas...")
+    rede = montar_rede(total, seed)
+
+    temporario = f"{caminho_saida}.tmp"
+    gravadas = 0
+    # cabeçalho gzip sem nome nem data: mesma seed, mesmos bytes
+    with open(temporario, "wb") as arquivo, \
+            gzip.GzipFile("", "wb", compresslevel=nivel_compressao, fileobj=arquivo, mtime=0) as bruto, \
+            io.TextIOWrapper(bruto, encoding="utf-8", newline="") as f:
+        for i, inicio in enumerate(range(0, total, linhas_por_lote)):
+            n = min(linhas_por_lote, total - inicio)
+            rng = np.random.default_rng([seed, i])
+            gerar_lote(rede, n, rng).to_csv(f, index=False, header=(i == 0))
+            gravadas += n
+            print(f"   ↳ {gravadas:,} linhas geradas")
+    os.replace(temporario, caminho_saida)
+
+    print(f"💾 Base sintética salva em: {caminho_saida}")
+    return caminho_saida
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera base unificada sintética")
+    parser.add_argument("--linhas", default="1M", help=f"Número de linhas ou escala ({', '.join(ESCALAS)})")
+    parser.add_argument("--saida", default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    linhas = args.linhas if args.linhas in ESCALAS else int(args.linhas)
+    gerar_base_sintetica(linhas, args.saida, seed=args.seed)
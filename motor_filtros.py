@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from cubo_resultados import filtro_efetivo
+
+# --- Configuração do motor de filtros ---
+# Índices montados uma vez por base carregada: para cada coluna da hierarquia,
+# as posições das linhas ordenadas por (disciplina, valor da coluna), com os
+# deslocamentos de cada par. Uma seleção da barra lateral vira uma fatia desse
+# vetor, e o filtro de descritores, uma consulta a uma tabela de booleanos:
+# o custo é proporcional ao resultado, não ao tamanho da base.
+COLUNA_DISCIPLINA = "NM_DISCIPLINA"
+COLUNAS_HIERARQUIA = ["NM_REGIONAL", "NM_MUNICIPIO", "NM_ESCOLA"]
+COLUNA_DESCRITOR = "CD_DESCRITOR"
+
+
+def _codificar(serie: pd.Series) -> tuple[np.ndarray, dict]:
+    """Códigos inteiros (nulos = -1) e o mapa valor -> código."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, valores = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, valores = pd.factorize(serie)
+    return codigos.astype(np.int64), {v: i for i, v in enumerate(valores)}
+
+
+def _postings(disciplina: np.ndarray, codigos: np.ndarray, n_valores: int) -> dict:
+    """Posições ordenadas por (disciplina, código) e o início de cada par no vetor."""
+    chave = disciplina * (n_valores + 1) + (codigos + 1)  # +1: nulo vira 0
+    posicoes = np.argsort(chave, kind="stable")
+    inicios = np.searchsorted(chave[posicoes], np.arange(chave.max(initial=0) + 2))
+    tipo = np.int32 if len(codigos) < 2**31 else np.int64
+    return {"posicoes": posicoes.astype(tipo), "inicios": inicios, "n_valores": n_valores}
+
+
+def construir_indice(df: pd.DataFrame) -> dict:
+    """
+    Índices do motor de filtros para `df`. As posições valem para qualquer cópia
+    de `df` com as mesmas linhas na mesma ordem (ex.: o retorno de um loader em cache).
+    """
+    disciplina, valores_disciplina = _codificar(df[COLUNA_DISCIPLINA])
+    disciplina = disciplina + 1  # nulo vira 0
+
+    indice = {
+        "linhas": len(df),
+        "disciplinas": valores_disciplina,
+        "valores": {},
+        "postings": {},
+    }
+    indice["postings"][COLUNA_DISCIPLINA] = _postings(disciplina, np.full(len(df), -1), 0)
+    for col in COLUNAS_HIERARQUIA:
+        if col not in df.columns:
+            continue
+        codigos, valores = _codificar(df[col])
+        indice["valores"][col] = valores
+        indice["postings"][col] = _postings(disciplina, codigos, len(valores))
+
+    codigos, valores = _codificar(df[COLUNA_DESCRITOR])
+    indice["descritores"] = codigos.astype(np.int32)
+    indice["valores"][COLUNA_DESCRITOR] = valores
+    return indice
+
+
+def _fatia(indice: dict, coluna: str, codigo_disciplina: int, codigo_valor: int) -> np.ndarray:
+    postings = indice["postings"][coluna]
+    chave = codigo_disciplina * (postings["n_valores"] + 1) + (codigo_valor + 1)
+    inicios = postings["inicios"]
+    if chave + 1 >= len(inicios):
+        return postings["posicoes"][:0]
+    return postings["posicoes"][inicios[chave]:inicios[chave + 1]]
+
+
+def posicoes_filtradas(indice: dict, componente, nivel: str = "Estado",
+                       regiao=None, municipio=None, escola=None, descritores=None) -> np.ndarray:
+    """
+    Posições (em ordem crescente) das linhas da seleção, com a mesma regra da
+    página: componente, descritores e o recorte do nível quando um valor
+    específico foi escolhido.
+    """
+    if componente not in indice["disciplinas"]:
+        return np.zeros(0, dtype=np.int64)
+    codigo_disciplina = indice["disciplinas"][componente] + 1
+
+    nivel_efetivo, coluna, valor = filtro_efetivo(nivel, regiao, municipio, escola)
+    if coluna is None:
+        posicoes = _fatia(indice, COLUNA_DISCIPLINA, codigo_disciplina, -1)
+    elif valor in indice["valores"].get(coluna, {}):
+        posicoes = _fatia(indice, coluna, codigo_disciplina, indice["valores"][coluna][valor])
+    else:
+        return np.zeros(0, dtype=np.int64)
+
+    if descritores is not None:
+        mapa = indice["valores"][COLUNA_DESCRITOR]
+        aceitos = np.zeros(len(mapa) + 1, dtype=bool)  # última posição: nulo (-1)
+        aceitos[[mapa[d] for d in descritores if d in mapa]] = True
+        posicoes = posicoes[aceitos[indice["descritores"][posicoes]]]
+
+    return posicoes
+
+
+def filtrar(df: pd.DataFrame, indice: dict, componente, nivel: str = "Estado",
+            regiao=None, municipio=None, escola=None, descritores=None) -> pd.DataFrame:
+    """Linhas de `df` na seleção da barra lateral, na ordem original (equivale às `query` encadeadas)."""
+    return df.take(posicoes_filtradas(indice, componente, nivel, regiao, municipio, escola, descritores))
+
+
+def _filhos(df: pd.DataFrame, pai: str, filho: str) -> dict:
+    """Valor de `pai` -> lista ordenada dos valores distintos de `filho` (sem nulos)."""
+    pares = df[[pai, filho]].dropna().drop_duplicates()
+    return {p: sorted(grupo[filho].unique()) for p, grupo in pares.groupby(pai, observed=True, sort=False)}
+
+
+def arvore_opcoes(df: pd.DataFrame) -> dict:
+    """
+    Opções da barra lateral em cascata, calculadas uma vez por base:
+    disciplina -> descritores e regional -> município -> escola. As listas são
+    as mesmas das consultas que a página fazia a cada interação.
+    """
+    regioes = df["NM_REGIONAL"].dropna().astype(str)
+    return {
+        "componentes": sorted(df[COLUNA_DISCIPLINA].dropna().unique()),
+        "descritores": _filhos(df, COLUNA_DISCIPLINA, COLUNA_DESCRITOR),
+        # 'nan' textual de bases antigas não vira opção
+        "regioes": sorted(regioes[~regioes.str.lower().eq("nan")].unique()),
+        "municipios": _filhos(df, "NM_REGIONAL", "NM_MUNICIPIO"),
+        "escolas": _filhos(df, "NM_MUNICIPIO", "NM_ESCOLA"),
+    }
@@ -0,0 +1,35 @@
+import pandas as pd
+
+# --- Configuração da padronização ---
+# Regras de limpeza compartilhadas pelo tratamento (tratamento_base_unificada)
+# e pela validação (validacao_base), que mede o que o tratamento vai corrigir.
+MAPA_DISCIPLINAS = {
+    'LP': 'LÍNGUA PORTUGUESA',
+    'Língua Portuguesa': 'LÍNGUA PORTUGUESA',
+    'MAT': 'MATEMÁTICA',
+    'Mt': 'MATEMÁTICA',
+    'Matemática': 'MATEMÁTICA',
+    'Lp': 'LÍNGUA PORTUGUESA',
+    'MT': 'MATEMÁTICA'
+}
+
+
+def padronizar_disciplina(serie: pd.Series) -> pd.Series:
+    """
+    Normaliza as grafias de NM_DISCIPLINA, mantendo nulos como nulos. A
+    normalização roda só sobre os valores distintos e é espalhada pelos códigos.
+    """
+    codigos, distintos = pd.factorize(serie)
+    padronizados = (
+        pd.Series(distintos, dtype=object)
+        .astype('string')
+        .str.strip()
+        .str.upper()
+        .replace(MAPA_DISCIPLINAS)
+    )
+    return pd.Series(padronizados.array.take(codigos, allow_fill=True), index=serie.index, name=serie.name)
+
+
+def descritor_valido(serie: pd.Series) -> pd.Series:
+    """Máscara das linhas com CD_DESCRITOR preenchido (nem nulo, nem 'nan' textual)."""
+    return serie.notna() & (serie.astype(str).str.lower() != 'nan')
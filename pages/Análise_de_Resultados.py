@@ -2,8 +2,19 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
+import os
 from pathlib import Path
 
+from analise_tendencias import JANELA_MEDIA_MOVEL, inclinacao, media_movel, ranking_escolas, variacao_anual
+from backend_consultas import BACKEND_PADRAO, arvore_opcoes_disco, consultar_resultados, ler_base
+from cache_resultados import chave_consulta, consultar_em_cache, criar_cache, estatisticas_cache, versao_base
+from catalogo_descritores import carregar_catalogo
+from cubo_resultados import caminho_cubo, construir_cubo_df, ler_cubo
+from estatisticas_box import figura_box
+from exportacao import (FORMATOS, LIMITE_LINHAS_PAGINA, arquivo_linhas, comando_exportacao, contar_linhas,
+                        exportar_resultados)
+from motor_filtros import arvore_opcoes, construir_indice
+
 
 # ==============================
 # CONFIGURAÇÃO BÁSICA
@@ -24,43 +35,91 @@ st.markdown("""
 <hr style='margin-top: 0; margin-bottom: 10px;'>
 """, unsafe_allow_html=True)
 
-st.write("Gráficos com resultados dos descritores, número de itens, série histórica, com filtros por regional, escola, etapa, etc. [Dados de amostra]")
-
 # ==============================
 # CARREGAMENTO DE DADOS
 # ==============================
-@st.cache_data(show_spinner="Carregando base otimizada...")
-def carregar_base(caminho="data/base_amostra.parquet"):
-    cols = [
-        "NM_AVALIACAO", "DT_REFERENCIA", "TP_INSTANCIA",
-        "NM_DISCIPLINA", "CD_DESCRITOR", "TX_ACERTO",
-        "QTD_ITENS", "QTD_ACERTOS", "NM_ESCOLA",
-        "NM_MUNICIPIO", "NM_REGIONAL"
-    ]
+# Base da página: a amostra, ou a base completa (arquivo ou pasta) com o backend "disco"
+CAMINHO_BASE = os.environ.get("DIDALE_BASE_RESULTADOS", "data/base_amostra.parquet")
+# Backend das consultas das abas: "pandas" (referência), "polars" (plano lazy)
+# ou "disco" (plano em streaming, sem carregar a base na memória)
+BACKEND = BACKEND_PADRAO
+
+aviso_amostra = " [Dados de amostra]" if "amostra" in Path(CAMINHO_BASE).name else ""
+st.write(f"Gráficos com resultados dos descritores, número de itens, série histórica, com filtros por regional, escola, etapa, etc.{aviso_amostra}")
+
+# Base normalizada na carga (tipos finais, taxa ponderada, códigos limpos) e
+# compartilhada entre sessões sem cópia: as interações só fatiam e agregam.
+@st.cache_resource(show_spinner="Carregando base otimizada...")
+def carregar_base(caminho=CAMINHO_BASE):
     try:
-        df = pd.read_parquet(caminho)
-        if not pd.api.types.is_datetime64_any_dtype(df["DT_REFERENCIA"]):
-            df["DT_REFERENCIA"] = pd.to_datetime(df["DT_REFERENCIA"], errors="coerce")
-        if "TX_ACERTO" not in df.columns and {"QTD_ACERTOS", "QTD_ITENS"}.issubset(df.columns):
-            df["TX_ACERTO"] = df["QTD_ACERTOS"] / df["QTD_ITENS"].replace(0, pd.NA)
-        return df
+        return ler_base(caminho)
     except Exception as e:
         st.error(f"❌ Erro ao carregar base: {e}")
         return pd.DataFrame()
 
-df = carregar_base()
+# Cubo de somas por nível × descritor × avaliação × data: os gráficos e a
+# tabela agregada saem dele, sem percorrer a base linha a linha a cada interação.
+# Só é lido, então fica compartilhado entre sessões (sem cópia por execução).
+# O arquivo é gerado pelo ETL (ou `python cubo_resultados.py`) e só vale para a
+# versão da base com que foi construído; `versao` (base e arquivo do cubo) entra
+# na chave do cache, então base ou cubo novos = cubo relido. Sem cubo válido, a página monta um em memória a partir
+# da base carregada; no backend "disco" não há base carregada, e fica sem cubo.
+@st.cache_resource(show_spinner="Carregando cubo de resultados...")
+def carregar_cubo(caminho_base=CAMINHO_BASE, versao=None):
+    cubo = ler_cubo(caminho_base)
+    if cubo is not None or BACKEND == "disco":
+        return cubo
+    return construir_cubo_df(carregar_base(caminho_base))
+
+# Índices do motor de filtros: montados uma vez por base, compartilhados entre sessões
+@st.cache_resource(show_spinner="Indexando base...")
+def carregar_indice(caminho=CAMINHO_BASE):
+    return construir_indice(carregar_base(caminho))
+
+# Catálogo de descritores (os dois CSVs, texto normalizado), lido uma vez
+@st.cache_resource(show_spinner=False)
+def carregar_descritores():
+    return carregar_catalogo()
+
+# Opções da barra lateral (disciplina -> descritores; regional -> município -> escola)
+@st.cache_data(show_spinner=False)
+def carregar_opcoes(caminho=CAMINHO_BASE):
+    if BACKEND == "disco":
+        return arvore_opcoes_disco(caminho)
+    return arvore_opcoes(carregar_base(caminho))
+
+# Tabelas das abas por seleção, compartilhadas entre sessões (LRU com orçamento
+# de memória; as entradas valem enquanto a versão da base não mudar)
+@st.cache_resource(show_spinner=False)
+def carregar_cache_resultados():
+    return criar_cache()
+
+if BACKEND == "disco":
+    # fora da memória: só opções, cubo e somas da seleção são carregados
+    df = None
+    base_disponivel = Path(CAMINHO_BASE).exists()
+else:
+    df = carregar_base()
+    base_disponivel = not df.empty
 
-if df.empty:
-    st.warning("A base tratada não foi encontrada ou está vazia. Verifique se o arquivo `data/base_tratada.parquet` existe.")
+if not base_disponivel:
+    st.warning(f"A base não foi encontrada ou está vazia. Verifique se `{CAMINHO_BASE}` existe.")
     st.stop()
 
+# Versão da base (arquivos, tamanhos e datas): invalida cubo e resultados em cache.
+# O cubo também é relido quando o ETL/CLI regrava o arquivo com a página no ar.
+VERSAO_BASE = versao_base(CAMINHO_BASE)
+arquivo_cubo = Path(caminho_cubo(CAMINHO_BASE))
+VERSAO_CUBO = (VERSAO_BASE, arquivo_cubo.stat().st_mtime_ns if arquivo_cubo.exists() else None)
+
 # ==============================
 # BARRA LATERAL DE FILTROS
 # ==============================
 st.sidebar.header("🎯 Filtros de Análise")
+opcoes = carregar_opcoes()
 
 # ---- Componente curricular ----
-componentes = sorted(df["NM_DISCIPLINA"].dropna().unique())
+componentes = opcoes["componentes"]
 componente = st.sidebar.selectbox("Componente curricular", componentes)
 
 if not componente:
@@ -68,7 +127,7 @@ if not componente:
     st.stop()
 
 # ---- Descritores ----
-descritores = sorted(df.query("NM_DISCIPLINA == @componente")["CD_DESCRITOR"].dropna().unique())
+descritores = opcoes["descritores"].get(componente, [])
 st.sidebar.markdown("#### Seleção de descritores")
 select_all = st.sidebar.checkbox("Selecionar todos", value=True)
 
@@ -84,74 +143,58 @@ nivel = st.sidebar.radio("Nível de granularidade", ["Estado", "Regional", "Muni
 regiao = municipio = escola = None
 
 if nivel in ["Regional", "Município", "Escola"]:
-    regioes = sorted(
-    df["NM_REGIONAL"]
-    .dropna()                              # remove np.nan
-    .astype(str)                           # garante strings
-    .loc[lambda x: ~x.str.lower().eq("nan")]  # remove 'nan' textual
-    .unique()
-    )
+    regioes = opcoes["regioes"]
 
     regiao = st.sidebar.selectbox("Regional", ["(Todas)"] + regioes)
 
 if nivel in ["Município", "Escola"] and regiao and regiao != "(Todas)":
-    municipios = sorted(df.query("NM_REGIONAL == @regiao")["NM_MUNICIPIO"].dropna().unique())
+    municipios = opcoes["municipios"].get(regiao, [])
     municipio = st.sidebar.selectbox("Município", ["(Todos)"] + municipios)
 
 if nivel == "Escola" and municipio and municipio != "(Todos)":
-    escolas = sorted(df.query("NM_MUNICIPIO == @municipio")["NM_ESCOLA"].dropna().unique())
+    escolas = opcoes["escolas"].get(municipio, [])
     escola = st.sidebar.selectbox("Escola", ["(Todas)"] + escolas)
 
 # ==============================
-# FILTRO APLICADO À BASE
+# CONSULTAS DA SELEÇÃO
 # ==============================
-df_filt = df.query("NM_DISCIPLINA == @componente and CD_DESCRITOR in @descritores_selecionados").copy()
-
-# ---- Aplicação condicional dos filtros ----
-if nivel == "Regional" and regiao and regiao != "(Todas)":
-    df_filt = df_filt.query("NM_REGIONAL == @regiao")
-elif nivel == "Município" and municipio and municipio != "(Todos)":
-    df_filt = df_filt.query("NM_MUNICIPIO == @municipio")
-elif nivel == "Escola" and escola and escola != "(Todas)":
-    df_filt = df_filt.query("NM_ESCOLA == @escola")
-elif nivel == "Estado":
-    # Se o nível for Estado, nenhuma filtragem adicional é aplicada
-    # Isso representa a rede estadual completa
-    pass
+# pandas: fatia dos índices (motor_filtros) + somas do cubo; polars e disco: um
+# plano lazy sobre o parquet. Todos devolvem as mesmas tabelas (backend_consultas).
+# Seleções repetidas (mesmo recorte, em qualquer sessão) vêm do cache de resultados.
+selecao = dict(regiao=regiao, municipio=municipio, escola=escola, descritores=descritores_selecionados)
+
+def calcular_resultados():
+    if BACKEND in ("polars", "disco"):
+        return consultar_resultados(BACKEND, CAMINHO_BASE, componente, nivel, **selecao,
+                                    catalogo=carregar_descritores())
+    return consultar_resultados(
+        "pandas", CAMINHO_BASE, componente, nivel, **selecao, catalogo=carregar_descritores(),
+        df=df, indice=carregar_indice(), cubo=carregar_cubo(versao=VERSAO_CUBO),
+    )
 
-# =======================================
-# CÁLCULO UNIFICADO DA TAXA DE ACERTO
-# =======================================
-df_filt = df_filt.copy()
-df_filt["QTD_ACERTOS"] = pd.to_numeric(df_filt["QTD_ACERTOS"], errors="coerce").fillna(0)
-df_filt["QTD_ERROS"] = pd.to_numeric(df_filt["QTD_ERROS"], errors="coerce").fillna(0)
-
-# --- Taxa de acerto ponderada ---
-df_filt["TX_ACERTO"] = np.where(
-    (df_filt["QTD_ACERTOS"] + df_filt["QTD_ERROS"]) > 0,
-    (df_filt["QTD_ACERTOS"] / (df_filt["QTD_ACERTOS"] + df_filt["QTD_ERROS"])) * 100,
-    np.nan
+cache_resultados = carregar_cache_resultados()
+resultados = consultar_em_cache(
+    cache_resultados,
+    chave_consulta(BACKEND, CAMINHO_BASE, componente, nivel, **selecao),
+    VERSAO_BASE,
+    calcular_resultados,
 )
 
-# =======================================
-# MERGE COM A BASE DE DESCRITORES
-# =======================================
-base_path = Path(__file__).resolve().parent.parent  # sobe um nível
-csv_path = base_path / "data" / "descritores_paebes_23_24.csv"
-
-descritores_info = pd.read_csv(csv_path, encoding="ISO-8859-1", sep=";")
-# Remove descrições incompletas (ex: "Recon ..." mas mantém "Reconhecer ...")
-descritores_info = descritores_info[
-    ~descritores_info["NM_DESCRITOR"].str.match(r"^Recon\s", na=False)
-]
+# Arquivo .zip das tabelas da seleção, montado uma vez por seleção e formato
+@st.cache_data(show_spinner=False, max_entries=32)
+def preparar_tabelas(chave, versao, formato, _resultados):
+    return exportar_resultados(_resultados, formato)
 
-descritores_info["CD_DESCRITOR"] = descritores_info["CD_DESCRITOR"].astype(str).str.strip()
-descritores_info["NM_DESCRITOR"] = descritores_info["NM_DESCRITOR"].astype(str).str.strip()
+# Número de linhas da seleção (decide se a página oferece o arquivo de linhas)
+@st.cache_data(show_spinner=False, max_entries=64)
+def contar_linhas_selecao(chave, versao, componente, nivel, _selecao):
+    return contar_linhas(CAMINHO_BASE, componente, nivel, **_selecao)
 
-df_filt["CD_DESCRITOR"] = df_filt["CD_DESCRITOR"].astype(str).str.strip()
-
-# --- Junta as descrições dos descritores ---
-df_descritor = df_filt.merge(descritores_info, on="CD_DESCRITOR", how="left")
+info_cache = estatisticas_cache(cache_resultados)
+st.sidebar.caption(
+    f"Cache de resultados: {info_cache['acertos']} acertos, {info_cache['falhas']} falhas "
+    f"({info_cache['mb']:.1f}/{info_cache['orcamento_mb']:.0f} MB)"
+)
 
 # =======================================
 # TABS
@@ -169,20 +212,11 @@ tab1, tab2, tab3 = st.tabs([
 with tab1:
     st.subheader("📈 Desempenho nas últimas avaliações")
 
-    df_2025 = df_filt[df_filt["DT_REFERENCIA"].dt.year == 2025]
+    df_grouped = resultados["ultimas"]
 
-    if df_2025.empty:
+    if df_grouped.empty:
         st.warning("Não há dados de 2025 disponíveis.")
     else:
-        # --- Agregar corretamente ---
-        df_grouped = (
-            df_2025.groupby(["CD_DESCRITOR", "NM_AVALIACAO"], as_index=False)
-            .agg({"QTD_ACERTOS": "sum", "QTD_ERROS": "sum"})
-        )
-        df_grouped["TX_ACERTO"] = (
-            df_grouped["QTD_ACERTOS"] / (df_grouped["QTD_ACERTOS"] + df_grouped["QTD_ERROS"])
-        ) * 100
-
         # --- Gráfico de barras agrupadas ---
         fig_bar = px.bar(
             df_grouped,
@@ -204,21 +238,17 @@ with tab1:
 with tab2:
     st.subheader("📊 Série histórica")
 
-    if df_filt.empty:
+    df_time = resultados["serie"]
+
+    if df_time.empty:
         st.warning("Nenhum dado encontrado com os filtros aplicados.")
     else:
-        df_time = (
-            df_filt.groupby(["DT_REFERENCIA", "CD_DESCRITOR"], as_index=False)
-            .agg({"QTD_ACERTOS": "sum", "QTD_ERROS": "sum"})
-        )
 
-        df_time["TX_ACERTO"] = np.where(
-            (df_time["QTD_ACERTOS"] + df_time["QTD_ERROS"]) > 0,
-            (df_time["QTD_ACERTOS"] / (df_time["QTD_ACERTOS"] + df_time["QTD_ERROS"])) * 100,
-            np.nan,
-        )
+        # --- Linha histórica (opcionalmente suavizada) ---
+        suavizar = st.checkbox(f"Média móvel ({JANELA_MEDIA_MOVEL} avaliações)", value=False)
+        if suavizar:
+            df_time = media_movel(df_time, ["CD_DESCRITOR"], coluna="TX_ACERTO")
 
-        # --- Linha histórica ---
         fig_line = px.line(
             df_time,
             x="DT_REFERENCIA",
@@ -233,12 +263,7 @@ with tab2:
         st.plotly_chart(fig_line, use_container_width=True)
 
         # --- Crescimento ---
-        df_growth = (
-            df_time.sort_values(["CD_DESCRITOR", "DT_REFERENCIA"])
-            .groupby("CD_DESCRITOR")
-            .apply(lambda s: s["TX_ACERTO"].iloc[-1] - s["TX_ACERTO"].iloc[0] if len(s) > 1 else 0)
-            .reset_index(name="Crescimento")
-        )
+        df_growth = resultados["crescimento"]
 
         fig_growth = px.bar(
             df_growth.sort_values("Crescimento", ascending=False),
@@ -251,6 +276,51 @@ with tab2:
         fig_growth.update_layout(height=400, xaxis_tickangle=-45)
         st.plotly_chart(fig_growth, use_container_width=True)
 
+        # --- Tendência (reta de mínimos quadrados) ---
+        df_slope = inclinacao(resultados["serie"], ["CD_DESCRITOR"]).dropna(subset=["INCLINACAO"])
+
+        if not df_slope.empty:
+            fig_slope = px.bar(
+                df_slope.sort_values("INCLINACAO", ascending=False),
+                x="CD_DESCRITOR",
+                y="INCLINACAO",
+                title="Tendência dos descritores (inclinação da reta ajustada)",
+                text_auto=".2f",
+                labels={"INCLINACAO": "Tendência (p.p./ano)", "CD_DESCRITOR": "Descritor"},
+            )
+            fig_slope.update_layout(height=400, xaxis_tickangle=-45)
+            st.plotly_chart(fig_slope, use_container_width=True)
+
+        # --- Variação em relação ao ano anterior ---
+        df_yoy = variacao_anual(resultados["serie"], ["CD_DESCRITOR"])
+
+        st.write("Variação da taxa de acerto em relação ao ano anterior (p.p.):")
+        st.dataframe(
+            df_yoy.pivot(index="CD_DESCRITOR", columns="ANO", values="VARIACAO").round(2),
+            use_container_width=True
+        )
+
+        # --- Escolas que mais melhoraram ---
+        # Tendência de todas as escolas de uma vez, a partir do nível Escola do cubo
+        if nivel != "Escola":
+            with st.expander("🏫 Escolas que mais melhoraram"):
+                cubo = carregar_cubo(versao=VERSAO_CUBO)
+                if cubo is None:
+                    st.info(f"Cubo de resultados ausente ou de outra versão da base. Gere-o com "
+                            f"`python cubo_resultados.py --base {CAMINHO_BASE}` (saída: `{caminho_cubo(CAMINHO_BASE)}`).")
+                else:
+                    df_rank = ranking_escolas(
+                        cubo,
+                        componente,
+                        descritores_selecionados,
+                        regiao=regiao if regiao and regiao != "(Todas)" else None,
+                        municipio=municipio if municipio and municipio != "(Todos)" else None,
+                    )
+                    st.dataframe(
+                        df_rank.head(20).round({"INCLINACAO": 2, "Crescimento": 2, "TX_ULTIMA": 2}),
+                        use_container_width=True
+                    )
+
 
 # ==============================
 # TAB 3: INFORMAÇÕES DO DESCRITOR
@@ -260,17 +330,8 @@ with tab3:
 
     st.write("Tabela com os descritores selecionados:")
 
-    # --- Agregação final por descritor ---
-    df_descritor_agg = (
-        df_descritor.groupby(["CD_DESCRITOR", "NM_DESCRITOR", "NM_DISCIPLINA"], as_index=False)
-        .agg({"QTD_ITENS": "sum", "QTD_ACERTOS": "sum", "QTD_ERROS": "sum"})
-    )
-
-    df_descritor_agg["TX_ACERTO"] = np.where(
-        (df_descritor_agg["QTD_ACERTOS"] + df_descritor_agg["QTD_ERROS"]) > 0,
-        (df_descritor_agg["QTD_ACERTOS"] / (df_descritor_agg["QTD_ACERTOS"] + df_descritor_agg["QTD_ERROS"])) * 100,
-        np.nan
-    )
+    # --- Agregação final por descritor (descrições anexadas após a soma) ---
+    df_descritor_agg = resultados["descritores"]
 
     # --- Exibir tabela agregada ---
     st.dataframe(
@@ -283,22 +344,20 @@ with tab3:
 
     st.write("Estatísticas descritivas:")
     st.dataframe(
-        df_filt[["TX_ACERTO", "QTD_ITENS", "QTD_ACERTOS"]].describe(),
+        resultados["estatisticas"],
         use_container_width=True
     )
 
     # --- Boxplot estético e legível ---
+    # Caixas a partir de quartis e bigodes já calculados (estatisticas_box): o
+    # navegador recebe algumas dezenas de números por descritor, não as linhas.
     # Ordena os descritores pela mediana de acerto (do menor ao maior)
-    ordenacao_descritores = (
-        df_filt.groupby("CD_DESCRITOR")["TX_ACERTO"].median().sort_values().index
-    )
+    ordenacao_descritores = resultados["box"]["mediana"].sort_values().index
 
-    fig_box = px.box(
-        df_filt,
-        x="CD_DESCRITOR",
-        y="TX_ACERTO",
-        category_orders={"CD_DESCRITOR": ordenacao_descritores},
-        color="CD_DESCRITOR",
+    fig_box = figura_box(
+        resultados["box"],
+        resultados["box_outliers"],
+        ordenacao_descritores,
         title="Distribuição da taxa de acerto por descritor",
         labels={"TX_ACERTO": "Taxa de acerto (%)", "CD_DESCRITOR": "Descritor"},
     )
@@ -322,3 +381,41 @@ with tab3:
     )
 
     st.plotly_chart(fig_box, use_container_width=True)
+
+
+# ==============================
+# EXPORTAÇÃO DA SELEÇÃO
+# ==============================
+# Tabelas agregadas (as mesmas das abas) num .zip; linhas da seleção lidas do
+# disco e gravadas em lotes num arquivo, gerado só quando pedido.
+st.markdown("---")
+with st.expander("📥 Exportar dados da seleção"):
+    formato = st.radio("Formato", FORMATOS, horizontal=True, key="formato_exportacao")
+    chave_atual = chave_consulta(BACKEND, CAMINHO_BASE, componente, nivel, **selecao)
+
+    st.download_button(
+        "📥 Tabelas agregadas (.zip)",
+        data=preparar_tabelas(chave_atual, VERSAO_BASE, formato, resultados),
+        file_name=f"resultados_{formato}.zip",
+        mime="application/zip",
+    )
+
+    # o download_button manda o arquivo inteiro pela sessão: a página só oferece
+    # seleções de até LIMITE_LINHAS_PAGINA linhas; as maiores saem pela CLI
+    if st.checkbox("Incluir as linhas da seleção (arquivo grande; Parquet é bem menor que CSV)"):
+        n_linhas = contar_linhas_selecao(chave_atual, VERSAO_BASE, componente, nivel, selecao)
+        if n_linhas > LIMITE_LINHAS_PAGINA:
+            st.warning(f"A seleção tem {n_linhas:,} linhas; a página exporta até {LIMITE_LINHAS_PAGINA:,}. "
+                       "Restrinja a seleção ou exporte pela linha de comando:")
+            st.code(comando_exportacao(CAMINHO_BASE, formato, componente, nivel, regiao, municipio, escola,
+                                       None if select_all else descritores_selecionados), language="bash")
+        else:
+            with st.spinner("Gravando as linhas da seleção..."):
+                caminho_linhas = arquivo_linhas(CAMINHO_BASE, formato, componente, nivel, **selecao)
+            with open(caminho_linhas, "rb") as f:
+                st.download_button(
+                    f"📥 Linhas da seleção ({n_linhas:,})",
+                    data=f,
+                    file_name=f"linhas_selecao.{formato}",
+                    mime="text/csv" if formato == "csv" else "application/octet-stream",
+                )
@@ -8,11 +8,27 @@ import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.io as pio
 import numpy as np
-from pyvis.network import Network
-import tempfile
+from pathlib import Path
+from urllib.parse import quote
 import streamlit.components.v1 as components
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+
+from clusters_descritores import carregar_clusters, clusters_por_k
+from rede_descritores import carregar_indice, html_rede, indice_arestas, layout_rede, vizinhos_acima
+
+# Caminhos a partir da raiz do projeto, não do diretório de onde o Streamlit foi iniciado
+RAIZ = Path(__file__).resolve().parent.parent
+PASTA_DADOS = RAIZ / "data"
+
+# A pasta lib/ (vis.js) servida pelo Streamlit como arquivos de um componente:
+# o HTML da rede só aponta para ela, sem embutir a biblioteca a cada desenho.
+# A URL depende de detalhes internos do Streamlit: o registro do componente
+# (nome = módulo da página + "lib_rede") e a rota "component/<nome>/<arquivo>"
+# do servidor, que não fazem parte da API pública. Conferido no Streamlit
+# 1.50.0, fixado em requirements.txt; ao atualizar, conferir se a rede ainda
+# carrega o vis.js. O servidor de arquivos estáticos (server.enableStaticServing)
+# não serve: entrega .js e .css como text/plain, e o navegador não os executa.
+lib_rede = components.declare_component("lib_rede", path=str(RAIZ / "lib"))
+URL_LIB = f"component/{quote(lib_rede.name)}"
 
 
 
@@ -43,9 +59,9 @@ with st.container(border=1):
     )
 
     arquivo_corr = (
-        "data/corr_descritores_LP.csv"
+        PASTA_DADOS / "corr_descritores_LP.csv"
         if componente == "Língua Portuguesa"
-        else "data/corr_descritores_MAT.csv"
+        else PASTA_DADOS / "corr_descritores_MAT.csv"
     )
 
     @st.cache_data
@@ -115,10 +131,31 @@ with st.container(border=1):
         options=[""] + sorted(corr.columns.tolist())
     )
 
+    # 🔹 Índice de arestas ordenado por |r|: filtros por limiar viram busca binária
+    sigla = "LP" if componente == "Língua Portuguesa" else "MAT"
+
+    @st.cache_resource
+    def carregar_indice_arestas(sigla):
+        caminho = PASTA_DADOS / f"arestas_descritores_{sigla}.npz"
+        if caminho.exists():
+            return carregar_indice(caminho)
+        # artefatos antigos (só a matriz): o índice sai da própria correlação
+        return indice_arestas(carregar_corrigida(PASTA_DADOS / f"corr_descritores_{sigla}.csv"))
+
+    indice = carregar_indice_arestas(sigla)
+
     # 🔹 Aplicar filtro
     if descritor_selecionado:
-        filtro = (corr_long['Descritor_1'] == descritor_selecionado) | (corr_long['Descritor_2'] == descritor_selecionado)
-        tabela_filtrada = corr_long[filtro & (corr_long['Correlação'].abs() >= 0.4)].sort_values(by='Correlação', ascending=False)
+        vizinhos = vizinhos_acima(indice, descritor_selecionado, 0.4)
+        posicao = {nome: i for i, nome in enumerate(corr.columns)}
+        primeiro = [posicao[d] < posicao[v] for d, v in zip(vizinhos["descritor"], vizinhos["vizinho"])]
+        tabela_filtrada = pd.DataFrame({
+            'Descritor_1': np.where(primeiro, vizinhos["descritor"], vizinhos["vizinho"]),
+            'Descritor_2': np.where(primeiro, vizinhos["vizinho"], vizinhos["descritor"]),
+            'Correlação': vizinhos["weight"],
+        })
+        tabela_filtrada['Intensidade'] = tabela_filtrada['Correlação'].apply(classificar_correlacao)
+        tabela_filtrada = tabela_filtrada.sort_values(by='Correlação', ascending=False)
     else:
         tabela_filtrada = corr_long.sort_values(by='Correlação', ascending=False)
 
@@ -130,68 +167,62 @@ with st.container(border=1):
     )
     st.markdown("### 🌐 Rede de correlações entre descritores")
 
-    # 🔹 Caminhos de arquivos (usando o mesmo componente já selecionado acima)
-    arquivo_arestas = (
-        "data/arestas_descritores_LP.csv"
-        if componente == "Língua Portuguesa"
-        else "data/arestas_descritores_MAT.csv"
-    )
-
-    @st.cache_data
-    def carregar_arestas(caminho):
-        df = pd.read_csv(caminho)
-        return df
-
-    arestas = carregar_arestas(arquivo_arestas)
-
     # 🔹 Filtro opcional por força mínima de correlação
     limiar = st.slider(
         "Selecione o limite mínimo de correlação (|r|):",
         min_value=0.3, max_value=0.9, value=0.5, step=0.05
     )
 
-    # Filtra as arestas pelo limiar escolhido
-    arestas_filtradas = arestas[arestas["weight"].abs() >= limiar]
-
-    # --- Criar rede com PyVis ---
-    net = Network(height="700px", width="100%", bgcolor="#0E1117", font_color="white", notebook=False)
+    # --- Rede: posições calculadas uma vez por componente, HTML em cache por limiar ---
+    @st.cache_resource
+    def carregar_layout(sigla):
+        return layout_rede(carregar_indice_arestas(sigla))
 
-    # Adicionar nós e arestas
-    for _, row in arestas_filtradas.iterrows():
-        src, tgt, w = row["source"], row["target"], row["weight"]
-        cor = "tomato" if w < 0 else "skyblue"
-        net.add_node(src, label=src, color="skyblue", size=10)
-        net.add_node(tgt, label=tgt, color="lightgreen", size=10)
-        net.add_edge(src, tgt, value=abs(w), color=cor, title=f"r = {w:.2f}")
-
-    # Layout da rede (força de repulsão ajustável)
-    net.repulsion(node_distance=150, central_gravity=0.3, spring_length=150, damping=0.9)
+    @st.cache_data
+    def desenhar_rede(sigla, limiar):
+        return html_rede(carregar_indice_arestas(sigla), carregar_layout(sigla), limiar, URL_LIB)
 
-    # --- Renderizar em arquivo temporário ---
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmpfile:
-        net.save_graph(tmpfile.name)
-        components.html(open(tmpfile.name, "r", encoding="utf-8").read(), height=700, scrolling=True)
+    components.html(desenhar_rede(sigla, limiar), height=700, scrolling=True)
 
 
 with st.container(border=1):
     st.subheader("Tabela dos Clusters encontrados por descritor")
 
-    # Parâmetros
-    n_clusters = st.slider("Selecione o número de clusters:", 2, 10, 3)
+    # Clusters de todos os k calculados uma vez por componente (arquivo do pipeline ou, sem ele, aqui)
+    @st.cache_data
+    def carregar_clusters_componente(sigla):
+        caminho_rotulos = PASTA_DADOS / f"clusters_descritores_{sigla}.csv"
+        caminho_silhueta = PASTA_DADOS / f"silhueta_descritores_{sigla}.csv"
+        if caminho_rotulos.exists() and caminho_silhueta.exists():
+            return carregar_clusters(caminho_rotulos, caminho_silhueta)
+        return clusters_por_k(carregar_corrigida(PASTA_DADOS / f"corr_descritores_{sigla}.csv"))
+
+    rotulos, silhueta = carregar_clusters_componente(sigla)
 
-    # Padroniza os dados
-    corr_for_clust = corr.fillna(0)  # substitui NaN por 0
-    scaler = StandardScaler()
-    X = scaler.fit_transform(corr_for_clust)
+    # Parâmetros
+    k_min, k_max = int(silhueta["k"].min()), int(silhueta["k"].max())
+    n_clusters = st.slider("Selecione o número de clusters:", k_min, k_max, min(3, k_max))
+
+    # Silhueta de cada k: quanto maior, mais separados os grupos
+    melhor_k = int(silhueta.loc[silhueta["silhueta"].idxmax(), "k"])
+    fig_silhueta = px.bar(
+        silhueta, x="k", y="silhueta",
+        color=np.where(silhueta["k"] == n_clusters, "Selecionado", "Outros"),
+        color_discrete_map={"Selecionado": "tomato", "Outros": "skyblue"},
+        labels={"k": "Número de clusters (k)", "silhueta": "Silhueta média", "color": ""},
+        title="Silhueta por número de clusters",
+    )
+    fig_silhueta.update_layout(height=300, margin=dict(l=50, r=50, t=60, b=40), showlegend=False)
+    st.plotly_chart(fig_silhueta, use_container_width=True)
 
-    # Executa KMeans
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    labels = kmeans.fit_predict(X)
+    silhueta_k = silhueta.loc[silhueta["k"] == n_clusters, "silhueta"]
+    if len(silhueta_k):
+        st.caption(f"Silhueta com k = {n_clusters}: {silhueta_k.iloc[0]:.3f} · maior silhueta em k = {melhor_k}.")
 
     # Cria DataFrame com os resultados
     clusters_df = pd.DataFrame({
         "Descritor": corr.columns,
-        "Cluster": labels
+        "Cluster": rotulos[n_clusters].reindex(corr.columns).to_numpy()
     }).sort_values("Cluster")
 
     # Exibe tabela no Streamlit
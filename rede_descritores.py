@@ -0,0 +1,191 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+# --- Configuração da rede de descritores ---
+# Índice de arestas: cada par de descritores uma vez só (triângulo superior da
+# matriz de correlação), ordenado por |r| decrescente, e a lista de vizinhos de
+# cada descritor no mesmo formato (deslocamentos por descritor, vizinhos em
+# ordem de |r|). "Arestas com |r| >= limiar" e "vizinhos de X com |r| >= limiar"
+# viram uma busca binária e uma fatia do começo, para qualquer limiar.
+# Desenho: posições calculadas uma vez por matriz (com as arestas do menor
+# limiar do slider) e enviadas prontas ao vis.js, com a física desligada; os
+# scripts do vis.js vêm da pasta lib/ servida pelo Streamlit, não do HTML.
+LIMIAR_LAYOUT = 0.3                 # menor limiar do slider da página
+DISTANCIA_NOS = 150                 # distância ideal entre nós ligados, em pixels
+ITERACOES_LAYOUT = 300
+GRAVIDADE = 0.1
+COR_FUNDO = "#0E1117"
+
+
+def indice_arestas(corr: pd.DataFrame) -> dict:
+    """Índice de todas as correlações finitas da matriz (pares distintos, sem a diagonal)."""
+    nomes = np.asarray(corr.columns, dtype=str)
+    valores = corr.to_numpy(dtype=np.float64)
+    origem, destino = np.triu_indices(len(nomes), k=1)
+    peso = valores[origem, destino]
+    finito = np.isfinite(peso)
+    origem, destino, peso = origem[finito], destino[finito], peso[finito]
+
+    ordem = np.argsort(-np.abs(peso), kind="stable")
+    origem, destino, peso = origem[ordem].astype(np.int32), destino[ordem].astype(np.int32), peso[ordem]
+
+    # adjacência: cada aresta nos dois sentidos, agrupada por descritor e, dentro
+    # dele, mantida a ordem por |r| (ordenação estável pelo descritor)
+    de = np.concatenate([origem, destino])
+    para = np.concatenate([destino, origem])
+    peso_adj = np.concatenate([peso, peso])
+    ordem_adj = np.lexsort((-np.abs(peso_adj), de))
+    deslocamentos = np.concatenate([[0], np.cumsum(np.bincount(de, minlength=len(nomes)))])
+
+    return {
+        "nomes": nomes,
+        "origem": origem,
+        "destino": destino,
+        "peso": peso,
+        "deslocamentos": deslocamentos.astype(np.int64),
+        "vizinhos": para[ordem_adj].astype(np.int32),
+        "peso_vizinhos": peso_adj[ordem_adj],
+    }
+
+
+def _prefixo(pesos: np.ndarray, limiar: float) -> int:
+    """Quantos pesos (em ordem de |r| decrescente) têm |r| >= limiar."""
+    return int(np.searchsorted(-np.abs(pesos), -limiar, side="right"))
+
+
+def arestas_acima(indice: dict, limiar: float) -> pd.DataFrame:
+    """Arestas com |r| >= limiar (uma por par), da mais forte à mais fraca."""
+    k = _prefixo(indice["peso"], limiar)
+    nomes = indice["nomes"]
+    return pd.DataFrame({
+        "source": nomes[indice["origem"][:k]],
+        "target": nomes[indice["destino"][:k]],
+        "weight": indice["peso"][:k],
+    })
+
+
+def vizinhos_acima(indice: dict, descritor: str, limiar: float) -> pd.DataFrame:
+    """Descritores ligados a `descritor` com |r| >= limiar, do mais forte ao mais fraco."""
+    posicao = np.flatnonzero(indice["nomes"] == descritor)
+    if not len(posicao):
+        return pd.DataFrame({"descritor": [], "vizinho": [], "weight": []})
+    inicio, fim = indice["deslocamentos"][posicao[0]], indice["deslocamentos"][posicao[0] + 1]
+    pesos = indice["peso_vizinhos"][inicio:fim]
+    k = _prefixo(pesos, limiar)
+    return pd.DataFrame({
+        "descritor": descritor,
+        "vizinho": indice["nomes"][indice["vizinhos"][inicio:inicio + k]],
+        "weight": pesos[:k],
+    })
+
+
+def layout_rede(indice: dict, limiar: float = LIMIAR_LAYOUT, iteracoes: int = ITERACOES_LAYOUT,
+                semente: int = 42) -> np.ndarray:
+    """
+    Posições (x, y) em pixels de todos os descritores, por Fruchterman-Reingold
+    com atração proporcional a |r| nas arestas com |r| >= limiar. Determinístico:
+    a mesma matriz dá sempre o mesmo desenho, e um limiar maior só esconde arestas.
+    """
+    n = len(indice["nomes"])
+    k = _prefixo(indice["peso"], limiar)
+    adjacencia = np.zeros((n, n))
+    adjacencia[indice["origem"][:k], indice["destino"][:k]] = np.abs(indice["peso"][:k])
+    adjacencia += adjacencia.T
+
+    posicoes = np.random.default_rng(semente).uniform(-1, 1, size=(n, 2))
+    ideal = np.sqrt(1 / max(n, 1))
+    temperatura = 0.1
+    passo = temperatura / (iteracoes + 1)
+    for _ in range(iteracoes):
+        delta = posicoes[:, None, :] - posicoes[None, :, :]
+        distancia = np.maximum(np.linalg.norm(delta, axis=-1), 0.01)
+        # repulsão entre todos os pares, atração só nas arestas
+        forca = ideal * ideal / distancia ** 2 - adjacencia * distancia / ideal
+        # gravidade leve para o centro: componentes soltos não se afastam sem fim
+        deslocamento = np.einsum("ijk,ij->ik", delta, forca) - GRAVIDADE * posicoes
+        tamanho = np.maximum(np.linalg.norm(deslocamento, axis=-1), 0.01)
+        posicoes += deslocamento * (np.minimum(tamanho, temperatura) / tamanho)[:, None]
+        temperatura -= passo
+
+    posicoes -= posicoes.mean(axis=0)
+    return posicoes * (DISTANCIA_NOS / ideal)
+
+
+def html_rede(indice: dict, posicoes: np.ndarray, limiar: float, url_lib: str, altura: int = 700) -> str:
+    """
+    Página HTML da rede com as arestas de |r| >= limiar e os nós que elas tocam,
+    nas posições de `layout_rede`. `url_lib` é o endereço da pasta lib/ (vis-9.1.2).
+    """
+    k = _prefixo(indice["peso"], limiar)
+    origem, destino, peso = indice["origem"][:k], indice["destino"][:k], indice["peso"][:k]
+    presentes = np.unique(np.concatenate([origem, destino]))
+    nomes = indice["nomes"]
+
+    nos = pd.DataFrame({
+        "id": nomes[presentes], "label": nomes[presentes],
+        "x": posicoes[presentes, 0].round(1), "y": posicoes[presentes, 1].round(1),
+    })
+    arestas = pd.DataFrame({
+        "from": nomes[origem], "to": nomes[destino], "value": np.abs(peso).round(4),
+        "color": np.where(peso < 0, "tomato", "skyblue"),
+        "title": [f"r = {w:.2f}" for w in peso],
+    })
+    opcoes = {
+        "physics": {"enabled": False},
+        "nodes": {"shape": "dot", "size": 10, "color": "skyblue", "font": {"color": "white"}},
+        "edges": {"smooth": False},
+        "interaction": {"hover": True},
+    }
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="{url_lib}/vis-9.1.2/vis-network.css">
+<script src="{url_lib}/vis-9.1.2/vis-network.min.js"></script>
+<style>body {{ margin: 0; background: {COR_FUNDO}; }} #rede {{ width: 100%; height: {altura}px; }}</style>
+</head>
+<body>
+<div id="rede"></div>
+<script>
+new vis.Network(
+    document.getElementById("rede"),
+    {{nodes: new vis.DataSet({nos.to_json(orient="records")}), edges: new vis.DataSet({arestas.to_json(orient="records")})}},
+    {json.dumps(opcoes)}
+);
+</script>
+</body>
+</html>
+"""
+
+
+def salvar_indice(indice: dict, caminho: str):
+    np.savez_compressed(caminho, **indice)
+
+
+def carregar_indice(caminho: str) -> dict:
+    with np.load(caminho, allow_pickle=False) as arquivo:
+        return {nome: arquivo[nome] for nome in arquivo.files}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arestas da rede de descritores a partir de uma matriz de correlação (CSV)")
+    parser.add_argument("--corr", default="data/corr_descritores_LP.csv")
+    parser.add_argument("--limiar", type=float, default=0.5)
+    parser.add_argument("--descritor", default=None, help="Mostra só os vizinhos deste descritor")
+    parser.add_argument("--html", default=None, help="Grava a rede desenhada neste arquivo (lib/ relativa a ele)")
+    args = parser.parse_args()
+
+    indice = indice_arestas(pd.read_csv(args.corr, index_col=0))
+    if args.html:
+        with open(args.html, "w", encoding="utf-8") as f:
+            f.write(html_rede(indice, layout_rede(indice), args.limiar, "lib"))
+        print(f"💾 Rede salva em: {args.html}")
+    elif args.descritor:
+        print(vizinhos_acima(indice, args.descritor, args.limiar).to_string(index=False))
+    else:
+        arestas = arestas_acima(indice, args.limiar)
+        print(f"🔗 {len(arestas)} de {len(indice['peso'])} pares com |r| >= {args.limiar}.")
+        print(arestas.head(20).to_string(index=False))
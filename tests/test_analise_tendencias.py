@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analise_tendencias import (DIAS_POR_ANO, crescimento, inclinacao, media_movel, ranking_escolas, taxa_acerto,
+                                variacao_anual)
+
+
+@pytest.fixture(scope="module")
+def serie():
+    """Escola × descritor × data, fora de ordem, com taxa nula e um grupo de uma data só."""
+    rng = np.random.default_rng(5)
+    datas = pd.to_datetime(["2023-03-01", "2023-09-01", "2024-03-01", "2024-09-01", "2025-03-01"])
+    linhas = [(e, d, dt) for e in ["E1", "E2", "E3"] for d in ["D01", "D02"] for dt in datas]
+    df = pd.DataFrame(linhas, columns=["NM_ESCOLA", "CD_DESCRITOR", "DT_REFERENCIA"])
+    df["QTD_ACERTOS"] = rng.integers(0, 30, len(df))
+    df["QTD_ERROS"] = rng.integers(0, 30, len(df))
+    df["TX_ACERTO"] = taxa_acerto(df["QTD_ACERTOS"], df["QTD_ERROS"])
+    df.loc[3, "TX_ACERTO"] = np.nan
+    unica = pd.DataFrame({"NM_ESCOLA": ["E4"], "CD_DESCRITOR": ["D01"], "DT_REFERENCIA": [datas[0]],
+                          "QTD_ACERTOS": [5], "QTD_ERROS": [5], "TX_ACERTO": [50.0]})
+    return pd.concat([df, unica], ignore_index=True).sample(frac=1, random_state=1)
+
+
+CHAVES = ["NM_ESCOLA", "CD_DESCRITOR"]
+
+
+def test_taxa_acerto_sem_respostas_e_nula():
+    erros = pd.Series([1, 0, pd.NA], dtype="Int64")
+    np.testing.assert_array_equal(taxa_acerto([3, 0, 1], erros), [75.0, np.nan, np.nan])
+
+
+def test_inclinacao_como_polyfit(serie):
+    resultado = inclinacao(serie, CHAVES).set_index(CHAVES)
+    origem = serie["DT_REFERENCIA"].min()
+    for chave, grupo in serie.dropna(subset=["TX_ACERTO"]).groupby(CHAVES):
+        x = (grupo["DT_REFERENCIA"] - origem).dt.days / DIAS_POR_ANO
+        linha = resultado.loc[chave]
+        assert linha["N_PONTOS"] == len(grupo)
+        if len(grupo) > 1:
+            np.testing.assert_allclose(linha["INCLINACAO"], np.polyfit(x, grupo["TX_ACERTO"], 1)[0])
+        else:
+            assert np.isnan(linha["INCLINACAO"])
+
+
+def test_crescimento_e_ultimo_menos_primeiro(serie):
+    resultado = crescimento(serie, CHAVES).set_index(CHAVES)["Crescimento"]
+    esperado = (
+        serie.sort_values("DT_REFERENCIA")
+        .groupby(CHAVES)["TX_ACERTO"]
+        .agg(lambda s: s.iloc[-1] - s.iloc[0] if len(s) > 1 else 0.0)
+    )
+    assert resultado.loc[("E4", "D01")] == 0
+    np.testing.assert_allclose(resultado.to_numpy(), esperado.loc[resultado.index].to_numpy())
+
+
+def test_media_movel_como_rolling(serie):
+    resultado = media_movel(serie, CHAVES, janela=3)
+    esperado = (
+        serie.sort_values(CHAVES + ["DT_REFERENCIA"])
+        .groupby(CHAVES)["TX_ACERTO"]
+        .transform(lambda s: s.rolling(3, min_periods=1).mean())
+    )
+    np.testing.assert_allclose(resultado["MEDIA_MOVEL"].to_numpy(), esperado.to_numpy())
+
+
+def test_variacao_anual_ponderada(serie):
+    anual = variacao_anual(serie, CHAVES).set_index(CHAVES + ["ANO"])
+    grupo = serie[(serie["NM_ESCOLA"] == "E1") & (serie["CD_DESCRITOR"] == "D02")]
+    somas = grupo.groupby(grupo["DT_REFERENCIA"].dt.year)[["QTD_ACERTOS", "QTD_ERROS"]].sum()
+    taxas = somas["QTD_ACERTOS"] / somas.sum(axis=1) * 100
+    np.testing.assert_allclose(anual.loc[("E1", "D02"), "TX_ACERTO"].to_numpy(), taxas.to_numpy())
+    np.testing.assert_allclose(anual.loc[("E1", "D02"), "VARIACAO"].to_numpy()[1:], np.diff(taxas.to_numpy()))
+    assert np.isnan(anual.loc[("E1", "D02", 2023), "VARIACAO"])
+
+
+def test_ranking_ordena_pela_melhora(serie):
+    cubo = serie.assign(NIVEL="Escola", NM_DISCIPLINA="MATEMÁTICA", NM_REGIONAL="R1", NM_MUNICIPIO="M1")
+    ranking = ranking_escolas(cubo, "MATEMÁTICA", descritores=["D01"])
+    # E4 tem uma data só e fica de fora
+    assert set(ranking["NM_ESCOLA"]) == {"E1", "E2", "E3"}
+    assert ranking["INCLINACAO"].is_monotonic_decreasing
+    assert ranking_escolas(cubo, "MATEMÁTICA", medida="crescimento")["Crescimento"].is_monotonic_decreasing
@@ -0,0 +1,63 @@
+import pytest
+
+from backend_consultas import BACKENDS, arvore_opcoes_disco, conferir_backends, consultar_resultados, ler_base
+from catalogo_descritores import carregar_catalogo
+from cubo_resultados import construir_cubo_df
+from gerar_base_sintetica import gerar_base_sintetica
+from motor_filtros import construir_indice
+from tratamento_base_unificada import preparar_base, preparar_base_incremental, preparar_base_paralela
+
+LINHAS_SINTETICAS = 60_000
+
+
+@pytest.fixture(scope="module")
+def entrada(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("sintetica")
+    return gerar_base_sintetica(LINHAS_SINTETICAS, str(pasta / "base_unificada.csv.gz"))
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return carregar_catalogo()
+
+
+@pytest.fixture(scope="module", params=["completo", "paralelo", "incremental"])
+def base_tratada(request, entrada, tmp_path_factory):
+    """Base gerada pelo ETL de verdade: categorias gravadas como colunas de dicionário."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DIDALE_CHAVE_ANONIMIZACAO", "chave-dos-testes")
+        saida = str(tmp_path_factory.mktemp(request.param) / "base_tratada.parquet")
+        if request.param == "completo":
+            preparar_base(entrada, saida)
+        elif request.param == "incremental":
+            # pasta com um fragmento por data: cada arquivo com o seu dicionário
+            saida = saida.replace(".parquet", "")
+            preparar_base_incremental(entrada, saida, tamanho_lote=5_000)
+        else:
+            # pedaços pequenos: várias partes e vários row groups no arquivo final
+            preparar_base_paralela([entrada], saida, processos=2, tamanho_lote=5_000, tamanho_bloco=1 << 19)
+    return saida
+
+
+def test_backends_dao_os_mesmos_numeros(base_tratada, catalogo):
+    assert conferir_backends(base_tratada, catalogo, selecoes_por_nivel=2) == 0
+
+
+def test_escola_so_ve_descritores_do_componente(base_tratada, catalogo):
+    df = ler_base(base_tratada)
+    indice, cubo = construir_indice(df), construir_cubo_df(df)
+    opcoes = arvore_opcoes_disco(base_tratada)
+    regiao = opcoes["regioes"][0]
+    municipio = opcoes["municipios"][regiao][0]
+    selecao = dict(componente="MATEMÁTICA", nivel="Escola", regiao=regiao, municipio=municipio,
+                   escola=opcoes["escolas"][municipio][0], descritores=opcoes["descritores"]["MATEMÁTICA"])
+
+    permitidos = set(opcoes["descritores"]["MATEMÁTICA"])
+    linhas = {}
+    for backend in BACKENDS:
+        resultados = consultar_resultados(backend, base_tratada, catalogo=catalogo,
+                                          df=df, indice=indice, cubo=cubo, **selecao)
+        serie = resultados["serie"]
+        assert set(serie["CD_DESCRITOR"].astype(str)) <= permitidos, backend
+        linhas[backend] = len(serie)
+    assert len(set(linhas.values())) == 1, linhas
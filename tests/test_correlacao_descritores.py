@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlacao_descritores import METODOS, corr_descritores
+
+ESCOLAS = 400
+DESCRITORES = 23
+TAMANHO_BLOCO = 5       # blocos menores que o número de colunas: vários ladrilhos por par
+MIN_PERIODS = 150
+
+
+@pytest.fixture(scope="module")
+def matriz():
+    """Taxas suavizadas (muitos empates) com ~40% de células sem dado e uma coluna constante."""
+    rng = np.random.default_rng(7)
+    fator = rng.normal(size=(ESCOLAS, 1))
+    itens = rng.integers(1, 10, size=(ESCOLAS, DESCRITORES))
+    prob = 1 / (1 + np.exp(-(fator + rng.normal(size=(ESCOLAS, DESCRITORES)))))
+    taxas = (rng.binomial(itens, prob) + 1) / (itens + 2)
+    taxas[:, 3] = 0.5
+    taxas[rng.random(taxas.shape) < 0.4] = np.nan
+    # coluna quase vazia: pares abaixo de min_periods
+    taxas[rng.random(ESCOLAS) < 0.7, 11] = np.nan
+    return pd.DataFrame(taxas, columns=[f"D{j:02d}" for j in range(DESCRITORES)])
+
+
+@pytest.mark.parametrize("metodo", METODOS)
+def test_mesmo_resultado_do_pandas(matriz, metodo):
+    corr, n = corr_descritores(matriz, metodo, MIN_PERIODS, tamanho_bloco=TAMANHO_BLOCO)
+    referencia = matriz.corr(method=metodo, min_periods=MIN_PERIODS)
+
+    assert corr.index.equals(referencia.index) and corr.columns.equals(referencia.columns)
+    np.testing.assert_array_equal(np.isnan(corr.to_numpy()), np.isnan(referencia.to_numpy()))
+    np.testing.assert_allclose(corr.to_numpy(), referencia.to_numpy(), rtol=0, atol=1e-12)
+
+    presentes = matriz.notna().to_numpy(dtype=np.int64)
+    np.testing.assert_array_equal(n.to_numpy(), presentes.T @ presentes)
+
+
+def test_pares_sem_dados_suficientes_ficam_nulos(matriz):
+    corr, n = corr_descritores(matriz, "pearson", MIN_PERIODS, tamanho_bloco=TAMANHO_BLOCO)
+    assert corr.isna().to_numpy()[n.to_numpy() < MIN_PERIODS].all()
+    # coluna constante: variância nula em qualquer par
+    assert corr["D03"].isna().all()
+
+
+def test_tamanho_do_bloco_nao_muda_o_resultado(matriz):
+    for metodo in METODOS:
+        pequeno, _ = corr_descritores(matriz, metodo, MIN_PERIODS, tamanho_bloco=TAMANHO_BLOCO)
+        inteiro, _ = corr_descritores(matriz, metodo, MIN_PERIODS, tamanho_bloco=DESCRITORES)
+        np.testing.assert_allclose(pequeno.to_numpy(), inteiro.to_numpy(), rtol=0, atol=1e-12)
+
+
+def test_metodo_desconhecido(matriz):
+    with pytest.raises(ValueError):
+        corr_descritores(matriz, "kendall")
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from estatisticas_box import FATOR_IQR, descrever_pesos, estatisticas_box
+
+
+@pytest.fixture(scope="module")
+def linhas():
+    """Taxas por descritor com caudas longas (outliers), nulos, um descritor só com nulos e um com uma linha."""
+    rng = np.random.default_rng(3)
+    rotulos = rng.choice(["D01", "D02", "D03"], size=3000)
+    valores = np.round(rng.standard_t(2, size=3000) * 10 + 60, 1)
+    valores[rng.random(3000) < 0.05] = np.nan
+    rotulos = np.concatenate([rotulos, ["D04", "D04", "D05"]])
+    valores = np.concatenate([valores, [np.nan, np.nan, 42.0]])
+    return pd.DataFrame({"CD_DESCRITOR": rotulos, "TX_ACERTO": valores})
+
+
+def test_quartis_e_bigodes_como_numpy(linhas):
+    estatisticas, outliers = estatisticas_box(linhas["CD_DESCRITOR"], linhas["TX_ACERTO"], limite_outliers=10)
+
+    assert list(estatisticas.index) == ["D01", "D02", "D03", "D04", "D05"]
+    assert estatisticas.loc["D04", "n"] == 0 and estatisticas.loc["D04"].drop("n").isna().all()
+    for rotulo in ["D01", "D02", "D03", "D05"]:
+        v = linhas.loc[linhas["CD_DESCRITOR"] == rotulo, "TX_ACERTO"].dropna().to_numpy()
+        q1, mediana, q3 = np.quantile(v, [0.25, 0.5, 0.75])
+        linha = estatisticas.loc[rotulo]
+        assert linha["n"] == len(v)
+        np.testing.assert_allclose([linha["q1"], linha["mediana"], linha["q3"]], [q1, mediana, q3])
+
+        dentro = v[(v >= q1 - FATOR_IQR * (q3 - q1)) & (v <= q3 + FATOR_IQR * (q3 - q1))]
+        assert linha["cerca_inferior"] == dentro.min() and linha["cerca_superior"] == dentro.max()
+
+        # outliers: só pontos fora dos bigodes, no máximo o limite, incluindo o mais extremo de baixo
+        fora = np.sort(v[(v < dentro.min()) | (v > dentro.max())])
+        pontos = outliers.loc[outliers["CD_DESCRITOR"] == rotulo, "TX_ACERTO"].to_numpy()
+        assert len(pontos) == min(len(fora), 10)
+        assert np.isin(pontos, fora).all()
+        if len(fora):
+            assert pontos.min() == fora[0]
+
+
+def test_pesos_equivalem_a_linhas_repetidas(linhas):
+    histograma = linhas.dropna().value_counts().rename("pesos").reset_index()
+    repetidas = histograma.loc[histograma.index.repeat(histograma["pesos"])]
+
+    esperado, outliers_esperados = estatisticas_box(repetidas["CD_DESCRITOR"], repetidas["TX_ACERTO"])
+    obtido, outliers = estatisticas_box(histograma["CD_DESCRITOR"], histograma["TX_ACERTO"],
+                                        pesos=histograma["pesos"])
+    pd.testing.assert_frame_equal(obtido, esperado)
+    pd.testing.assert_frame_equal(outliers.reset_index(drop=True), outliers_esperados.reset_index(drop=True))
+
+    descricao = descrever_pesos(histograma["TX_ACERTO"], histograma["pesos"])
+    pd.testing.assert_series_equal(descricao, repetidas["TX_ACERTO"].describe(), check_names=False)
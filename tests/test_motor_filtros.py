@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor_filtros import arvore_opcoes, construir_indice, filtrar
+
+
+@pytest.fixture(scope="module", params=["texto", "categoria"])
+def base(request):
+    """Hierarquia regional → município → escola com nulos e 'nan' textual, como texto ou como categoria."""
+    rng = np.random.default_rng(11)
+    n = 5000
+    escolas = {f"E{i}": (f"M{i % 6}", f"R{i % 6 % 3}") for i in range(20)}
+    escola = rng.choice(list(escolas), n)
+    df = pd.DataFrame({
+        "NM_DISCIPLINA": rng.choice(["LÍNGUA PORTUGUESA", "MATEMÁTICA", None], n, p=[0.45, 0.45, 0.1]),
+        "NM_REGIONAL": [escolas[e][1] for e in escola],
+        "NM_MUNICIPIO": [escolas[e][0] for e in escola],
+        "NM_ESCOLA": escola,
+        "CD_DESCRITOR": rng.choice(["D01", "D02", "D03", None], n),
+    })
+    df.loc[rng.random(n) < 0.02, "NM_REGIONAL"] = "nan"
+    df.loc[rng.random(n) < 0.02, "NM_ESCOLA"] = None
+    if request.param == "categoria":
+        df = df.astype("category")
+    return df
+
+
+def _consulta(df, componente, nivel, regiao=None, municipio=None, escola=None, descritores=None):
+    """A seleção como a página fazia antes, com máscaras encadeadas."""
+    mascara = df["NM_DISCIPLINA"] == componente
+    if descritores is not None:
+        mascara &= df["CD_DESCRITOR"].isin(descritores)
+    if nivel == "Regional" and regiao:
+        mascara &= df["NM_REGIONAL"] == regiao
+    elif nivel == "Município" and municipio:
+        mascara &= df["NM_MUNICIPIO"] == municipio
+    elif nivel == "Escola" and escola:
+        mascara &= df["NM_ESCOLA"] == escola
+    return df[mascara]
+
+
+@pytest.mark.parametrize("selecao", [
+    dict(componente="MATEMÁTICA", nivel="Estado"),
+    dict(componente="LÍNGUA PORTUGUESA", nivel="Regional", regiao="R1", descritores=["D01", "D03"]),
+    dict(componente="MATEMÁTICA", nivel="Município", regiao="R2", municipio="M5"),
+    dict(componente="MATEMÁTICA", nivel="Escola", regiao="R0", municipio="M3", escola="E9", descritores=["D02"]),
+    dict(componente="MATEMÁTICA", nivel="Escola", regiao="R0", municipio="M3", escola="inexistente"),
+    dict(componente="FÍSICA", nivel="Estado"),
+])
+def test_filtrar_equivale_as_mascaras(base, selecao):
+    indice = construir_indice(base)
+    pd.testing.assert_frame_equal(filtrar(base, indice, **selecao), _consulta(base, **selecao))
+
+
+def test_arvore_de_opcoes(base):
+    opcoes = arvore_opcoes(base)
+    assert opcoes["componentes"] == ["LÍNGUA PORTUGUESA", "MATEMÁTICA"]
+    assert opcoes["regioes"] == ["R0", "R1", "R2"]
+    assert opcoes["descritores"]["MATEMÁTICA"] == ["D01", "D02", "D03"]
+    assert opcoes["municipios"]["R1"] == ["M1", "M4"]
+    assert opcoes["escolas"]["M0"] == ["E0", "E12", "E18", "E6"]
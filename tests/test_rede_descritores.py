@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rede_descritores import (arestas_acima, carregar_indice, html_rede, indice_arestas, layout_rede, salvar_indice,
+                              vizinhos_acima)
+
+
+@pytest.fixture(scope="module")
+def corr():
+    """Matriz de correlação simétrica com pares sem valor (NaN), como a de `corr_descritores`."""
+    rng = np.random.default_rng(2)
+    nomes = [f"D{j:02d}" for j in range(12)]
+    valores = np.corrcoef(rng.normal(size=(12, 30)) + rng.normal(size=(1, 30)))
+    valores[2, 7] = valores[7, 2] = np.nan
+    return pd.DataFrame(valores, index=nomes, columns=nomes)
+
+
+def _pares(corr: pd.DataFrame, limiar: float) -> dict:
+    """Força bruta: (origem, destino) -> r de cada par distinto com |r| >= limiar."""
+    nomes = list(corr.columns)
+    return {(nomes[i], nomes[j]): corr.iat[i, j]
+            for i in range(len(nomes)) for j in range(i + 1, len(nomes))
+            if np.isfinite(corr.iat[i, j]) and abs(corr.iat[i, j]) >= limiar}
+
+
+@pytest.mark.parametrize("limiar", [0.0, 0.3, 0.6, 1.1])
+def test_arestas_acima_do_limiar(corr, limiar):
+    arestas = arestas_acima(indice_arestas(corr), limiar)
+    obtido = {(o, d): w for o, d, w in arestas.itertuples(index=False)}
+    assert obtido == _pares(corr, limiar)
+    assert (arestas["weight"].abs().diff().dropna() <= 0).all()
+
+
+def test_vizinhos_de_um_descritor(corr):
+    indice = indice_arestas(corr)
+    vizinhos = vizinhos_acima(indice, "D07", 0.3)
+    esperado = {(d if o == "D07" else o): w for (o, d), w in _pares(corr, 0.3).items() if "D07" in (o, d)}
+    assert dict(zip(vizinhos["vizinho"], vizinhos["weight"])) == esperado
+    assert "D02" not in set(vizinhos["vizinho"])
+    assert vizinhos_acima(indice, "D99", 0.3).empty
+
+
+def test_indice_gravado_e_lido(corr, tmp_path):
+    indice = indice_arestas(corr)
+    caminho = str(tmp_path / "arestas.npz")
+    salvar_indice(indice, caminho)
+    lido = carregar_indice(caminho)
+    assert lido.keys() == indice.keys()
+    for nome in indice:
+        np.testing.assert_array_equal(lido[nome], indice[nome])
+
+
+def test_layout_deterministico_e_html(corr):
+    indice = indice_arestas(corr)
+    posicoes = layout_rede(indice, iteracoes=50)
+    assert posicoes.shape == (len(corr), 2) and np.isfinite(posicoes).all()
+    np.testing.assert_array_equal(posicoes, layout_rede(indice, iteracoes=50))
+
+    html = html_rede(indice, posicoes, 0.6, "lib")
+    assert 'src="lib/vis-9.1.2/vis-network.min.js"' in html
+    assert html.count('"from"') == len(_pares(corr, 0.6))
@@ -1,89 +1,932 @@
+import argparse
+import glob
+import hashlib
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pandas.tseries.api import guess_datetime_format
 import os
+import shutil
 
-def preparar_base(caminho_entrada: str = r"data/base_unificada.csv.gz",
-                  caminho_saida: str = r"data/base_tratada.parquet") -> pd.DataFrame:
-  
+from anonimizacao import COLUNA_ID, COLUNA_ORIGEM, anonimizar, obter_chave
+from cubo_resultados import construir_cubo
+from padronizacao import descritor_valido, padronizar_disciplina
+from validacao_base import (caminho_relatorio, combinar_etapas, gravar_relatorio, medir, pasta_hashes,
+                            validar_lote)
+
+# --- Configuração do tratamento ---
+# Esquema da base tratada: contagens e códigos em inteiros estreitos (com nulos
+# reais) e rótulos de baixa cardinalidade como categorias (dicionário no parquet).
+COL_INT = {'QTD_ITENS': 'Int16', 'QTD_ACERTOS': 'Int32', 'QTD_ERROS': 'Int32'}
+COL_CODIGO = {'CD_ESTADO': 'UInt8', 'CD_REGIONAL': 'UInt16', 'CD_MUNICIPIO': 'UInt32',
+              'CD_ESCOLA': 'UInt32', 'CD_TURMA': 'UInt64'}
+COL_CATEGORIA = ['NM_AVALIACAO', 'TP_INSTANCIA', 'NM_DISCIPLINA', 'CD_DESCRITOR',
+                 'NM_ESTADO', 'NM_REGIONAL', 'NM_MUNICIPIO', 'NM_ESCOLA',
+                 'NM_TURMA', 'NM_FONTE']
+COL_FLOAT = ['TX_ACERTO']
+COL_DATA = ['DT_REFERENCIA']
+
+TAMANHO_LOTE_PADRAO = 500_000
+TAMANHO_BLOCO_PADRAO = 256 * 1024 * 1024  # bytes por pedaço de CSV sem compressão
+
+# Dataset particionado: uma pasta por componente e ano, linhas ordenadas pela
+# hierarquia usada nos filtros, para que as estatísticas min/max de cada row
+# group permitam pular blocos inteiros na leitura.
+COLUNAS_PARTICAO = ['NM_DISCIPLINA', 'ANO']
+ORDEM_PARTICAO = ['NM_REGIONAL', 'NM_MUNICIPIO', 'NM_ESCOLA', 'CD_DESCRITOR']
+LINHAS_POR_ROW_GROUP = 128 * 1024
+
+
+def como_categoria(serie: pd.Series, categorias: list | None = None) -> pd.Series:
     """
-    Carrega e trata a base unificada aplicando:
-    - Anonimização de CD_ALUNO_INEP
-    - Remoção de CHAVE_COMBINACAO
-    - Padronização de NM_DISCIPLINA
-    - Exclusão de linhas com descritor ausente
-    - Ajuste de tipos de variáveis
-    - Salvamento em formato parquet
+    Converte um rótulo em categoria. Colunas não textuais (ex.: totalmente nulas)
+    passam por texto antes, para que o dicionário seja sempre de strings.
     """
+    if serie.dtype != object:
+        serie = serie.astype('string')
+    if categorias is None:
+        return serie.astype('category')
+    return serie.astype(pd.CategoricalDtype(categorias))
 
-    print("🔄 Iniciando tratamento da base...")
 
-    # Leitura da base original
-    df = pd.read_csv(caminho_entrada, compression="gzip")
-    print(f"✅ Base original carregada: {df.shape[0]} linhas e {df.shape[1]} colunas")
+def tratar_lote(df: pd.DataFrame, formato_data: str | None = None,
+                categorias: dict | None = None, verbose: bool = False) -> pd.DataFrame:
+    """
+    Aplica a um lote (ou à base inteira) as etapas de tratamento:
+    anonimização, remoção de CHAVE_COMBINACAO, padronização de NM_DISCIPLINA,
+    exclusão de descritores ausentes e ajuste de tipos.
+
+    `formato_data` fixa o formato de DT_REFERENCIA; quando None, o pandas
+    infere o formato a partir do primeiro valor não nulo do lote.
+    `categorias` fixa o dicionário de cada coluna categórica; quando None,
+    as categorias são os valores presentes no lote, em ordem.
+    """
+    categorias = categorias or {}
 
     # --- Anonimização ---
-    if 'CD_ALUNO_INEP' in df.columns:
-        df['ID_ANONIMO'] = pd.util.hash_pandas_object(df['CD_ALUNO_INEP'], index=False).astype(str)
-        df.drop(columns=['CD_ALUNO_INEP'], inplace=True)
-        print("🔐 Coluna 'CD_ALUNO_INEP' anonimizada com sucesso.")
+    if COLUNA_ORIGEM in df.columns:
+        df = anonimizar(df)
+        if verbose:
+            print("🔐 Coluna 'CD_ALUNO_INEP' anonimizada com sucesso.")
 
     # --- Remover coluna desnecessária ---
     if 'CHAVE_COMBINACAO' in df.columns:
         df.drop(columns=['CHAVE_COMBINACAO'], inplace=True)
-        print("🧹 Coluna 'CHAVE_COMBINACAO' removida.")
+        if verbose:
+            print("🧹 Coluna 'CHAVE_COMBINACAO' removida.")
 
     # --- Padronizar nome dos componentes ---
     if 'NM_DISCIPLINA' in df.columns:
-        df['NM_DISCIPLINA'] = (
-            df['NM_DISCIPLINA']
-            .astype(str)
-            .str.strip()
-            .str.upper()
-            .replace({
-                'LP': 'LÍNGUA PORTUGUESA',
-                'Língua Portuguesa': 'LÍNGUA PORTUGUESA',
-                'MAT': 'MATEMÁTICA',
-                'Mt': 'MATEMÁTICA',
-                'Matemática': 'MATEMÁTICA',
-                'Lp': 'LÍNGUA PORTUGUESA',
-                'MT': 'MATEMÁTICA'
-            })
-        )
-        print("🎯 Coluna 'NM_DISCIPLINA' padronizada.")
+        df['NM_DISCIPLINA'] = padronizar_disciplina(df['NM_DISCIPLINA'])
+        if verbose:
+            print("🎯 Coluna 'NM_DISCIPLINA' padronizada.")
 
     # --- Excluir linhas com descritor nulo ---
     if 'CD_DESCRITOR' in df.columns:
         linhas_antes = len(df)
-        df = df[df['CD_DESCRITOR'].notna() & (df['CD_DESCRITOR'].astype(str).str.lower() != 'nan')]
-        print(f"🧽 Linhas removidas com descritor ausente: {linhas_antes - len(df)}")
+        df = df[descritor_valido(df['CD_DESCRITOR'])].copy(deep=False)
+        if verbose:
+            print(f"🧽 Linhas removidas com descritor ausente: {linhas_antes - len(df)}")
 
     # --- Ajuste de tipos ---
-    col_int = ['QTD_ITENS', 'QTD_ACERTOS', 'QTD_ERROS']
-    col_float = ['TX_ACERTO']
-    col_data = ['DT_REFERENCIA']
-
     for col in df.columns:
-        if col in col_int:
-            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
-        elif col in col_float:
+        if col in COL_INT:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(COL_INT[col])
+        elif col in COL_CODIGO:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(COL_CODIGO[col])
+        elif col in COL_CATEGORIA:
+            df[col] = como_categoria(df[col], categorias.get(col))
+        elif col in COL_FLOAT:
             df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
-        elif col in col_data:
-            if not pd.api.types.is_datetime64_any_dtype(df["DT_REFERENCIA"]):
-                df["DT_REFERENCIA"] = pd.to_datetime(df["DT_REFERENCIA"], errors="coerce")
+        elif col in COL_DATA:
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], errors="coerce", format=formato_data)
+        elif col == COLUNA_ID:
+            continue
         else:
-            df[col] = df[col].astype(str)
+            df[col] = df[col].astype('string')
+
+    if verbose:
+        print("🧩 Tipos de dados ajustados.")
+
+    return df
+
+
+def esquema_arrow(df: pd.DataFrame) -> pa.Schema:
+    """
+    Esquema arrow do lote com índices de dicionário em int32 e valores em string,
+    para que lotes com quantidades diferentes de categorias (inclusive nenhuma)
+    possam ser gravados no mesmo arquivo.
+    """
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, campo in enumerate(schema):
+        if pa.types.is_dictionary(campo.type):
+            schema = schema.set(i, campo.with_type(pa.dictionary(pa.int32(), pa.string())))
+    return schema
 
-    print("🧩 Tipos de dados ajustados.")
 
-    # --- Salvamento final ---
+def _unificar_tipos(tipos_por_lote: dict) -> dict:
+    """Reproduz o dtype que o pandas inferiria lendo o arquivo inteiro de uma vez."""
+    tipos = {}
+    for col, vistos in tipos_por_lote.items():
+        if len(vistos) == 1:
+            tipos[col] = next(iter(vistos))
+        elif vistos <= {'int64', 'float64'}:
+            tipos[col] = 'float64'
+        else:
+            tipos[col] = 'object'
+    return tipos
+
+
+def _ler_csv(pedaco, tamanho_lote: int, tipos: dict | None = None):
+    """
+    Leitor em lotes de um CSV. `pedaco` é um caminho (compressão inferida pela
+    extensão) ou uma tupla `(caminho, inicio, fim)` com um intervalo de bytes,
+    alinhado a quebras de linha, de um CSV sem compressão.
+    """
+    caminho, inicio, fim = pedaco if isinstance(pedaco, tuple) else (pedaco, None, None)
+    if inicio is None:
+        return pd.read_csv(caminho, compression="infer", chunksize=tamanho_lote, dtype=tipos)
+
+    with open(caminho, "rb") as f:
+        cabecalho = f.readline()
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    return pd.read_csv(io.BytesIO(cabecalho + dados), chunksize=tamanho_lote, dtype=tipos)
+
+
+def _perfilar(pedaco, tamanho_lote: int = TAMANHO_LOTE_PADRAO) -> dict:
+    """
+    Primeira passada sobre um arquivo (ou pedaço), um lote por vez: dtypes vistos
+    em cada coluna, formato de DT_REFERENCIA e valores de cada coluna categórica
+    nas linhas que serão mantidas.
+    """
+    tipos_por_lote = {}
+    formato_data = None
+    valores = {}
+
+    for lote in _ler_csv(pedaco, tamanho_lote):
+        for col, tipo in lote.dtypes.items():
+            tipos_por_lote.setdefault(col, set()).add(str(tipo))
+
+        if 'CD_DESCRITOR' in lote.columns:
+            lote = lote[descritor_valido(lote['CD_DESCRITOR'])]
+        if 'NM_DISCIPLINA' in lote.columns:
+            lote = lote.assign(NM_DISCIPLINA=padronizar_disciplina(lote['NM_DISCIPLINA']))
+        for col in COL_CATEGORIA:
+            if col in lote.columns:
+                valores.setdefault(col, set()).update(como_categoria(lote[col]).cat.categories)
+
+        if formato_data is None and 'DT_REFERENCIA' in lote.columns:
+            validos = lote['DT_REFERENCIA'].dropna()
+            if len(validos) and isinstance(validos.iloc[0], str):
+                formato_data = guess_datetime_format(validos.iloc[0])
+
+    return {"tipos": tipos_por_lote, "formato_data": formato_data, "valores": valores}
+
+
+def _combinar_perfis(perfis: list[dict]) -> tuple[dict, str | None, dict]:
+    """
+    Junta os perfis de vários arquivos/pedaços, na ordem de leitura, como se
+    fossem um único CSV: `(tipos, formato_data, categorias ordenadas)`.
+    """
+    tipos_por_lote, valores = {}, {}
+    formato_data = None
+    for perfil in perfis:
+        for col, vistos in perfil["tipos"].items():
+            tipos_por_lote.setdefault(col, set()).update(vistos)
+        for col, v in perfil["valores"].items():
+            valores.setdefault(col, set()).update(v)
+        if formato_data is None:
+            formato_data = perfil["formato_data"]
+
+    categorias = {col: sorted(v) for col, v in valores.items()}
+    return _unificar_tipos(tipos_por_lote), formato_data, categorias
+
+
+def inferir_tipos(caminho_entrada: str,
+                  tamanho_lote: int = TAMANHO_LOTE_PADRAO) -> tuple[dict, str | None, dict]:
+    """
+    Primeira passada sobre o CSV, um lote por vez e sem manter a base em memória:
+    descobre o dtype de cada coluna, o formato de DT_REFERENCIA e o dicionário
+    (ordenado) de cada coluna categórica nas linhas que serão mantidas.
+    """
+    return _combinar_perfis([_perfilar(caminho_entrada, tamanho_lote)])
+
+
+def _origem(pedaco) -> str:
+    """Nome do arquivo (ou intervalo de bytes) usado no relatório de validação."""
+    if isinstance(pedaco, tuple):
+        caminho, inicio, fim = pedaco
+        return f"{caminho}[{inicio}:{fim}]"
+    return pedaco
+
+
+def ler_lotes_tratados(caminho_entrada, tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+                       perfil: tuple | None = None, validacoes: list | None = None,
+                       etapas: dict | None = None, pasta_validacao: str | None = None):
+    """
+    Gera `(linhas_lidas, lote_tratado)` para cada bloco de `tamanho_lote` linhas do
+    CSV, com dtypes e categorias fixados por `inferir_tipos` (ou pelo `perfil`
+    já combinado, quando o arquivo faz parte de uma base maior).
+
+    Com `validacoes`, cada lote bruto é validado antes do tratamento e o
+    resultado parcial é acrescentado à lista (hashes de duplicados em
+    `pasta_validacao`); com `etapas`, o tempo e a memória de perfil, leitura,
+    validação e tratamento são acumulados no dicionário.
+    """
+    if perfil is None:
+        with medir(etapas, "perfil"):
+            perfil = inferir_tipos(caminho_entrada, tamanho_lote)
+        print(f"🔎 Tipos inferidos para {len(perfil[0])} colunas.")
+    tipos, formato_data, categorias = perfil
+
+    leitor = iter(_ler_csv(caminho_entrada, tamanho_lote, tipos))
+    inicio = 0
+    while True:
+        with medir(etapas, "leitura"):
+            lote = next(leitor, None)
+        if lote is None:
+            break
+
+        linhas_lidas = len(lote)
+        if validacoes is not None:
+            with medir(etapas, "validacao"):
+                validacoes.append(validar_lote(lote, _origem(caminho_entrada), inicio, formato_data,
+                                               pasta=pasta_validacao))
+        with medir(etapas, "tratamento"):
+            lote_tratado = tratar_lote(lote, formato_data=formato_data,
+                                       categorias=categorias).reset_index(drop=True)
+        inicio += linhas_lidas
+        yield linhas_lidas, lote_tratado
+
+
+def preparar_base_streaming(caminho_entrada: str = r"data/base_unificada.csv.gz",
+                            caminho_saida: str = r"data/base_tratada.parquet",
+                            tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+                            relatorio: str | None = None) -> int:
+    """
+    Versão em lotes de `preparar_base`: lê o CSV compactado em blocos de
+    `tamanho_lote` linhas, trata cada bloco e grava um row group por bloco no
+    parquet de saída. O pico de memória depende do tamanho do lote, não da base.
+
+    Os dtypes e os dicionários das categorias são fixados numa primeira passada,
+    para que o resultado seja igual ao da leitura completa. Cada lote é validado
+    antes do tratamento; o relatório (padrão: `<saída>_validacao.json`) traz
+    também tempo e memória de cada etapa. Retorna o número de linhas gravadas.
+    """
+
+    print(f"🔄 Iniciando tratamento da base em lotes de {tamanho_lote:,} linhas...")
+
+    obter_chave(criar=not os.path.exists(caminho_saida))
     os.makedirs(os.path.dirname(caminho_saida), exist_ok=True)
-    df.to_parquet(caminho_saida, index=False)
-    print(f"💾 Base tratada salva em: {caminho_saida}")
+
+    # hashes de duplicados da validação: apagados mesmo se a execução falhar
+    with pasta_hashes() as pasta_validacao:
+        writer = None
+        schema = None
+        lote_tratado = None
+        linhas_lidas = 0
+        linhas_gravadas = 0
+        validacoes, etapas = [], {}
+
+        try:
+            for lidas, lote_tratado in ler_lotes_tratados(caminho_entrada, tamanho_lote,
+                                                          validacoes=validacoes, etapas=etapas,
+                                                          pasta_validacao=pasta_validacao):
+                linhas_lidas += lidas
+                if lote_tratado.empty:
+                    continue
+
+                with medir(etapas, "gravacao"):
+                    if writer is None:
+                        schema = esquema_arrow(lote_tratado)
+                        writer = pq.ParquetWriter(caminho_saida, schema)
+
+                    writer.write_table(pa.Table.from_pandas(lote_tratado, schema=schema, preserve_index=False))
+                linhas_gravadas += len(lote_tratado)
+                print(f"   ↳ {linhas_lidas:,} linhas lidas, {linhas_gravadas:,} gravadas")
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None and lote_tratado is not None:
+            lote_tratado.to_parquet(caminho_saida, index=False)
+
+        print(f"🧽 Linhas removidas com descritor ausente: {linhas_lidas - linhas_gravadas}")
+        print(f"💾 Base tratada salva em: {caminho_saida}")
+
+        gravar_relatorio(relatorio or caminho_relatorio(caminho_saida), validacoes, etapas,
+                         modo="streaming", entradas=[caminho_entrada], saida=caminho_saida,
+                         linhas_lidas=linhas_lidas, linhas_gravadas=linhas_gravadas)
+
+    return linhas_gravadas
+
+
+def gravar_base_particionada(df: pd.DataFrame, pasta_saida: str,
+                             linhas_por_row_group: int = LINHAS_POR_ROW_GROUP) -> str:
+    """
+    Grava a base como dataset parquet particionado no estilo hive
+    (`NM_DISCIPLINA=.../ANO=.../parte-0.parquet`), ordenado dentro de cada
+    partição por regional, município, escola e descritor.
+
+    A leitura com filtros, ex. `pd.read_parquet(pasta, filters=[("NM_DISCIPLINA",
+    "==", "MATEMÁTICA"), ("NM_REGIONAL", "==", "SRE CARAPINA")])`, descarta as
+    pastas de outras disciplinas e os row groups de outras regionais.
+    O dataset é montado numa pasta temporária e trocado de lugar ao final.
+    """
+    if 'DT_REFERENCIA' in df.columns:
+        df = df.assign(ANO=df['DT_REFERENCIA'].dt.year.astype('Int16'))
+    particoes = [c for c in COLUNAS_PARTICAO if c in df.columns]
+    ordem = particoes + [c for c in ORDEM_PARTICAO if c in df.columns]
+    df = df.sort_values(ordem, kind='stable')
+
+    # ANO entra só na tabela arrow (vira pasta), sem metadado pandas que o
+    # faria ser lido de volta como Int16 em vez de categoria de partição
+    ano = df.pop('ANO') if 'ANO' in df.columns else None
+    tabela = pa.Table.from_pandas(df, schema=esquema_arrow(df), preserve_index=False)
+    if ano is not None:
+        tabela = tabela.append_column('ANO', pa.array(ano, type=pa.int16()))
+    for col in particoes:
+        campo = tabela.schema.field(col)
+        if pa.types.is_dictionary(campo.type):
+            tabela = tabela.set_column(tabela.schema.get_field_index(col), col,
+                                       tabela[col].cast(campo.type.value_type))
+    esquema_particao = pa.schema([tabela.schema.field(c) for c in particoes])
+
+    pasta_saida = os.path.normpath(pasta_saida)
+    temporaria = f"{pasta_saida}.tmp"
+    antiga = f"{pasta_saida}.old"
+    for pasta in (temporaria, antiga):
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    ds.write_dataset(
+        tabela, temporaria, format="parquet",
+        partitioning=ds.partitioning(esquema_particao, flavor="hive"),
+        basename_template="parte-{i}.parquet",
+        min_rows_per_group=linhas_por_row_group,
+        max_rows_per_group=linhas_por_row_group,
+        use_threads=False,  # preserva a ordenação dentro das partições
+    )
+
+    os.makedirs(temporaria, exist_ok=True)  # base vazia: dataset sem partições
+    if os.path.exists(pasta_saida):
+        os.replace(pasta_saida, antiga)
+    os.replace(temporaria, pasta_saida)
+    shutil.rmtree(antiga, ignore_errors=True)
+
+    return pasta_saida
+
+
+# ==============================
+# MODO INCREMENTAL
+# ==============================
+MANIFESTO = "_manifesto.json"
+# Partições de data alteradas são montadas inteiras em `<pasta>.novo/dt_<data>` e
+# trocadas de lugar por os.replace; as versões substituídas passam por
+# `<pasta>.antigo/` até o manifesto ser gravado. As duas pastas ficam fora do
+# dataset: o glob `**` do polars também enxerga pastas ocultas.
+SUFIXO_NOVAS = ".novo"
+SUFIXO_ANTIGAS = ".antigo"
+
+
+def _resolver_entradas(entradas: str | list[str]) -> list[str]:
+    """Expande caminhos, pastas (seus *.csv e *.csv.gz) e padrões glob em uma lista ordenada de arquivos."""
+    if isinstance(entradas, str):
+        entradas = [entradas]
+    arquivos = set()
+    for padrao in entradas:
+        if os.path.isdir(padrao):
+            arquivos.update(glob.glob(os.path.join(padrao, "*.csv")))
+            arquivos.update(glob.glob(os.path.join(padrao, "*.csv.gz")))
+            continue
+        arquivos.update(glob.glob(padrao) or ([padrao] if os.path.exists(padrao) else []))
+    return sorted(os.path.normpath(a) for a in arquivos)
+
+
+def _sha256(caminho: str, bloco: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for parte in iter(lambda: f.read(bloco), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def _arquivo_alterado(caminho: str, registro: dict | None) -> tuple[bool, dict]:
+    """
+    Compara o arquivo com o registro do manifesto. Tamanho e mtime iguais bastam
+    para considerá-lo inalterado; caso contrário, decide pelo sha256 do conteúdo.
+    """
+    info = os.stat(caminho)
+    digital = {"tamanho": info.st_size, "mtime_ns": info.st_mtime_ns}
+    if registro and all(registro.get(k) == v for k, v in digital.items()):
+        return False, {**registro, **digital}
+
+    digital["sha256"] = _sha256(caminho)
+    if registro and registro.get("sha256") == digital["sha256"]:
+        return False, {**registro, **digital}
+    return True, digital
+
+
+def gravar_json_atomico(caminho: str, conteudo: dict):
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def ler_manifesto(pasta_saida: str) -> dict:
+    caminho = os.path.join(pasta_saida, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {"arquivos": {}}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _chave_data(datas: pd.Series) -> pd.Series:
+    """Partição de cada linha: a data de referência (AAAA-MM-DD) ou 'sem_data'."""
+    return datas.dt.strftime("%Y-%m-%d").fillna("sem_data")
+
+
+def _tratar_arquivo_por_data(caminho: str, particao, tamanho_lote: int,
+                             validacoes: list | None = None, etapas: dict | None = None,
+                             pasta_validacao: str | None = None) -> tuple[dict, int]:
+    """
+    Trata um arquivo de entrada em lotes e grava um fragmento por data de
+    referência em `particao(data)/<arquivo>-<id>.parquet` (a pasta temporária da
+    partição). Os fragmentos são escritos com nome temporário e só trocados de
+    lugar ao final. Retorna `({data: fragmento relativo ao dataset}, linhas gravadas)`.
+    """
+    nome = os.path.basename(caminho).split(".")[0]
+    sufixo = hashlib.sha1(caminho.encode("utf-8")).hexdigest()[:8]
+    writers, schemas, temporarios = {}, {}, {}
+    linhas_gravadas = 0
+
+    try:
+        for _, lote in ler_lotes_tratados(caminho, tamanho_lote, validacoes=validacoes, etapas=etapas,
+                                          pasta_validacao=pasta_validacao):
+            if lote.empty:
+                continue
+            chaves = (_chave_data(lote["DT_REFERENCIA"]) if "DT_REFERENCIA" in lote.columns
+                      else pd.Series("sem_data", index=lote.index))
+
+            with medir(etapas, "gravacao"):
+                for data, parte in lote.groupby(chaves, sort=True):
+                    if data not in writers:
+                        relativo = os.path.join(f"dt_{data}", f"{nome}-{sufixo}.parquet")
+                        temporario = os.path.join(particao(data), f".{nome}-{sufixo}.parquet.tmp")
+                        schemas[data] = esquema_arrow(parte)
+                        writers[data] = pq.ParquetWriter(temporario, schemas[data])
+                        temporarios[data] = (temporario, relativo)
+                    tabela = pa.Table.from_pandas(parte.reset_index(drop=True), schema=schemas[data],
+                                                  preserve_index=False)
+                    writers[data].write_table(tabela)
+                    linhas_gravadas += len(parte)
+    except BaseException:
+        for writer in writers.values():
+            writer.close()
+        for temporario, _ in temporarios.values():
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        raise
+
+    fragmentos = {}
+    for data, writer in writers.items():
+        writer.close()
+        temporario, relativo = temporarios[data]
+        os.replace(temporario, os.path.join(particao(data), os.path.basename(relativo)))
+        fragmentos[data] = relativo
+
+    return fragmentos, linhas_gravadas
+
+
+def _ligar_ou_copiar(origem: str, destino: str):
+    """Hard link do fragmento (sem copiar dados); cópia quando o sistema de arquivos não permite."""
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copy2(origem, destino)
+
+
+def _preparar_particao(pasta_saida: str, data: str, descartados: set) -> str:
+    """
+    Cria (uma vez) a pasta nova da partição `dt_<data>` com os fragmentos atuais
+    que continuam valendo, isto é, fora de `descartados` (fragmentos relativos
+    de arquivos alterados ou removidos). Retorna o caminho da pasta nova.
+    """
+    nova = os.path.join(pasta_saida + SUFIXO_NOVAS, f"dt_{data}")
+    if os.path.isdir(nova):
+        return nova
+    os.makedirs(nova)
+    atual = os.path.join(pasta_saida, f"dt_{data}")
+    if os.path.isdir(atual):
+        for nome in os.listdir(atual):
+            if nome.endswith(".parquet") and os.path.join(f"dt_{data}", nome) not in descartados:
+                _ligar_ou_copiar(os.path.join(atual, nome), os.path.join(nova, nome))
+    return nova
+
+
+def _trocar_particoes(pasta_saida: str, datas: set):
+    """Põe cada partição nova no lugar da atual (que vai para `<pasta>.antigo`); partições vazias somem."""
+    novas, antigas = pasta_saida + SUFIXO_NOVAS, pasta_saida + SUFIXO_ANTIGAS
+    os.makedirs(antigas, exist_ok=True)
+    for data in sorted(datas):
+        atual, nova = os.path.join(pasta_saida, f"dt_{data}"), os.path.join(novas, f"dt_{data}")
+        if os.path.isdir(atual):
+            os.replace(atual, os.path.join(antigas, f"dt_{data}"))
+        if os.listdir(nova):
+            os.replace(nova, atual)
+    shutil.rmtree(novas)
+
+
+def _recuperar_particoes(pasta_saida: str):
+    """
+    Desfaz uma execução interrompida antes do manifesto: partições novas são
+    descartadas e uma partição que já tinha saído do lugar volta. O manifesto
+    antigo continua válido e os arquivos pendentes são reprocessados.
+    """
+    novas, antigas = pasta_saida + SUFIXO_NOVAS, pasta_saida + SUFIXO_ANTIGAS
+    if os.path.isdir(antigas):
+        for nome in os.listdir(antigas):
+            if not os.path.exists(os.path.join(pasta_saida, nome)):
+                os.replace(os.path.join(antigas, nome), os.path.join(pasta_saida, nome))
+        shutil.rmtree(antigas)
+    if os.path.isdir(novas):
+        shutil.rmtree(novas)
+
+
+def preparar_base_incremental(entradas: str | list[str] = r"data/base_unificada*.csv.gz",
+                              pasta_saida: str = r"data/base_tratada",
+                              tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+                              forcar: bool = False,
+                              relatorio: str | None = None) -> dict:
+    """
+    Tratamento incremental: mantém em `pasta_saida` um dataset parquet com um
+    fragmento por (arquivo de entrada, data de referência) e um manifesto com a
+    impressão digital de cada entrada. A cada execução só são reprocessados os
+    arquivos novos ou alterados; os fragmentos de arquivos removidos são apagados.
+    O relatório de validação (padrão `<pasta>_validacao.json`) cobre só os
+    arquivos processados nesta execução.
+
+    O dataset é lido normalmente com `pd.read_parquet(pasta_saida)`. Cada
+    partição de data alterada é montada numa pasta temporária (fragmentos
+    mantidos por hard link + fragmentos novos) e trocada de lugar com os.replace
+    só depois de todas as entradas tratadas; o manifesto é gravado por último,
+    de forma atômica. Se a execução for interrompida, as partições voltam ao
+    estado do manifesto e os arquivos pendentes são reprocessados na próxima vez.
+    Retorna o resumo da execução (arquivos e datas processados).
+    """
+
+    print("🔄 Iniciando tratamento incremental da base...")
+    # com manifesto, os fragmentos mantidos foram gerados com a chave atual: nunca gerar outra
+    pasta_saida = os.path.normpath(pasta_saida)
+    obter_chave(criar=not os.path.exists(os.path.join(pasta_saida, MANIFESTO)))
+    os.makedirs(pasta_saida, exist_ok=True)
+    _recuperar_particoes(pasta_saida)
+
+    manifesto = ler_manifesto(pasta_saida)
+    registros = manifesto.get("arquivos", {})
+    arquivos = _resolver_entradas(entradas)
+
+    novos_registros = {}
+    alterados = []
+    for caminho in arquivos:
+        alterado, digital = _arquivo_alterado(caminho, registros.get(caminho))
+        if alterado or forcar:
+            alterados.append((caminho, digital))
+        else:
+            novos_registros[caminho] = digital
+
+    removidos = [c for c in registros if c not in arquivos]
+    datas_afetadas = set()
+
+    if not alterados and not removidos:
+        print("✅ Nenhuma entrada nova ou alterada. Base já atualizada.")
+        return {"processados": [], "removidos": [], "datas": []}
+
+    # fragmentos que saem do dataset: os de arquivos alterados ou removidos
+    substituidos = [c for c, _ in alterados] + removidos
+    descartados = {relativo for caminho in substituidos
+                   for relativo in registros.get(caminho, {}).get("fragmentos", {}).values()}
+
+    def particao(data: str) -> str:
+        datas_afetadas.add(data)
+        return _preparar_particao(pasta_saida, data, descartados)
+
+    # hashes de duplicados da validação: apagados mesmo se a execução falhar
+    with pasta_hashes() as pasta_validacao:
+        try:
+            # partições que perdem fragmentos são remontadas mesmo sem dados novos
+            for caminho in substituidos:
+                for data in registros.get(caminho, {}).get("fragmentos", {}):
+                    particao(data)
+
+            validacoes, etapas = [], {}
+            for caminho, digital in alterados:
+                print(f"📥 Processando {caminho}...")
+                fragmentos, linhas = _tratar_arquivo_por_data(caminho, particao, tamanho_lote, validacoes, etapas,
+                                                               pasta_validacao)
+                novos_registros[caminho] = {**digital, "linhas": linhas, "fragmentos": fragmentos}
+            for caminho in removidos:
+                print(f"🗑️ Entrada removida: {caminho}")
+        except BaseException:
+            shutil.rmtree(pasta_saida + SUFIXO_NOVAS, ignore_errors=True)
+            raise
+
+        _trocar_particoes(pasta_saida, datas_afetadas)
+        gravar_json_atomico(os.path.join(pasta_saida, MANIFESTO), {
+            "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+            "arquivos": novos_registros,
+        })
+        shutil.rmtree(pasta_saida + SUFIXO_ANTIGAS)
+
+        print(f"📅 Datas de referência atualizadas: {', '.join(sorted(datas_afetadas)) or '-'}")
+        print(f"💾 Base tratada (incremental) salva em: {pasta_saida}")
+
+        if alterados:
+            gravar_relatorio(relatorio or caminho_relatorio(pasta_saida), validacoes, etapas,
+                             modo="incremental", entradas=[c for c, _ in alterados], saida=pasta_saida,
+                             linhas_lidas=sum(p["linhas"] for p in validacoes),
+                             linhas_gravadas=sum(novos_registros[c]["linhas"] for c, _ in alterados))
+
+    return {
+        "processados": [c for c, _ in alterados],
+        "removidos": removidos,
+        "datas": sorted(datas_afetadas),
+    }
+
+
+# ==============================
+# MODO PARALELO
+# ==============================
+def _dividir_em_pedacos(arquivos: list[str], tamanho_bloco: int) -> list:
+    """
+    Unidades de trabalho do modo paralelo, na ordem de leitura. Arquivos
+    compactados são lidos inteiros (gzip não permite acesso por posição); CSVs sem
+    compressão maiores que `tamanho_bloco` viram intervalos de bytes alinhados ao
+    início de uma linha. Supõe que nenhum campo contenha quebra de linha.
+    """
+    pedacos = []
+    for caminho in arquivos:
+        if not caminho.endswith(".csv") or os.path.getsize(caminho) <= tamanho_bloco:
+            pedacos.append(caminho)
+            continue
+
+        tamanho = os.path.getsize(caminho)
+        with open(caminho, "rb") as f:
+            f.readline()
+            limites = [f.tell()]
+            while limites[-1] + tamanho_bloco < tamanho:
+                f.seek(limites[-1] + tamanho_bloco)
+                f.readline()
+                if f.tell() >= tamanho:
+                    break
+                limites.append(f.tell())
+        limites.append(tamanho)
+        pedacos.extend((caminho, inicio, fim) for inicio, fim in zip(limites[:-1], limites[1:]))
+    return pedacos
+
+
+def _tratar_pedaco(pedaco, caminho_parte: str, perfil: tuple, tamanho_lote: int,
+                   pasta_validacao: str | None = None) -> tuple:
+    """
+    Trata um pedaço num processo do pool e grava o resultado em `caminho_parte`.
+    Retorna `(linhas lidas, linhas gravadas, validações parciais, etapas medidas)`.
+    """
+    writer = None
+    schema = None
+    lote_tratado = None
+    linhas_lidas = 0
+    linhas_gravadas = 0
+    validacoes, etapas = [], {}
+
+    try:
+        for lidas, lote_tratado in ler_lotes_tratados(pedaco, tamanho_lote, perfil=perfil,
+                                                      validacoes=validacoes, etapas=etapas,
+                                                      pasta_validacao=pasta_validacao):
+            linhas_lidas += lidas
+            if lote_tratado.empty:
+                continue
+            with medir(etapas, "gravacao"):
+                if writer is None:
+                    schema = esquema_arrow(lote_tratado)
+                    writer = pq.ParquetWriter(caminho_parte, schema)
+                writer.write_table(pa.Table.from_pandas(lote_tratado, schema=schema, preserve_index=False))
+            linhas_gravadas += len(lote_tratado)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None and lote_tratado is not None:
+        pq.write_table(pa.Table.from_pandas(lote_tratado, schema=esquema_arrow(lote_tratado),
+                                            preserve_index=False), caminho_parte)
+
+    return linhas_lidas, linhas_gravadas, validacoes, etapas
+
+
+def _concatenar_partes(partes: list[str], caminho_saida: str):
+    """Junta as partes em um único parquet, row group a row group e na ordem dada."""
+    temporario = f"{caminho_saida}.tmp"
+    schema = pq.read_schema(partes[0])
+    with pq.ParquetWriter(temporario, schema) as writer:
+        for parte in partes:
+            arquivo = pq.ParquetFile(parte)
+            for i in range(arquivo.num_row_groups):
+                writer.write_table(arquivo.read_row_group(i).cast(schema))
+    os.replace(temporario, caminho_saida)
+
+
+def preparar_base_paralela(entradas: str | list[str] = r"data/base_unificada*.csv.gz",
+                           caminho_saida: str = r"data/base_tratada.parquet",
+                           processos: int | None = None,
+                           tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+                           tamanho_bloco: int = TAMANHO_BLOCO_PADRAO,
+                           relatorio: str | None = None) -> int:
+    """
+    Tratamento em paralelo: divide a entrada (pasta, glob ou lista de arquivos,
+    compactados ou não) em pedaços e processa cada um num processo separado.
+
+    Também a primeira passada (tipos, formato de data e categorias) roda no
+    pool e é combinada antes da segunda, então todos os pedaços usam o mesmo
+    perfil. O resultado não depende do número de processos: as partes saem na
+    ordem dos pedaços, igual ao modo streaming sobre as entradas concatenadas.
+
+    Se `caminho_saida` termina em `.parquet`, as partes são concatenadas em um
+    único arquivo; senão, viram um dataset (`parte-00000.parquet`, ...) nessa pasta.
+    O relatório de validação junta os resultados de todos os pedaços; nas etapas
+    medidas dentro do pool, os tempos são somados entre os processos.
+    Retorna o número de linhas gravadas.
+    """
+
+    arquivos = _resolver_entradas(entradas)
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhum arquivo de entrada encontrado em: {entradas}")
+
+    # resolve (ou gera, se ainda não há saída) a chave antes de abrir o pool
+    obter_chave(criar=not os.path.exists(caminho_saida))
+    pedacos = _dividir_em_pedacos(arquivos, tamanho_bloco)
+    print(f"🔄 Iniciando tratamento paralelo: {len(arquivos)} arquivo(s), {len(pedacos)} pedaço(s), "
+          f"{processos or os.cpu_count()} processo(s)...")
+
+    caminho_saida = os.path.normpath(caminho_saida)
+    arquivo_unico = caminho_saida.endswith(".parquet")
+    pasta_partes = f"{caminho_saida}.partes" if arquivo_unico else f"{caminho_saida}.tmp"
+    shutil.rmtree(pasta_partes, ignore_errors=True)
+    os.makedirs(pasta_partes)
+    partes = [os.path.join(pasta_partes, f"parte-{i:05d}.parquet") for i in range(len(pedacos))]
+
+    # hashes de duplicados da validação (gravados pelos processos): apagados mesmo se a execução falhar
+    with pasta_hashes() as pasta_validacao:
+        etapas = {}
+        try:
+            with ProcessPoolExecutor(max_workers=processos) as pool:
+                with medir(etapas, "perfil"):
+                    perfil = _combinar_perfis(list(pool.map(_perfilar, pedacos, [tamanho_lote] * len(pedacos))))
+                print(f"🔎 Tipos inferidos para {len(perfil[0])} colunas.")
+
+                with medir(etapas, "pool"):
+                    resultados = list(pool.map(_tratar_pedaco, pedacos, partes,
+                                               [perfil] * len(pedacos), [tamanho_lote] * len(pedacos),
+                                               [pasta_validacao] * len(pedacos)))
+
+            linhas_lidas = sum(r[0] for r in resultados)
+            linhas_gravadas = sum(r[1] for r in resultados)
+            validacoes = [parcial for r in resultados for parcial in r[2]]
+            etapas.update(combinar_etapas([r[3] for r in resultados]))
+
+            partes = [parte for parte in partes if os.path.exists(parte)]
+            if not partes:
+                raise ValueError("As entradas não têm nenhuma linha de dados.")
+
+            if arquivo_unico:
+                os.makedirs(os.path.dirname(caminho_saida) or ".", exist_ok=True)
+                with medir(etapas, "concatenacao"):
+                    _concatenar_partes(partes, caminho_saida)
+            else:
+                antiga = f"{caminho_saida}.old"
+                shutil.rmtree(antiga, ignore_errors=True)
+                if os.path.exists(caminho_saida):
+                    os.replace(caminho_saida, antiga)
+                os.replace(pasta_partes, caminho_saida)
+                shutil.rmtree(antiga, ignore_errors=True)
+        finally:
+            shutil.rmtree(pasta_partes, ignore_errors=True)
+
+        print(f"🧽 Linhas removidas com descritor ausente: {linhas_lidas - linhas_gravadas}")
+        print(f"💾 Base tratada salva em: {caminho_saida}")
+
+        gravar_relatorio(relatorio or caminho_relatorio(caminho_saida), validacoes, etapas,
+                         modo="paralelo", processos=processos or os.cpu_count(), entradas=arquivos,
+                         saida=caminho_saida, linhas_lidas=linhas_lidas, linhas_gravadas=linhas_gravadas)
+
+    return linhas_gravadas
+
+
+def preparar_base(caminho_entrada: str = r"data/base_unificada.csv.gz",
+                  caminho_saida: str = r"data/base_tratada.parquet",
+                  particionar: bool = False,
+                  relatorio: str | None = None) -> pd.DataFrame:
+
+    """
+    Carrega e trata a base unificada aplicando:
+    - Validação dos dados brutos (relatório JSON com tempo e memória por etapa,
+      padrão `<saída>_validacao.json`)
+    - Anonimização de CD_ALUNO_INEP
+    - Remoção de CHAVE_COMBINACAO
+    - Padronização de NM_DISCIPLINA
+    - Exclusão de linhas com descritor ausente
+    - Ajuste de tipos de variáveis (inteiros estreitos, categorias e nulos reais)
+    - Salvamento em formato parquet (arquivo único ou, com `particionar=True`,
+      dataset particionado por componente e ano em `caminho_saida`)
+
+    Para bases que não cabem em memória, use `preparar_base_streaming`.
+    """
+
+    print("🔄 Iniciando tratamento da base...")
+
+    obter_chave(criar=not os.path.exists(caminho_saida))
+    etapas = {}
+
+    # Leitura da base original
+    with medir(etapas, "leitura"):
+        df = pd.read_csv(caminho_entrada, compression="gzip")
+    print(f"✅ Base original carregada: {df.shape[0]} linhas e {df.shape[1]} colunas")
+    linhas_lidas = len(df)
+
+    # hashes de duplicados da validação: apagados mesmo se a execução falhar
+    with pasta_hashes() as pasta_validacao:
+        # --- Validação ---
+        with medir(etapas, "validacao"):
+            validacoes = [validar_lote(df, caminho_entrada, 0, pasta=pasta_validacao)]
+
+        with medir(etapas, "tratamento"):
+            df = tratar_lote(df, verbose=True)
+
+        # --- Salvamento final ---
+        os.makedirs(os.path.dirname(caminho_saida), exist_ok=True)
+        with medir(etapas, "gravacao"):
+            if particionar:
+                gravar_base_particionada(df, caminho_saida)
+            else:
+                df.to_parquet(caminho_saida, index=False)
+        print(f"💾 Base tratada salva em: {caminho_saida}")
+
+        gravar_relatorio(relatorio or caminho_relatorio(caminho_saida), validacoes, etapas,
+                         modo="completo", entradas=[caminho_entrada], saida=caminho_saida,
+                         linhas_lidas=linhas_lidas, linhas_gravadas=len(df))
 
     return df
 
 
 if __name__ == "__main__":
-    preparar_base()
+    parser = argparse.ArgumentParser(description="Tratamento da base unificada")
+    parser.add_argument("--entrada", nargs="+", default=[r"data/base_unificada.csv.gz"],
+                        help="Arquivo(s) CSV compactado(s); aceita padrões glob no modo incremental")
+    parser.add_argument("--saida", default=None)
+    parser.add_argument("--lote", type=int, default=None,
+                        help="Processa em lotes com este número de linhas (modo streaming)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reprocessa só entradas novas/alteradas em um dataset particionado por data")
+    parser.add_argument("--forcar", action="store_true", help="No modo incremental, reprocessa tudo")
+    parser.add_argument("--processos", type=int, default=None,
+                        help="Processa as entradas (pasta, glob ou arquivos) em paralelo com N processos")
+    parser.add_argument("--particionar", action="store_true",
+                        help="Grava dataset particionado por componente e ano (pasta em --saida)")
+    parser.add_argument("--relatorio", default=None,
+                        help="Relatório JSON de validação e tempos (padrão: <saída>_validacao.json)")
+    parser.add_argument("--sem-cubo", action="store_true",
+                        help="Não reconstrói o cubo de resultados (data/cubo_<base>.parquet) da base gerada")
+    args = parser.parse_args()
+
+    if args.incremental or args.particionar:
+        saida = args.saida or r"data/base_tratada"
+    else:
+        saida = args.saida or r"data/base_tratada.parquet"
+
+    if args.incremental:
+        preparar_base_incremental(args.entrada, saida,
+                                  tamanho_lote=args.lote or TAMANHO_LOTE_PADRAO, forcar=args.forcar,
+                                  relatorio=args.relatorio)
+    elif args.processos:
+        preparar_base_paralela(args.entrada, saida,
+                               processos=args.processos, tamanho_lote=args.lote or TAMANHO_LOTE_PADRAO,
+                               relatorio=args.relatorio)
+    elif args.lote:
+        preparar_base_streaming(args.entrada[0], saida,
+                                tamanho_lote=args.lote, relatorio=args.relatorio)
+    elif args.particionar:
+        preparar_base(args.entrada[0], saida, particionar=True, relatorio=args.relatorio)
+    else:
+        preparar_base(args.entrada[0], saida, relatorio=args.relatorio)
+
+    # o cubo da página é uma etapa do ETL: a página só o lê (e recusa cubo de outra versão da base)
+    if not args.sem_cubo:
+        construir_cubo(saida)
 
 
 
@@ -0,0 +1,399 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from padronizacao import descritor_valido, padronizar_disciplina
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- Configuração da validação ---
+# Regras aplicadas a cada lote do CSV bruto, antes do tratamento (que converte
+# valores inválidos em nulo sem avisar). Só contam e guardam exemplos: nenhuma
+# linha é descartada aqui.
+COLUNAS_ESPERADAS = [
+    "NM_AVALIACAO", "DT_REFERENCIA", "TP_INSTANCIA", "NM_DISCIPLINA", "CD_DESCRITOR",
+    "QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS", "CD_ESCOLA", "CD_MUNICIPIO", "CD_REGIONAL",
+    "NM_ESCOLA", "NM_MUNICIPIO", "NM_REGIONAL", "CD_ESTADO", "NM_ESTADO", "NM_FONTE",
+    "CD_TURMA", "NM_TURMA", "TX_ACERTO", "CD_ALUNO_INEP", "CHAVE_COMBINACAO",
+]
+COL_NUMERICAS = ["QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS", "TX_ACERTO",
+                 "CD_ESTADO", "CD_REGIONAL", "CD_MUNICIPIO", "CD_ESCOLA", "CD_TURMA", "CD_ALUNO_INEP"]
+COL_CONTAGENS = ["QTD_ITENS", "QTD_ACERTOS", "QTD_ERROS"]
+DISCIPLINAS_VALIDAS = {"LÍNGUA PORTUGUESA", "MATEMÁTICA"}
+INSTANCIAS_VALIDAS = {"ALUNO", "TURMA", "ESCOLA", "MUNICIPIO", "REGIONAL", "ESTADO"}
+
+# Colunas que nunca vão para o relatório (identificação do aluno)
+COLUNAS_SENSIVEIS = ["CD_ALUNO_INEP", "ID_ANONIMO", "CHAVE_COMBINACAO"]
+AMOSTRAS_POR_REGRA = 5
+
+# Duplicados: cada lote grava seus hashes ordenados num arquivo temporário (na
+# pasta da execução, ver `pasta_hashes`); ao combinar, cada arquivo é lido por
+# posição (seek), uma faixa de hashes de cada vez, achada por busca binária no
+# próprio arquivo, de modo que a memória fica limitada por este teto, não pelo
+# número de linhas da base.
+MEMORIA_DUPLICADOS_MB = 64
+
+REGRAS = {
+    "nao_numerico": "QTD_*, TX_ACERTO ou CD_* preenchido com valor não numérico",
+    "data_invalida": "DT_REFERENCIA preenchida com valor que não é data",
+    "contagem_negativa": "QTD_ITENS, QTD_ACERTOS ou QTD_ERROS negativo",
+    "acertos_erros_diferente_itens": "Linha de aluno com QTD_ACERTOS + QTD_ERROS diferente de QTD_ITENS",
+    "tx_acerto_fora_intervalo": "TX_ACERTO fora de [0, 1]",
+    "disciplina_desconhecida": "NM_DISCIPLINA fora do mapa de grafias conhecidas",
+    "instancia_desconhecida": "TP_INSTANCIA fora das instâncias conhecidas",
+    "descritor_ausente": "CD_DESCRITOR nulo (a linha é removida no tratamento)",
+}
+
+
+# --- Tempo e memória por etapa ---
+
+def _memoria_mb() -> float | None:
+    """Memória residente atual do processo (Linux); None onde não há /proc."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return round(paginas * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _pico_mb() -> float | None:
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS, em bytes
+    return round(pico / (2**20 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def medir(etapas: dict | None, nome: str):
+    """
+    Acumula em `etapas[nome]` o tempo de parede, o número de chamadas, a memória
+    residente ao final e o pico de memória do processo. Com `etapas=None`, não mede.
+    """
+    if etapas is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro = etapas.setdefault(nome, {"tempo_s": 0.0, "chamadas": 0})
+        registro["tempo_s"] = round(registro["tempo_s"] + time.perf_counter() - inicio, 4)
+        registro["chamadas"] += 1
+        registro["memoria_mb"] = _memoria_mb()
+        registro["pico_mb"] = _pico_mb()
+
+
+def combinar_etapas(lista: list[dict]) -> dict:
+    """Soma tempos e chamadas de várias medições (ex.: um processo por pedaço) e fica com o maior pico."""
+    etapas = {}
+    for medidas in lista:
+        for nome, registro in medidas.items():
+            total = etapas.setdefault(nome, {"tempo_s": 0.0, "chamadas": 0, "memoria_mb": None, "pico_mb": None})
+            total["tempo_s"] = round(total["tempo_s"] + registro["tempo_s"], 4)
+            total["chamadas"] += registro["chamadas"]
+            for campo in ["memoria_mb", "pico_mb"]:
+                if registro.get(campo) is not None:
+                    total[campo] = max(total[campo] or 0, registro[campo])
+    return etapas
+
+
+# --- Regras ---
+
+def _nao_numerico(lote: pd.DataFrame) -> pd.Series:
+    mascara = pd.Series(False, index=lote.index)
+    for col in COL_NUMERICAS:
+        if col in lote.columns and not pd.api.types.is_numeric_dtype(lote[col]):
+            mascara |= lote[col].notna() & pd.to_numeric(lote[col], errors="coerce").isna()
+    return mascara
+
+
+def _data_invalida(lote: pd.DataFrame, formato_data: str | None) -> pd.Series:
+    datas = lote["DT_REFERENCIA"]
+    if pd.api.types.is_datetime64_any_dtype(datas):
+        return pd.Series(False, index=lote.index)
+    if formato_data is None:
+        validos = datas.dropna()
+        if len(validos) and isinstance(validos.iloc[0], str):
+            formato_data = guess_datetime_format(validos.iloc[0])
+    return datas.notna() & pd.to_datetime(datas, errors="coerce", format=formato_data).isna()
+
+
+def _regras(lote: pd.DataFrame, formato_data: str | None) -> dict:
+    """Máscara de cada regra aplicável ao lote (colunas ausentes são tratadas no esquema)."""
+    numeros = {col: pd.to_numeric(lote[col], errors="coerce")
+               for col in COL_CONTAGENS + ["TX_ACERTO"] if col in lote.columns}
+    mascaras = {"nao_numerico": _nao_numerico(lote)}
+
+    if "DT_REFERENCIA" in lote.columns:
+        mascaras["data_invalida"] = _data_invalida(lote, formato_data)
+
+    contagens = [numeros[col] for col in COL_CONTAGENS if col in numeros]
+    if contagens:
+        mascaras["contagem_negativa"] = pd.concat(contagens, axis=1).lt(0).any(axis=1)
+
+    # só linhas de aluno: em turma e município as contagens somam respondentes, não itens
+    if set(COL_CONTAGENS) <= set(numeros) and "TP_INSTANCIA" in lote.columns:
+        soma = numeros["QTD_ACERTOS"] + numeros["QTD_ERROS"]
+        mascaras["acertos_erros_diferente_itens"] = (
+            (lote["TP_INSTANCIA"] == "ALUNO") & soma.notna() & numeros["QTD_ITENS"].notna()
+            & (soma != numeros["QTD_ITENS"])
+        )
+
+    if "TX_ACERTO" in numeros:
+        tx = numeros["TX_ACERTO"]
+        mascaras["tx_acerto_fora_intervalo"] = tx.notna() & ((tx < 0) | (tx > 1))
+
+    if "NM_DISCIPLINA" in lote.columns:
+        disciplina = padronizar_disciplina(lote["NM_DISCIPLINA"])
+        mascaras["disciplina_desconhecida"] = (disciplina.notna() & ~disciplina.isin(DISCIPLINAS_VALIDAS)).astype(bool)
+
+    if "TP_INSTANCIA" in lote.columns:
+        instancia = lote["TP_INSTANCIA"]
+        mascaras["instancia_desconhecida"] = instancia.notna() & ~instancia.isin(INSTANCIAS_VALIDAS)
+
+    if "CD_DESCRITOR" in lote.columns:
+        mascaras["descritor_ausente"] = ~descritor_valido(lote["CD_DESCRITOR"])
+
+    return mascaras
+
+
+def _exemplos(lote: pd.DataFrame, mascara: pd.Series, origem: str, inicio: int) -> list[dict]:
+    posicoes = np.flatnonzero(mascara.to_numpy())[:AMOSTRAS_POR_REGRA]
+    linhas = lote.iloc[posicoes].drop(columns=COLUNAS_SENSIVEIS, errors="ignore")
+    exemplos = []
+    for posicao, registro in zip(posicoes, linhas.to_dict("records")):
+        valores = {col: (None if pd.isna(v) else v.item() if isinstance(v, np.generic) else v)
+                   for col, v in registro.items()}
+        # linha no arquivo: cabeçalho na linha 1
+        exemplos.append({"origem": origem, "linha": int(inicio + posicao + 2), "valores": valores})
+    return exemplos
+
+
+def validar_lote(lote: pd.DataFrame, origem: str, inicio: int,
+                 formato_data: str | None = None, chave: list[str] | None = None,
+                 pasta: str | None = None) -> dict:
+    """
+    Valida um lote do CSV bruto (antes de `tratar_lote`), todo vetorizado.
+    `inicio` é a posição da primeira linha do lote em `origem`. Retorna o
+    resultado parcial, a ser juntado por `combinar_validacoes`.
+
+    Para a checagem de duplicados grava num arquivo temporário um hash de 64
+    bits por linha da `chave` (por padrão, a linha inteira), em `pasta` (a de
+    `pasta_hashes` da execução): duplicatas entre lotes e entre arquivos são
+    resolvidas ao combinar, sem manter os hashes na memória.
+    """
+    colunas = set(lote.columns)
+    parcial = {
+        "origem": origem,
+        "inicio": inicio,
+        "linhas": len(lote),
+        "colunas_ausentes": sorted(set(COLUNAS_ESPERADAS) - colunas),
+        "colunas_inesperadas": sorted(colunas - set(COLUNAS_ESPERADAS)),
+        "regras": {},
+    }
+
+    for nome, mascara in _regras(lote, formato_data).items():
+        total = int(mascara.sum())
+        if not total:
+            continue
+        resultado = {"linhas": total, "exemplos": _exemplos(lote, mascara, origem, inicio)}
+        if "TP_INSTANCIA" in lote.columns:
+            resultado["por_instancia"] = lote.loc[mascara, "TP_INSTANCIA"].value_counts(dropna=False).to_dict()
+        if nome == "disciplina_desconhecida":
+            resultado["valores"] = lote.loc[mascara, "NM_DISCIPLINA"].value_counts().to_dict()
+        parcial["regras"][nome] = resultado
+
+    parcial["arquivo_hashes"] = _gravar_hashes(
+        _hash_linhas(lote, [c for c in (chave or list(lote.columns)) if c in colunas]), pasta
+    )
+    return parcial
+
+
+def _hash_linhas(lote: pd.DataFrame, chave: list[str]) -> np.ndarray:
+    """
+    Hash de 64 bits de cada linha. Colunas numéricas entram como float, para que
+    o hash não dependa do dtype inferido em cada arquivo ou lote (3, 3.0, "3").
+    """
+    valores = lote[chave].copy(deep=False)
+    for col in chave:
+        if col in COL_NUMERICAS:
+            valores[col] = pd.to_numeric(valores[col], errors="coerce").astype("float64")
+    return pd.util.hash_pandas_object(valores, index=False).to_numpy()
+
+
+@contextmanager
+def pasta_hashes():
+    """
+    Pasta temporária dos arquivos de hashes de uma execução do ETL (repassada a
+    `validar_lote`): apagada ao sair do bloco, também quando a execução falha no meio.
+    """
+    with tempfile.TemporaryDirectory(prefix="didale_hashes_") as pasta:
+        yield pasta
+
+
+def _gravar_hashes(hashes: np.ndarray, pasta: str | None = None) -> str:
+    """
+    Hashes do lote ordenados num .npy temporário em `pasta` (padrão: a do
+    sistema): linha 0 = hash, linha 1 = posição da linha no lote. Cada linha é
+    contígua, para que `_abrir_hashes` e `_ler_uint64` leiam faixas por posição.
+    """
+    ordem = np.argsort(hashes, kind="stable")
+    registros = np.stack([hashes[ordem], ordem.astype(np.uint64)])
+    descritor, caminho = tempfile.mkstemp(prefix="didale_hashes_", suffix=".npy", dir=pasta)
+    with os.fdopen(descritor, "wb") as f:
+        np.save(f, registros)
+    return caminho
+
+
+def _remover_hashes(parciais: list[dict]):
+    for parcial in parciais:
+        caminho = parcial.pop("arquivo_hashes", None)
+        if caminho and os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def _abrir_hashes(caminho: str):
+    """Arquivo de hashes aberto para leitura por posição: `(arquivo, início dos dados, linhas)`."""
+    arquivo = open(caminho, "rb")
+    np.lib.format.read_magic(arquivo)
+    forma, _, _ = np.lib.format.read_array_header_1_0(arquivo)
+    return arquivo, arquivo.tell(), forma[1]
+
+
+def _ler_uint64(arquivo, inicio_dados: int, posicao: int, quantidade: int) -> np.ndarray:
+    arquivo.seek(inicio_dados + 8 * posicao)
+    return np.fromfile(arquivo, dtype=np.uint64, count=quantidade)
+
+
+def _primeiro_maior_igual(arquivo, inicio_dados: int, n: int, valor: int) -> int:
+    """Busca binária no arquivo (linha 0, hashes ordenados), lendo só as posições visitadas."""
+    baixo, alto = 0, n
+    while baixo < alto:
+        meio = (baixo + alto) // 2
+        if int(_ler_uint64(arquivo, inicio_dados, meio, 1)[0]) < valor:
+            baixo = meio + 1
+        else:
+            alto = meio
+    return baixo
+
+
+def _duplicados(parciais: list[dict], memoria_mb: float = MEMORIA_DUPLICADOS_MB) -> dict:
+    """
+    Conta linhas repetidas (além da primeira ocorrência) sobre todos os lotes.
+    Os hashes são lidos dos arquivos em faixas (pelos bits mais altos), cada uma
+    com no máximo ~`memoria_mb` de dados de todos os lotes juntos na memória.
+    """
+    abertos = [_abrir_hashes(p["arquivo_hashes"]) for p in parciais]
+    try:
+        total = sum(n for _, _, n in abertos)
+        bits = 0
+        # ~4x: a faixa concatenada (hash e posição), a ordenação e a contagem dos únicos
+        while bits < 32 and 4 * total * 16 > memoria_mb * 2**20 * 2**bits:
+            bits += 1
+
+        repetidas, exemplos = 0, []
+        inicios = [0] * len(abertos)
+        for faixa in range(2**bits):
+            fins = [n if faixa + 1 == 2**bits else _primeiro_maior_igual(a, dados, n, (faixa + 1) << (64 - bits))
+                    for a, dados, n in abertos]
+            pedacos = [
+                (_ler_uint64(a, dados, i, f - i), _ler_uint64(a, dados, n + i, f - i))
+                for (a, dados, n), i, f in zip(abertos, inicios, fins)
+            ]
+            inicios = fins
+            if not sum(len(h) for h, _ in pedacos):
+                continue
+            hashes = np.concatenate([h for h, _ in pedacos])
+            linhas = np.concatenate([l for _, l in pedacos])
+            lote = np.repeat(np.arange(len(pedacos), dtype=np.int32), [len(h) for h, _ in pedacos])
+            del pedacos
+            # ordenação estável: ocorrências do mesmo hash ficam na ordem de leitura
+            ordem = np.argsort(hashes, kind="stable")
+            hashes, linhas, lote = hashes[ordem], linhas[ordem], lote[ordem]
+            del ordem
+
+            unicos, contagens = np.unique(hashes, return_counts=True)
+            repetidas += len(hashes) - len(unicos)
+
+            for valor in unicos[contagens > 1][:AMOSTRAS_POR_REGRA - len(exemplos)]:
+                inicio = int(np.searchsorted(hashes, valor))
+                ocorrencias = []
+                for posicao in range(inicio, min(inicio + AMOSTRAS_POR_REGRA, len(hashes))):
+                    if hashes[posicao] != valor:
+                        break
+                    parcial = parciais[lote[posicao]]
+                    ocorrencias.append({"origem": parcial["origem"],
+                                        "linha": int(parcial["inicio"] + linhas[posicao] + 2)})
+                exemplos.append({"ocorrencias": ocorrencias})
+    finally:
+        for arquivo, _, _ in abertos:
+            arquivo.close()
+
+    return {"linhas": int(repetidas), "exemplos": exemplos}
+
+
+def combinar_validacoes(parciais: list[dict]) -> dict:
+    """Junta os resultados parciais, na ordem de leitura, na seção de validação do relatório."""
+    regras = {}
+    for parcial in parciais:
+        for nome, resultado in parcial["regras"].items():
+            total = regras.setdefault(nome, {"descricao": REGRAS[nome], "linhas": 0, "exemplos": []})
+            total["linhas"] += resultado["linhas"]
+            total["exemplos"] = (total["exemplos"] + resultado["exemplos"])[:AMOSTRAS_POR_REGRA]
+            for campo in ["por_instancia", "valores"]:
+                for valor, n in resultado.get(campo, {}).items():
+                    contagem = total.setdefault(campo, {})
+                    contagem[str(valor)] = contagem.get(str(valor), 0) + int(n)
+
+    duplicados = _duplicados(parciais)
+    if duplicados["linhas"]:
+        regras["linha_duplicada"] = {"descricao": "Linha repetida (mesma chave de uma linha anterior)",
+                                     **duplicados}
+
+    return {
+        "linhas_validadas": sum(p["linhas"] for p in parciais),
+        "colunas_ausentes": sorted({c for p in parciais for c in p["colunas_ausentes"]}),
+        "colunas_inesperadas": sorted({c for p in parciais for c in p["colunas_inesperadas"]}),
+        "regras": regras,
+    }
+
+
+def gravar_relatorio(caminho: str, parciais: list[dict], etapas: dict, **informacoes) -> dict:
+    """Grava o relatório JSON (validação + tempo e memória de cada etapa) e o retorna."""
+    relatorio = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        **informacoes,
+        "validacao": None,
+        "etapas": etapas,
+    }
+    try:
+        relatorio["validacao"] = combinar_validacoes(parciais)
+    finally:
+        _remover_hashes(parciais)
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(temporario, caminho)
+
+    problemas = sum(r["linhas"] for r in relatorio["validacao"]["regras"].values())
+    print(f"📋 Relatório de validação salvo em: {caminho} ({problemas:,} ocorrências)")
+    return relatorio
+
+
+def caminho_relatorio(caminho_saida: str) -> str:
+    """Relatório ao lado da saída: `data/base_tratada.parquet` -> `data/base_tratada_validacao.json`."""
+    return f"{os.path.splitext(os.path.normpath(caminho_saida))[0]}_validacao.json"